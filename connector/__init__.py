@@ -13,6 +13,6 @@ from .xcp import *
 
 
 __all__ = [
-    'DBConnector', 'DDSConnector', 'DDSConnectorRti', 'DoIPClient', 'SDCConnector',
+    'DBConnector', 'DDSConnector', 'DDSConnectorRti', 'DoIPClient', 'SDCConnector', 'SDCAsyncConnector',
     'SSHConnector', 'SSHAsyncConnector', 'XCPConnector'
 ]
@@ -8,9 +8,8 @@ import time
 import re
 import threading
 import traceback
-from xml.dom.minidom import parse
 from settings import env
-from runner.log import logger
+from runner.log import logger, hot_log
 from runner.variable import Variable
 
 # 1.3.0版本
@@ -19,14 +18,23 @@ from protocol.lidds.liddssil import evbsWriter, evbsReader
 from protocol.lidds.liddsxmlparser import Parser
 
 from protocol.rtidds import rticonnextdds_connector as rti
-from protocol.rtidds.rtiddssil import RtiDDSReader, RtiDDSWriter
+from protocol.rtidds.rtiddssil import RtiDDSReader, RtiDDSWriter, RtiDDSDispatcher
 from protocol.rtidds.rtiddsxmlparser import ParseXML
+from protocol.matrix import MatrixIndex
 
 
 class ConnectorPool:
     dds_reader_pool = {}
     dds_writer_pool = {}
     topic_obj_pool = {}
+    subscribed_topics = set()  # 已创建或正在创建reader的topic
+
+    @classmethod
+    def clear(cls):
+        cls.dds_reader_pool.clear()
+        cls.dds_writer_pool.clear()
+        cls.topic_obj_pool.clear()
+        cls.subscribed_topics.clear()
 
 
 class DDSConnector:
@@ -35,7 +43,7 @@ class DDSConnector:
     """
     _instance_lock = threading.Lock()
     _instance = None
-    _pool_lock = threading.Lock()
+    _pool_lock = threading.RLock()  # 创建reader时会创建信号，信号的创建钩子可能在同一线程中再次创建reader
 
     def __init__(self, idl_filepath=''):
         self.idl_filepath = idl_filepath
@@ -48,8 +56,8 @@ class DDSConnector:
         logger.success(f'Create DPF {participant_name}')
         self.xml_parser = Parser(self.idl_filepath)
         self.signal_map = self.xml_parser.signal_map  # {signal_name:topic_name}
-        self.signal2var()
         self.get_topic_names_from_xml()
+        self.signal2var()
         if env.sub_all_topics:
             env.sub_topics = self.reader_topic_names
         if env.pub_all_topics:
@@ -63,12 +71,71 @@ class DDSConnector:
             return cls._instance
 
     def signal2var(self):
-        for signal_name in self.signal_map.keys():
-            Variable(signal_name, 0)
+        """
+        矩阵中的信号只登记名字，不创建 Variable
+        用例或界面第一次引用信号时才创建 Variable，并按需订阅信号所在的topic
+        """
+        Variable.declare(self.signal_map.keys())
+        Variable.add_create_hook(self.on_signal_created)
+
+    def on_signal_created(self, signal_name):
+        topic_name = self.signal_map.get(signal_name)
+        if topic_name is None or topic_name in ConnectorPool.subscribed_topics:
+            return
+        if topic_name in self.reader_topic_set:
+            logger.info(f'按需订阅topic: {topic_name} ({signal_name})')
+            self.create_subscriber(topic_name)
 
     def get_topic_names_from_xml(self):
         self.reader_topic_names = sorted(list(self.xml_parser.profiles['data_readers'].keys()))
         self.writer_topic_names = sorted(list(self.xml_parser.profiles['data_writers'].keys()))
+        self.reader_topic_set = frozenset(self.reader_topic_names)
+
+    def topics_of(self, signal_names) -> set:
+        """信号所在的topic，非dds信号忽略"""
+        signal_map = self.signal_map
+        return {signal_map[i] for i in signal_names if i in signal_map}
+
+    def create_subscribers(self, topic_names, callback=None):
+        """批量创建reader，不再逐个sleep"""
+        start = time.perf_counter()
+        created = 0
+        for topic_name in topic_names:
+            if topic_name in ConnectorPool.subscribed_topics:
+                continue
+            if callback:
+                callback.emit(f'订阅topic: {topic_name}')
+            self.create_subscriber(topic_name)
+            created += 1
+        if created:
+            logger.info(f'创建reader {created} 个, 用时 {time.perf_counter() - start:.3f}s')
+
+    def create_publishers(self, topic_names, callback=None):
+        """批量创建writer"""
+        start = time.perf_counter()
+        created = 0
+        for topic_name in topic_names:
+            if ConnectorPool.dds_writer_pool.get(topic_name):
+                continue
+            if callback:
+                callback.emit(f'创建publisher: {topic_name}')
+            self.create_publisher(topic_name)
+            created += 1
+        if created:
+            logger.info(f'创建writer {created} 个, 用时 {time.perf_counter() - start:.3f}s')
+
+    def prepare_signals(self, action_signals=(), read_signals=(), callback=None):
+        """
+        按用例执行计划提前创建需要的topic: 动作中发送的信号创建writer，条件中读取的信号创建reader
+        :return: (订阅的topic, 发布的topic)
+        """
+        writer_topics = set(self.writer_topic_names)
+        sub_topics = sorted(self.topics_of(read_signals) & self.reader_topic_set)
+        pub_topics = sorted(self.topics_of(action_signals) & writer_topics)
+        logger.info(f'用例引用的topic: 订阅 {len(sub_topics)} 个, 发布 {len(pub_topics)} 个')
+        self.create_subscribers(sub_topics, callback=callback)
+        self.create_publishers(pub_topics, callback=callback)
+        return sub_topics, pub_topics
 
     def create_subscriber(self, topic_name):
         topic_name_prefix = 'Topic_' if env.has_topic_prefix else ''
@@ -76,6 +143,7 @@ class DDSConnector:
         topic_datatype = self.xml_parser.get_topic_datatype(topic_name)
         reader_profile = self.xml_parser.get_reader_profile_name(topic_name)
         with self._pool_lock:
+            ConnectorPool.subscribed_topics.add(topic_name)
             if not ConnectorPool.topic_obj_pool.get(topic_name):
                 tmp = self.dds_proxy.CreateDynamicData(topic_datatype)
                 dyn_data = vbs.VBSPythonDynamicData(tmp)
@@ -105,7 +173,6 @@ class DDSConnector:
                     dyn_data,
                     self.xml_parser
                 )
-                reader.start()
                 ConnectorPool.dds_reader_pool[topic_name] = reader
 
     def create_publisher(self, topic_name):
@@ -143,52 +210,106 @@ class DDSConnector:
                     dyn_data,
                     self.xml_parser
                 )
-                writer.start()
                 ConnectorPool.dds_writer_pool[topic_name] = writer
 
+    def get_publisher(self, topic_name):
+        """
+        获取topic的writer，已创建的writer直接从池中读取，不经过 _pool_lock
+        """
+        writer = ConnectorPool.dds_writer_pool.get(topic_name)
+        if writer is None:
+            self.create_publisher(topic_name)
+            writer = ConnectorPool.dds_writer_pool[topic_name]
+        return writer
+
+    def _member_name(self, signal_name):
+        # 处理topic不同但信号名相同的场景
+        return MatrixIndex.member_name(signal_name)
+
     def publish(self, writer, signal_name, signal_value):
-        if '::' in signal_name:  # 处理topic不同但信号名相同的场景
-            signal_name = signal_name.split('::')[-1]
+        signal_name = self._member_name(signal_name)
         member_type = self.xml_parser.signal2type.get(signal_name)
-        logger.info(f'发送DDS消息：{writer.topic_name} | {signal_name} = {signal_value} | {member_type}')
-        writer.set_value(signal_name, signal_value, member_type=member_type)
-        writer.write()
+        hot_log.event('发送DDS消息', '发送DDS消息：{} | {} = {} | {}', writer.topic_name, signal_name, signal_value, member_type)
+        writer.write_sample({signal_name: signal_value}, {signal_name: member_type})
 
     def dds_send(self, signal):
         signal_name, signal_value = signal.name, signal.Value
         topic_name = self.signal_map[signal_name]
-        self.create_publisher(topic_name)
-        dds_writer = ConnectorPool.dds_writer_pool[topic_name]
-        self.publish(dds_writer, signal_name, signal_value)
-
-    def dds_multi_send(self, topic_name, signals):
-        self.create_publisher(topic_name)
-        dds_writer = ConnectorPool.dds_writer_pool[topic_name]
-        for signal in signals:
-            signal_name, signal_value = signal.name, signal.Value
-            if '::' in signal_name:  # 处理topic不同但信号名相同的场景
-                signal_name = signal_name.split('::')[-1]
+        self.publish(self.get_publisher(topic_name), signal_name, signal_value)
+
+    def _sample_values(self, topic_name, signals, log=True):
+        """
+        整理一个topic要发送的成员值
+        :param signals: Variable列表，或 {信号名: 值} 字典
+        :return: ({成员名: 值}, {成员名: 成员类型})
+        """
+        items = signals.items() if isinstance(signals, dict) else ((i.name, i.Value) for i in signals)
+        values, member_types = {}, {}
+        for signal_name, signal_value in items:
+            signal_name = self._member_name(signal_name)
             member_type = self.xml_parser.signal2type.get(signal_name)
-            logger.info(f'发送DDS消息：{topic_name} | {signal_name} = {signal_value} | {member_type}')
-            dds_writer.set_value(signal_name, signal_value, member_type=member_type)
-        dds_writer.write()
+            if log:
+                hot_log.event('发送DDS消息', '发送DDS消息：{} | {} = {} | {}', topic_name, signal_name, signal_value, member_type)
+            values[signal_name] = signal_value
+            member_types[signal_name] = member_type
+        return values, member_types
+
+    def dds_multi_send(self, topic_name, signals, log=True):
+        """
+        同一个topic的多个信号填充到一个sample中发送，writer内只加一次锁
+        :param signals: Variable列表，或 {信号名: 值} 字典(不经过Variable，模糊测试等直接发送生成的值)
+        :param log: 是否逐个信号打印发送日志
+        """
+        dds_writer = self.get_publisher(topic_name)
+        dds_writer.write_sample(*self._sample_values(topic_name, signals, log=log))
+
+    def group_by_topic(self, signals) -> dict:
+        """
+        按 signal_map 把信号分组到各自的topic
+        :param signals: Variable列表，或 {信号名: 值} 字典
+        :return: {topic名: {信号名: 值}}
+        """
+        items = signals.items() if isinstance(signals, dict) else ((i.name, i.Value) for i in signals)
+        batch = {}
+        for signal_name, signal_value in items:
+            batch.setdefault(self.signal_map[signal_name], {})[signal_name] = signal_value
+        return batch
+
+    def publish_batch(self, batch: dict, log=True):
+        """
+        多个topic的信号在同一时刻发送
+        先取好所有writer(没有的当场创建，已由 prepare_signals 预创建的直接从池中读取)并整理好各topic的成员值，
+        再在一个紧凑的循环里依次填充并发送，各topic之间只间隔一次 write_sample
+        :param batch: {topic名: {信号名: 值}} 或 {topic名: [Variable, ...]}，可由 group_by_topic 生成
+        :param log: 是否逐个信号打印发送日志，日志在全部发送完成后输出
+        :return: 第一个到最后一个topic发送完成的用时(ns)
+        """
+        plans = [
+            (self.get_publisher(topic_name), *self._sample_values(topic_name, signals, log=False))
+            for topic_name, signals in batch.items()
+        ]
+        start = time.perf_counter_ns()
+        for dds_writer, values, member_types in plans:
+            dds_writer.write_sample(values, member_types)
+        elapsed = time.perf_counter_ns() - start
+        if log:
+            for dds_writer, values, member_types in plans:
+                for signal_name, signal_value in values.items():
+                    hot_log.event('发送DDS消息', '发送DDS消息：{} | {} = {} | {}',
+                                  dds_writer.topic_name, signal_name, signal_value, member_types[signal_name])
+            logger.info(f'批量发送 {len(plans)} 个topic, 用时 {elapsed / 1000:.1f}us')
+        return elapsed
 
     def release_connector(self):
-        # 阻塞等待所有线程结束
-        threads = []
-        threads.extend(list(ConnectorPool.dds_writer_pool.values()))
-        threads.extend(list(ConnectorPool.dds_reader_pool.values()))
-        # reader/writer 线程退出
-        for reader_thread in ConnectorPool.dds_reader_pool.values():
-            reader_thread.stop()
-            reader_thread.join()
-        for writer_thread in ConnectorPool.dds_writer_pool.values():
-            writer_thread.stop()
-            writer_thread.join()
+        Variable.remove_create_hook(self.on_signal_created)
+        # reader/writer 不占用线程，数据由vbs监听回调驱动，直接删除实体即可
+        for entity in (*ConnectorPool.dds_reader_pool.values(), *ConnectorPool.dds_writer_pool.values()):
+            entity.delete()
         for topic_name, topic_dict in ConnectorPool.topic_obj_pool.items():
             self.dds_proxy.DeleteTopic_v2(self.participant, topic_dict['topic'])
             logger.info(f'release topic {topic_name}')
         logger.success('release all topics')
+        ConnectorPool.clear()
         # 释放 proxy participant
         self.dds_proxy.clear()
         self.dds_proxy = None
@@ -202,14 +323,11 @@ class DDSConnectorRti(DDSConnector):
     # noinspection PyMissingConstructor
     def __init__(self, idl_filepath=''):
         self.idl_filepath = idl_filepath
-        self.dom_tree = parse(self.idl_filepath)
         self.reader_topic_names = []
         self.writer_topic_names = []
-        self.dupl_signal_names = []
         self.xml_parser = ParseXML(self.idl_filepath)
         self.signal_map = self.xml_parser.signal_map  # {signal_name:topic_name}
         self.dupl_signal_names = self.xml_parser.dupl_signal_names
-        self.signal2var()
         self.add_additional_signals()
         self.get_topic_names_from_xml()
         if env.sub_all_topics:
@@ -218,22 +336,15 @@ class DDSConnectorRti(DDSConnector):
             env.pub_topics = self.writer_topic_names
         self.sub_connector = rti.Connector(config_name="SoaParticipantLibrary::SoaSubParticipant", url=idl_filepath)
         self.pub_connector = rti.Connector(config_name="SoaParticipantLibrary::SoaPubParticipant", url=idl_filepath)
-
-    def signal2var(self):
-        for signal_name in self.signal_map.keys():
-            Variable(signal_name, 0)
+        # 所有reader共用一个分发线程
+        self.dispatcher = RtiDDSDispatcher(self.sub_connector)
+        self.dispatcher.start()
+        self.signal2var()
 
     def get_topic_names_from_xml(self):
-        data_readers = self.dom_tree.getElementsByTagName("data_reader")
-        data_writers = self.dom_tree.getElementsByTagName("data_writer")
-        for reader in data_readers:
-            topic_ref = reader.getAttribute("topic_ref")
-            self.reader_topic_names.append(topic_ref.replace('Topic_', ''))
-        for writer in data_writers:
-            topic_ref = writer.getAttribute("topic_ref")
-            self.writer_topic_names.append(topic_ref.replace('Topic_', ''))
-        self.reader_topic_names = sorted(self.reader_topic_names)
-        self.writer_topic_names = sorted(self.writer_topic_names)
+        self.reader_topic_names = list(self.xml_parser.reader_topic_names)
+        self.writer_topic_names = list(self.xml_parser.writer_topic_names)
+        self.reader_topic_set = frozenset(self.reader_topic_names)
 
     def add_additional_signals(self):
         # 用于区分各个ECU的车辆模式
@@ -245,28 +356,31 @@ class DDSConnectorRti(DDSConnector):
         Variable('msg_all_ecumode_feedback_ecumode_Sus', 0)
 
     def create_subscriber(self, topic_name):
-        if not ConnectorPool.dds_reader_pool.get(topic_name):
-            dds_reader = RtiDDSReader(connector=self.sub_connector, topic_name=topic_name, dupl_signal_names=self.dupl_signal_names)
-            dds_reader.daemon = True
-            dds_reader.start()
-            ConnectorPool.dds_reader_pool[topic_name] = dds_reader
+        with self._pool_lock:
+            ConnectorPool.subscribed_topics.add(topic_name)
+            if not ConnectorPool.dds_reader_pool.get(topic_name):
+                dds_reader = RtiDDSReader(
+                    connector=self.sub_connector,
+                    topic_name=topic_name,
+                    dupl_signal_names=self.dupl_signal_names,
+                    members=self.xml_parser.topic_ref.get(topic_name, {}).get('members')
+                )
+                self.dispatcher.add_reader(dds_reader)
+                ConnectorPool.dds_reader_pool[topic_name] = dds_reader
 
     def create_publisher(self, topic_name):
-        if not ConnectorPool.dds_writer_pool.get(topic_name):
-            dds_writer = RtiDDSWriter(connector=self.pub_connector, topic_name=topic_name)
-            dds_writer.start()
-            ConnectorPool.dds_writer_pool[topic_name] = dds_writer
+        with self._pool_lock:
+            if not ConnectorPool.dds_writer_pool.get(topic_name):
+                dds_writer = RtiDDSWriter(connector=self.pub_connector, topic_name=topic_name)
+                ConnectorPool.dds_writer_pool[topic_name] = dds_writer
 
     def release_connector(self):
+        Variable.remove_create_hook(self.on_signal_created)
         try:
-            logger.info('release rti dds_writer_pool')
-            for writer_thread in ConnectorPool.dds_writer_pool.values():
-                writer_thread.stop()
-                writer_thread.join()
-            logger.info('release rti dds_reader_pool ')
-            for reader_thread in ConnectorPool.dds_reader_pool.values():
-                reader_thread.stop()
-            time.sleep(1)
+            # 只有分发线程需要停止，writer由调用方线程发送
+            self.dispatcher.stop()
+            logger.info(f'release rti readers: {len(ConnectorPool.dds_reader_pool)}, writers: {len(ConnectorPool.dds_writer_pool)}')
+            ConnectorPool.clear()
             self.pub_connector.close()
             logger.info('release pub connector')
             self.sub_connector.close()
@@ -15,6 +15,7 @@ import math
 import binascii
 from queue import Queue
 from loguru import logger
+from runner.log import hot_log
 from functools import wraps
 from ctypes import Structure, cdll, c_uint8, c_uint, c_int, c_uint16, c_char, c_int64
 from settings import work_dir
@@ -171,6 +172,11 @@ class RequestFileTransferParams(Structure):
     ]
 
 
+def _format_frame(title, frame: bytes):
+    frame_hex = frame.hex()
+    return f"{title}{frame_hex[:16]} {frame_hex[16:24]} {frame_hex[24:]}"
+
+
 class DoIPClient(threading.Thread):
     def __init__(
             self,
@@ -303,10 +309,9 @@ class DoIPClient(threading.Thread):
             return None
 
     def process_frame(self, frame: bytes):
-        frame_hex = frame.hex()
-        # 心跳检测不打印
-        if frame_hex[-4:] != '3e80':
-            logger.info(f"DoIP响应: ".rjust(11) + f"{frame_hex[:16]} {frame_hex[16:24]} {frame_hex[24:]}")
+        # 心跳检测不打印，hex格式化延迟到日志输出时
+        if frame[-2:] != b'\x3e\x80':
+            hot_log.event('DoIP响应', _format_frame, 'DoIP响应: '.rjust(11), frame)
 
         frame_type = int.from_bytes(frame[2:4], byteorder='big')
         if frame_type == 0x0006:  # Routing activation response
@@ -335,7 +340,7 @@ class DoIPClient(threading.Thread):
         frame = f"{head}{len_byte_str}{self.source_id}{msg}"
         try:
             if console:
-                logger.info(f" DoIP请求: {frame[:16]} {frame[16:24]} {frame[24:64]}")
+                hot_log.event('DoIP请求', ' DoIP请求: {} {} {}', frame[:16], frame[16:24], frame[24:64])
             self.socket_handler.send(bytes.fromhex(frame))
         except socket.error as e:
             logger.error(f"诊断消息请求失败: {e}")
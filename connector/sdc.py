@@ -5,49 +5,56 @@
 # @File    : sdc.py
 
 import os
+import asyncio
 import threading
 import socket
 import struct
 import time
 
-from runner.log import logger
-from ctypes import Structure, c_char, c_double, c_uint, c_ubyte, sizeof, memmove, addressof
+from runner.log import logger, hot_log
+from ctypes import Structure, c_char, c_double, c_uint, c_ubyte, sizeof
 from select import select
 from runner.variable import Variable
+from runner.recorder import recorder
+from runner.eventloop import get_event_loop, run_coroutine, call_soon
 from settings import env
 
 M2A_NAME_TYPE = {}
 
+# dbo中的信号类型 -> 报文中的信号类型码
+SIGNAL_TYPE_CODES = {
+    'bool': 0x01,
+    'uint32_t': 0x02,
+    'uint64_t': 0x03,
+    'int32_t': 0x04,
+    'int64_t': 0x05,
+    'float': 0x06,
+    'double': 0x07,
+    'uint8_t': 0x08,
+    'uint16_t': 0x09,
+    'int8_t': 0x0A,
+    'int16_t': 0x0B,
+}
+
+
+def type_code(signal_type):
+    code = SIGNAL_TYPE_CODES.get(signal_type)
+    if code is not None:
+        return code
+    if 'uint8_t[' in signal_type:  # 数组
+        return 0x0C
+    return 0x07  # 默认为double
+
 
 def map_data_type(signal_name):
-    signal_type = M2A_NAME_TYPE.get(signal_name, {}).get('signal_type', '')
-    match signal_type:
-        case 'bool':
-            return 0x01
-        case 'uint32_t':
-            return 0x02
-        case 'uint64_t':
-            return 0x03
-        case 'int32_t':
-            return 0x04
-        case 'int64_t':
-            return 0x05
-        case 'float':
-            return 0x06
-        case 'double':
-            return 0x07
-        case 'uint8_t':
-            return 0x08
-        case 'uint16_t':
-            return 0x09
-        case 'int8_t':
-            return 0x0A
-        case 'int16_t':
-            return 0x0B
-        case _ if 'uint8_t[' in signal_type:  # 数组
-            return 0x0C
-        case _:  # 默认为double
-            return 0x07
+    # 类型码在解析dbo时已经算好，这里只查一次字典
+    info = M2A_NAME_TYPE.get(signal_name)
+    if info is None:
+        return 0x07
+    code = info.get('type_code')
+    if code is None:
+        code = info['type_code'] = type_code(info.get('signal_type', ''))
+    return code
 
 
 class StructA2M(Structure):
@@ -59,52 +66,218 @@ class StructA2M(Structure):
 
 
 class StructM2A:
+    # 信号名(64字节) + 信号类型(1字节) + 值长度(1字节) + 值, 按值的格式缓存预编译的 struct.Struct
+    _packers = {}
+
     def __init__(self, name: str, value, signal_type: int):
         self.name = name  # 64字节
         self.value = value
         self.signal_type = signal_type  # 0x00 - 0xFF 1个字节
         self.value_length = 0  # 值的字节长度 0-255
 
+    @classmethod
+    def packer(cls, value_format) -> struct.Struct:
+        packer = cls._packers.get(value_format)
+        if packer is None:
+            packer = cls._packers[value_format] = struct.Struct(f'<64sBB{value_format}')
+        return packer
+
     def pack(self):
-        # 首先打包name、signal_type和长度
-        # # struct.pack 需要对数据进行二进制级别的操作，需要在打包成二进制数据之前转换为字节表示。
-        # print(self.name, self.value, type(self.value), self.signal_type)
-        packed_data = struct.pack('64s', self.name.encode('utf-8'))
-        packed_data += struct.pack('B', self.signal_type)
+        # 一次 pack 生成整个报文，不再逐段 pack 后拼接 bytes
+        name = self.name.encode('utf-8')
         if isinstance(self.value, float):
-            byte_data = struct.pack('d', self.value)
+            self.value_length = 8
+            return self.packer('d').pack(name, self.signal_type, 8, self.value)
         elif isinstance(self.value, list):
             if not all(isinstance(v, int) for v in self.value):
                 raise ValueError('数组元素值类型或范围错误，非全部为0-255正整型')
-            # value = [ord(c) for c in self.value]
-            byte_data = struct.pack(f'{len(self.value)}B', *self.value)
+            values = self.value
         elif isinstance(self.value, str):
-            value = [ord(c) for c in self.value]
-            byte_data = struct.pack(f'{len(value)}B', *value)
+            values = [ord(c) for c in self.value]
         elif isinstance(self.value, bool):
-            byte_data = struct.pack(f'?', self.value)
+            self.value_length = 1
+            return self.packer('?').pack(name, self.signal_type, 1, self.value)
         else:
             raise TypeError(f'信号值类型错误, 当前类型: {type(self.value)}, 当前仅支持float/list/str类型')
-        # print('byte data: ', byte_data)
-        self.value_length = len(byte_data)
-        # print(self.value_length)
-        packed_data += struct.pack('B', self.value_length)
-        packed_data += byte_data
-        # print(packed_data)
-        return packed_data
+        self.value_length = len(values)
+        return self.packer(f'{len(values)}B').pack(name, self.signal_type, self.value_length, *values)
+
+
+class A2MDecoder:
+    """
+    A2M/A2A 消息流式解码器
+    报文格式: 信号名(64字节) + 信号类型(1字节) + 值长度(1字节) + 值(值长度字节)
+    - 预分配固定大小的接收缓冲区，socket 直接 recv_into 到缓冲区空闲部分，不再每次创建 bytes/bytearray
+    - 用读写偏移量代替 del 删除已处理数据，只在尾部空间不足时把剩余的半包移动到缓冲区开头
+    - 跨两次接收的半包保留在缓冲区中，下次接收后继续解析
+    - 头部用预编译的 struct.Struct 解包，信号名到 Variable 的映射缓存起来
+    """
+    HEADER = struct.Struct('<64sBB')  # 与 StructA2M 一致
+    VALUE_DOUBLE = struct.Struct('<d')
+    RECV_SIZE = 16 * 1024  # 每次接收前保证的最小空闲空间
+
+    def __init__(self, capacity=64 * 1024):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # 未解析数据的起始位置
+        self.end = 0  # 已接收数据的结束位置
+        self._variables = {}  # 报文中的原始信号名(bytes) -> Variable
+
+    def reset(self):
+        """重连后丢弃上一个连接残留的半包"""
+        self.start = self.end = 0
+
+    def _reserve(self, size):
+        """保证尾部至少有 size 字节空闲空间，空间不够时先把半包移到开头，仍不够再扩容"""
+        if self.start == self.end:
+            self.start = self.end = 0
+        if self.capacity - self.end >= size:
+            return
+        remaining = self.end - self.start
+        if self.capacity - remaining < size:
+            self.capacity = max(self.capacity * 2, remaining + size)
+            buffer = bytearray(self.capacity)
+            buffer[:remaining] = self.view[self.start:self.end]
+            self.buffer, self.view = buffer, memoryview(buffer)
+        else:
+            self.buffer[:remaining] = self.view[self.start:self.end]
+        self.start, self.end = 0, remaining
+
+    def recv_from(self, sock) -> int:
+        """
+        从socket接收数据到缓冲区尾部的空闲空间
+        :return: 接收的字节数，0表示对端已关闭连接
+        """
+        self._reserve(self.RECV_SIZE)
+        nbytes = sock.recv_into(self.view[self.end:])
+        self.end += nbytes
+        return nbytes
 
+    def feed(self, data):
+        """追加已经接收到的数据(如asyncio协议回调中的data)，之后调用 frames() 解析"""
+        self._reserve(len(data))
+        self.view[self.end:self.end + len(data)] = data
+        self.end += len(data)
 
-class SDCConnector(threading.Thread):
+    def variable(self, raw_name):
+        """报文中的信号名转换成全局信号"""
+        signal = self._variables.get(raw_name)
+        if signal is None:
+            signal_name = raw_name.split(b'\0', 1)[0].decode('utf-8')  # 去除末尾的空字节
+            if signal_name.endswith('_AB_Inner'):
+                signal = Variable('A2A_' + signal_name)
+            else:
+                signal = Variable('A2M_' + signal_name)
+            self._variables[raw_name] = signal
+        return signal
+
+    def frames(self):
+        """
+        逐个解析缓冲区中完整的报文，不完整的报文留到下次
+        :return: 生成器 (Variable, 信号值)
+        """
+        header_size = self.HEADER.size
+        buffer, view = self.buffer, self.view
+        while self.end - self.start >= header_size:
+            raw_name, signal_type, value_length = self.HEADER.unpack_from(buffer, self.start)
+            frame_end = self.start + header_size + value_length
+            if frame_end > self.end:
+                break  # 数据段还没收全
+            value_start = self.start + header_size
+            self.start = frame_end
+            try:
+                if signal_type == 0x0C:  # 数组类型
+                    signal_value = tuple(view[value_start:frame_end])
+                elif value_length == self.VALUE_DOUBLE.size:  # 浮点型
+                    signal_value = self.VALUE_DOUBLE.unpack_from(buffer, value_start)[0]
+                else:
+                    raise ValueError(f'信号值长度错误: type={signal_type}, length={value_length}')
+                signal = self.variable(raw_name)
+            except UnicodeDecodeError as e:
+                logger.error(f'解包错误: {e}')
+                continue
+            except Exception as e:
+                logger.error(f'接收数据错误: {e}')
+                continue
+            yield signal, signal_value
+
+
+class SDCSignalMixin:
+    """
+    同步/asyncio两种SDC客户端共用的部分: dbo信号解析、M2A报文打包
+    """
+    @staticmethod
+    def pack_signal(signal):
+        return SDCSignalMixin.pack_value(signal.name, signal.Value)
+
+    @staticmethod
+    def pack_value(name, value):
+        """
+        按信号名和值直接打包M2A报文，不读写 Variable(记录回放等场景使用)
+        :param name: 带或不带 M2A_/A2A_/A2M_ 前缀的信号名，A2M_ 信号按同名的M2A信号发送
+        """
+        signal_name = str(name).removeprefix('M2A_').removeprefix('A2A_').removeprefix('A2M_')
+        return StructM2A(signal_name, value, map_data_type(signal_name)).pack()
+
+    def add_additional_signals(self):
+        Variable('SIL_Client_CnnctSt').Value = 1
+        Variable('SIL_Client_Cnnct').Value = 1
+        Variable('Sw_HandWakeup').Value = 1
+
+    def parse_dbo_a2m(self):
+        if os.path.exists(self.dbo_filepath):
+            with open(self.dbo_filepath, 'r') as file:
+                for line in file:
+                    if 'tx' in line:
+                        index = line.find(',')
+                        if index != -1:
+                            signal_name = line[2:index]
+                            if signal_name.endswith('_AB_Inner'):
+                                Variable(f'A2A_{signal_name}', 0)
+                            else:
+                                Variable(f'A2M_{signal_name}', 0)
+
+    def parse_dbo_m2a(self):
+        if os.path.exists(self.dbo_filepath):
+            with open(self.dbo_filepath, 'r') as file:
+                for line in file:
+                    if 'rx' in line or 'tx' in line:
+                        line_items = line.split(',')
+                        signal_name = line_items[0][2:]
+                        if signal_name.endswith('_AB_Inner'):
+                            prev = 'A2A_'
+                        else:
+                            prev = 'M2A_'
+                        signal_type = line_items[2]
+                        min_val = line[5]
+                        max_val = line[6]
+                        Variable(f'{prev}{signal_name}', 0)
+                        M2A_NAME_TYPE[signal_name] = {
+                            'signal_type': signal_type,
+                            'type_code': type_code(signal_type),
+                            'min_val': min_val,
+                            'max_val': max_val
+                        }
+
+    def pre_init(self):
+        logger.info('Parse dbo signals to Variable')
+        self.add_additional_signals()
+        self.parse_dbo_m2a()
+        self.parse_dbo_a2m()
+
+
+class SDCConnector(SDCSignalMixin, threading.Thread):
     """
     因为 sdc sil-server只允许一个客户端连接 这里将类重写成单例线程
     注意: 该实例线程整个生命周期只能启动一次 (多线程的特性)
     """
-    recv_buffer = bytes()
     a2m_size = sizeof(StructA2M)
     _instance = None
     __first_init = False
     _instance_lock = threading.Lock()
     conn_lock = threading.Lock()
+    send_lock = threading.Lock()  # 用例线程、UI、周期发送线程共用一个socket，一个报文发完再发下一个
     _is_reconnecting = threading.Event()  # 重连事件标志
 
     def __init__(self, dbo_filepath, server_ip='172.31.30.32', server_port=60000):
@@ -120,6 +293,7 @@ class SDCConnector(threading.Thread):
                 self.server_ip = server_ip
                 self.server_port = server_port
                 self.client_socket = None
+                self.decoder = A2MDecoder()
                 SDCConnector.__first_init = True
 
     def __new__(cls, *args, **kwargs):
@@ -140,6 +314,7 @@ class SDCConnector(threading.Thread):
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.client_socket.connect((self.server_ip, self.server_port))
             self.client_socket.setblocking(False)
+            self.decoder.reset()
             logger.info(f'连接sil成功 ip: {self.server_ip}, port: {self.server_port}')
             env.sil_node_status = 1
 
@@ -167,13 +342,34 @@ class SDCConnector(threading.Thread):
         self.client_socket.close()
 
     def tcp_send(self, signal):
-        logger.info(f'发送TCP消息：{signal.name} = {signal.Value}')
-        signal_name = str(signal.name).removeprefix('M2A_').removeprefix('A2A_')
-        signal_value = signal.Value
-        signal = StructM2A(signal_name, signal_value, map_data_type(signal_name))
-        data = signal.pack()
+        hot_log.event('发送TCP消息', '发送TCP消息：{} = {}', signal.name, signal.Value)
+        self.sendall(self.pack_signal(signal))
+
+    def tcp_send_batch(self, signals):
+        """
+        一组M2A/A2A信号打包到同一个缓冲区，一次sendall发送，组内信号之间没有发送间隔
+        """
+        if not signals:
+            return
+        for signal in signals:
+            hot_log.event('发送TCP消息', '发送TCP消息：{} = {}', signal.name, signal.Value)
+        self.sendall(b''.join([self.pack_signal(signal) for signal in signals]))
+
+    def _sendall(self, data):
+        with self.send_lock:
+            self.client_socket.sendall(data)
+
+    def sendall(self, data, block=True):
+        """
+        :param block: False时正在重连或发送失败直接抛出异常，不在调用方线程中重连和等待(周期发送使用，重连由接收线程负责)
+        """
+        if not block:
+            if self._is_reconnecting.is_set():
+                raise ConnectionError('TCP连接断开, 正在重连')
+            self._sendall(data)
+            return
         try:
-            self.client_socket.sendall(data)  # 缓存区还有空间时，即时服务端重启，此方法也不会抛出异常
+            self._sendall(data)  # 缓存区还有空间时，即时服务端重启，此方法也不会抛出异常
         except socket.error:
             env.sil_node_status = 2
             if not self._is_reconnecting.is_set():
@@ -187,7 +383,7 @@ class SDCConnector(threading.Thread):
             # 重连完成后再次尝试发送数据
             try:
                 logger.info('重新发送成功消息成功')
-                self.client_socket.sendall(data)
+                self._sendall(data)
             except Exception as e:
                 logger.error(e)
         except Exception as e:
@@ -205,97 +401,16 @@ class SDCConnector(threading.Thread):
         if self.client_socket is None or self.client_socket.fileno() == -1:
             # 这里处理套接字未打开或已关闭的情况
             return
-        # bytearray 是可变的。在处理网络接收缓冲区时，数据通常需要多次扩展、截取和修改，使用可变对象可以减少不必要的对象创建和内存复制。
-        self.recv_buffer = bytearray()
         ready_to_read, ready_to_write, in_error = select([self.client_socket], [], [], 0.5)
         if ready_to_read:
-            data = self.client_socket.recv(1024)
-            if data:
-                self.recv_buffer.extend(data)   # 将数据添加到接收缓冲区中
-                while len(self.recv_buffer) >= self.a2m_size:  # 检查缓冲区是否包含完整的数据包且处理粘包问题
-                    # 提取固定长度的部分(头部)
-                    head_package = self.recv_buffer[:self.a2m_size]
-                    del self.recv_buffer[:self.a2m_size]   # 移除已处理的数据包
-                    try:
-                        c = StructA2M()
-                        # 验证数据长度是否匹配结构体大小
-                        if len(head_package) != self.a2m_size:
-                            raise ValueError("Data length does not match the StructA2M size!")
-                        memmove(addressof(c), bytes(head_package), self.a2m_size)
-                    except Exception as e:
-                        logger.error(f'解包错误: {e}')
-                        continue
-                    # 提取数据段
-                    data_package = self.recv_buffer[:c.valueLength]
-                    del self.recv_buffer[:c.valueLength]
-                    # 对数据段进行解包
-                    try:
-                        # 提取动态长度部分(数据部)
-                        if c.signalType == 0x0C:  # 数组类型
-                            if c.valueLength > 0:
-                                c.signalValue = struct.unpack(f'{c.valueLength}B', data_package)
-                            else:
-                                c.signalValue = []
-                        else:   # 浮点型
-                            c.signalValue = struct.unpack('d', data_package)[0]
-                        signal_value = c.signalValue
-                        signal_name = c.signalName.decode('utf-8')  # 去除末尾的空字节
-                        if signal_name.endswith('_AB_Inner'):
-                            signal_name_str = 'A2A_' + signal_name
-                        else:
-                            signal_name_str = 'A2M_' + signal_name
-                        signal = Variable(signal_name_str)
-                        signal.Value = signal_value
-                        logger.info(f'接收TCP消息：{signal_name_str} = {signal_value}')
-                    except UnicodeDecodeError as e:
-                        logger.error(f'解包错误: {e}')
-                    except Exception as e:
-                        logger.error(f'接收数据错误: {e}')
-
-    def add_additional_signals(self):
-        Variable('SIL_Client_CnnctSt').Value = 1
-        Variable('SIL_Client_Cnnct').Value = 1
-        Variable('Sw_HandWakeup').Value = 1
-
-    def parse_dbo_a2m(self):
-        if os.path.exists(self.dbo_filepath):
-            with open(self.dbo_filepath, 'r') as file:
-                for line in file:
-                    if 'tx' in line:
-                        index = line.find(',')
-                        if index != -1:
-                            signal_name = line[2:index]
-                            if signal_name.endswith('_AB_Inner'):
-                                Variable(f'A2A_{signal_name}', 0)
-                            else:
-                                Variable(f'A2M_{signal_name}', 0)
-
-    def parse_dbo_m2a(self):
-        if os.path.exists(self.dbo_filepath):
-            with open(self.dbo_filepath, 'r') as file:
-                for line in file:
-                    if 'rx' in line or 'tx' in line:
-                        line_items = line.split(',')
-                        signal_name = line_items[0][2:]
-                        if signal_name.endswith('_AB_Inner'):
-                            prev = 'A2A_'
-                        else:
-                            prev = 'M2A_'
-                        signal_type = line_items[2]
-                        min_val = line[5]
-                        max_val = line[6]
-                        Variable(f'{prev}{signal_name}', 0)
-                        M2A_NAME_TYPE[signal_name] = {
-                            'signal_type': signal_type,
-                            'min_val': min_val,
-                            'max_val': max_val
-                        }
-
-    def pre_init(self):
-        logger.info('Parse dbo signals to Variable')
-        self.add_additional_signals()
-        self.parse_dbo_m2a()
-        self.parse_dbo_a2m()
+            # 数据直接接收到解码器的缓冲区中，跨两次接收的半包会保留下来
+            if not self.decoder.recv_from(self.client_socket):
+                raise ConnectionResetError('sil server closed the connection')
+            for signal, signal_value in self.decoder.frames():
+                signal.Value = signal_value
+                recorder.record(signal.name, signal_value)
+                if recorder.log_values:
+                    hot_log.event('接收TCP消息', '接收TCP消息：{} = {}', signal.name, signal_value)
 
     def stop(self):
         self._is_keep_recv.set()
@@ -314,6 +429,214 @@ class SDCConnector(threading.Thread):
         self.close()
 
 
+class _A2MProtocol(asyncio.Protocol):
+    """
+    SIL TCP连接的协议对象，每次连接创建一个
+    """
+    def __init__(self, connector):
+        self.connector = connector
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        # 写缓冲区超过高水位时 pause_writing 被调用，发送方等待 resume_writing
+        transport.set_write_buffer_limits(high=256 * 1024)
+
+    def data_received(self, data):
+        decoder = self.connector.decoder
+        decoder.feed(data)
+        for signal, signal_value in decoder.frames():
+            signal.Value = signal_value
+            recorder.record(signal.name, signal_value)
+            if recorder.log_values:
+                hot_log.event('接收TCP消息', '接收TCP消息：{} = {}', signal.name, signal_value)
+
+    def pause_writing(self):
+        self.connector._writable.clear()
+
+    def resume_writing(self):
+        self.connector._writable.set()
+
+    def connection_lost(self, exc):
+        self.connector._on_connection_lost(self, exc)
+
+
+class SDCAsyncConnector(SDCSignalMixin):
+    """
+    asyncio实现的SIL TCP客户端，接口与 SDCConnector 一致，可以直接替换(配置 sdc_async: true)
+    - 运行在共享事件循环(runner.eventloop)上，数据到达即解析，没有 select 0.5s 的轮询间隔，也不单独占用接收线程
+    - 连接断开后按指数退避(0.5s 到 8s)自动重连，发送方等待重连完成后再发送，不再 sleep 轮询
+    - 发送受写缓冲区高低水位控制，缓冲区满时等待对端读走数据
+    - 同步调用方(CaseTester)通过 tcp_send/tcp_send_batch 提交发送并等待结果
+    """
+    _instance = None
+    __first_init = False
+    _instance_lock = threading.Lock()
+    send_timeout = 30  # 等待重连和写缓冲区的最长时间(秒)
+    backoff_min = 0.5
+    backoff_max = 8
+
+    def __init__(self, dbo_filepath, server_ip='172.31.30.32', server_port=60000):
+        """创建单例并只执行一次初始化 保证只有一个连接在使用"""
+        with self._instance_lock:
+            if not self.__first_init:
+                self.started = False
+                self.dbo_filepath = dbo_filepath
+                self.pre_init()
+                self.server_ip = server_ip
+                self.server_port = server_port
+                self.decoder = A2MDecoder()
+                self.loop = get_event_loop()
+                self._protocol = None
+                self._stopping = False
+                self._reconnect_task = None
+                # 以下事件只在事件循环线程中使用
+                self._connected = asyncio.Event()
+                self._writable = asyncio.Event()
+                self._writable.set()
+                SDCAsyncConnector.__first_init = True
+
+    def __new__(cls, *args, **kwargs):
+        """单例模式"""
+        with cls._instance_lock:
+            if not cls._instance:
+                cls._instance = super().__new__(cls)
+            return cls._instance
+
+    @property
+    def client_socket(self):
+        """与 SDCConnector 保持一致，未连接时为None"""
+        if self._protocol is None or self._protocol.transport is None:
+            return None
+        return self._protocol.transport.get_extra_info('socket')
+
+    async def _connect(self):
+        _, protocol = await self.loop.create_connection(lambda: _A2MProtocol(self), self.server_ip, self.server_port)
+        self.decoder.reset()
+        self._protocol = protocol
+        self._writable.set()
+        self._connected.set()
+        logger.info(f'连接sil成功 ip: {self.server_ip}, port: {self.server_port}')
+        env.sil_node_status = 1
+
+    def _on_connection_lost(self, protocol, exc):
+        if protocol is not self._protocol:
+            return  # 旧连接关闭的回调
+        self._protocol = None
+        self._connected.clear()
+        self._writable.set()  # 唤醒等待写缓冲区的发送方，让它们改为等待重连
+        if self._stopping:
+            return
+        env.sil_node_status = 2
+        logger.warning(f'TCP连接断开, 自动重连 ... {exc or ""}')
+        self._ensure_reconnect()
+
+    def _ensure_reconnect(self):
+        """保证同一时间只有一个重连任务"""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self.loop.create_task(self._reconnect_loop())
+        return self._reconnect_task
+
+    async def _reconnect_loop(self):
+        delay = self.backoff_min
+        while not self._stopping:
+            try:
+                await self._connect()
+            except OSError as e:
+                logger.debug(f'重连sil失败 {e}, {delay}s后重试')
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff_max)
+            else:
+                logger.success('reconnect sil server success')
+                return
+
+    async def _reconnect(self):
+        if self._protocol is not None:
+            self._protocol.transport.close()
+        self._protocol = None
+        self._connected.clear()
+        await self._ensure_reconnect()
+
+    async def _send(self, data):
+        if not self._connected.is_set():
+            logger.info('TCP连接断开, 等待重连')
+            await asyncio.wait_for(self._connected.wait(), self.send_timeout)
+        # 写缓冲区满时等待，断开时 _writable 会被set，再次检查连接
+        while not self._writable.is_set() or not self._connected.is_set():
+            await asyncio.wait_for(self._writable.wait(), self.send_timeout)
+            if not self._connected.is_set():
+                await asyncio.wait_for(self._connected.wait(), self.send_timeout)
+        self._protocol.transport.write(data)
+
+    def connect_server(self):
+        """
+        同步连接，失败时抛出异常，调用方式与 SDCConnector 相同
+        """
+        self._stopping = False
+        run_coroutine(self._connect())
+
+    def start(self):
+        """连接建立后数据接收由事件循环驱动，这里只标记状态，保持与 SDCConnector 相同的调用方式"""
+        self.started = True
+
+    def reconnect_server(self):
+        """关闭当前连接并阻塞等待重连成功"""
+        self._stopping = False
+        run_coroutine(self._reconnect())
+
+    def stop(self):
+        self._stopping = True
+        call_soon(self._close)
+        logger.info('sdc 异步tcp连接关闭')
+
+    def close(self):
+        call_soon(self._close)
+
+    def _close(self):
+        if self._reconnect_task is not None and not self._reconnect_task.done():
+            self._reconnect_task.cancel()
+        if self._protocol is not None:
+            self._protocol.transport.close()
+
+    def tcp_send(self, signal):
+        hot_log.event('发送TCP消息', '发送TCP消息：{} = {}', signal.name, signal.Value)
+        self.sendall(self.pack_signal(signal))
+
+    def tcp_send_batch(self, signals):
+        """
+        一组M2A/A2A信号打包成一次写入
+        """
+        if not signals:
+            return
+        for signal in signals:
+            hot_log.event('发送TCP消息', '发送TCP消息：{} = {}', signal.name, signal.Value)
+        self.sendall(b''.join([self.pack_signal(signal) for signal in signals]))
+
+    def sendall(self, data, block=True):
+        """
+        :param block: False时连接断开直接抛出异常，不等待重连(周期发送使用)
+        """
+        if not block:
+            if not self._connected.is_set():
+                raise ConnectionError('TCP连接断开, 正在重连')
+            run_coroutine(self._send(data))
+            return
+        try:
+            run_coroutine(self._send(data))
+        except (asyncio.TimeoutError, TimeoutError):
+            logger.error(f'TCP发送超时, {self.send_timeout}s内未恢复连接')
+        except Exception as e:
+            logger.error(e)
+
+
+def create_sdc_connector(dbo_filepath, server_ip='172.31.30.32', server_port=60000):
+    """
+    按配置创建SIL TCP客户端，sdc_async: true 时使用asyncio实现
+    """
+    connector_class = SDCAsyncConnector if env.sdc_async else SDCConnector
+    return connector_class(dbo_filepath, server_ip=server_ip, server_port=server_port)
+
+
 if __name__ == '__main__':
     print(sizeof(StructA2M))
     sdc_client = SDCConnector(env.dbo_filepath, server_ip=env.sil_server_ip, server_port=60000)
@@ -3,35 +3,64 @@
 # @Time    : 2024/5/16 16:56
 # @File    : dos.py
 
-import time
+"""
+DDS DoS/长稳压力测试
+所有topic的writer由一个 LoadGenerator 按目标频率统一调度发送，每次触发把topic下所有信号填充随机值后作为一个sample发送
+运行结束后输出每个topic的实际发送频率和抖动
+"""
+
+import random
 from protocol.rtidds.rtiddssil import *
 from protocol.lidds.liddssil import *
 from protocol.rtidds.rtiddsxmlparser import ParseXML
 from protocol.lidds.liddsxmlparser import Parser
+from runner.loadgen import LoadGenerator
 from settings import env
 
 
-class WriterPool:
-    writer_threads = []
+def random_value(member_type):
+    """按成员类型生成随机值，不支持的类型(typedef数组/nonBasic)返回None，不发送"""
+    if member_type == 'nonBasic':
+        return None
+    if member_type in ('bool', 'boolean'):
+        return random.random() < 0.5
+    if member_type in ('string', 'wstring'):
+        return str(random.randint(0, 2 ** 8 - 1))
+    return float(random.randint(0, 2 ** 8 - 1))
+
+
+def make_publish(writer, dds_xml_obj, signal_names):
+    signal_names = [i.split(':')[-1] for i in signal_names]
+    member_types = {i: dds_xml_obj.signal2type.get(i) for i in signal_names}
+    signal_names = [i for i in signal_names if member_types[i] != 'nonBasic']
 
+    def publish():
+        values = {i: random_value(member_types[i]) for i in signal_names}
+        writer.write_sample(values, member_types)
+    return publish
 
-def attack_rti(filepath, interval):
+
+def attack_rti(filepath, rate, workers):
     dds_xml_obj = ParseXML(xml_filepath=filepath)
-    for topic_name in list(dds_xml_obj.topic2signal.keys()):  # ['WarningInfo']
-        pub_connector = rti.Connector(config_name="SoaParticipantLibrary::SoaPubParticipant", url=filepath)
-        writer = RtiDDSWriterDoS(pub_connector, topic_name, interval=interval, dds_xml_obj=dds_xml_obj)
-        writer.start()
-        WriterPool.writer_threads.append(writer)
-        print(f'{topic_name} datawriter created ............................')
+    # write_sample 在 _output_lock 内完成赋值和发送，所有writer共用一个connector
+    pub_connector = rti.Connector(config_name="SoaParticipantLibrary::SoaPubParticipant", url=filepath)
+    generator = LoadGenerator(workers=workers)
+    for topic_name, signal_names in dds_xml_obj.topic2signal.items():
+        writer = RtiDDSWriter(pub_connector, topic_name)
+        generator.add_topic(topic_name, rate, make_publish(writer, dds_xml_obj, signal_names))
+        logger.info(f'{topic_name} datawriter created')
+    return generator, lambda: pub_connector.close()
 
 
-def attack_vbs(filepath, interval):
+def attack_vbs(filepath, rate, workers):
     dds_xml_obj = Parser(filepath)
     proxy = vbs.VBSPythonDynamicProxy().getInstance()
     proxy.LoadXML(filepath)
     participant_name = 'mySubscriber'
     participant = proxy.CreateDomainParticipantWithProfile_v2(filepath, participant_name)
-    for topic_name in dds_xml_obj.topic2signal.keys():
+    generator = LoadGenerator(workers=workers)
+    writers = []
+    for topic_name, signal_names in dds_xml_obj.topic2signal.items():
         prefix_topic_name = f'Topic_{topic_name}' if env.has_topic_prefix else topic_name
         topic_profile = dds_xml_obj.get_topic_profile_name(topic_name)
         topic_datatype = dds_xml_obj.get_topic_datatype(topic_name)
@@ -40,7 +69,7 @@ def attack_vbs(filepath, interval):
         dyn_data = vbs.VBSPythonDynamicData(tmp)
         dyn_type = dyn_data.GetVBSType()
         topic = proxy.CreateTopicWithProfile_v2(participant, prefix_topic_name, topic_datatype, dyn_type, topic_profile)
-        writer = evbsWriterDoS(
+        writer = evbsWriter(
             proxy,
             participant,
             prefix_topic_name,
@@ -48,18 +77,25 @@ def attack_vbs(filepath, interval):
             writer_profile,
             topic,
             dyn_data,
-            dds_xml_obj,
-            interval=interval
+            dds_xml_obj
         )
-        writer.start()
-        WriterPool.writer_threads.append(writer)
+        writers.append(writer)
+        generator.add_topic(topic_name, rate, make_publish(writer, dds_xml_obj, signal_names))
+
+    def release():
+        for writer in writers:
+            writer.delete()
+        proxy.clear()
+    return generator, release
 
 
 if __name__ == '__main__':
     print("Kun's Light DDS Dos Attack Program")
     protocol_type = int(input('请选择DDS协议类型 [1] rti  [2] vbs  :'))
     xml_filepath = input('请输入DDS XML矩阵文件路径:').replace('"', '')
-    interval = float(input('请输入攻击间隔（单位: 秒）:'))
+    rate = float(input('请输入每个topic的发送频率（单位: Hz）:'))
+    duration = float(input('请输入攻击时长（单位: 秒，0表示按回车停止）:') or 0)
+    workers = int(input('请输入发送线程数（默认4）:') or 4)
     has_prefix = input('是否带Topic_前缀? y/n :')
     if 'y' in has_prefix.lower():
         env.has_topic_prefix = True
@@ -67,24 +103,20 @@ if __name__ == '__main__':
         env.has_topic_prefix = False
 
     if protocol_type == 1:
-        attack_rti(xml_filepath, interval)
+        generator, release = attack_rti(xml_filepath, rate, workers)
     elif protocol_type == 2:
-        attack_vbs(xml_filepath, interval)
+        generator, release = attack_vbs(xml_filepath, rate, workers)
     else:
         input('请选择DDS协议类型选择错误，请退出后重新选择')
+        raise SystemExit
 
-    # 攻击间隔
-    interval = 0
-    # rti dos
-    filepath = r"D:\Project\soa-sil-xbp\data\matrix\rti_XAP241&XPP361.xml"
-    # lidds dos
-    # filepath = r"D:\Project\soa-sil-xbp\data\matrix\vbs_XBP2.2.0.xml"
-
-    # 攻击时长 单位分钟
-    # print('++++++++++++++++++++++++++++++++++++')
-    # time.sleep(60)  # 等writer_threads中的线程齐了
-    # print('===================================')
-    # print(WriterPool.writer_threads)
-    # for w in WriterPool.writer_threads:
-    #     w.stop()
-    #     w.join()
+    try:
+        if duration > 0:
+            generator.run(duration)
+        else:
+            generator.start()
+            input('按回车停止攻击\n')
+    finally:
+        generator.stop()
+        generator.log_report()
+        release()
@@ -5,17 +5,47 @@
 
 import sys
 import os
-import random
 import threading
 import time
 import traceback
-from runner.log import logger
+from functools import partial
+from operator import methodcaller
+from runner.log import logger, hot_log
 from protocol.lidds import vbs
 from runner.variable import Variable
+from runner.recorder import recorder
 
 _lock = threading.Lock()
 
 
+# 成员类型 -> VBSDynamicData 的取值方法名
+GETTER_NAMES = {
+    'int32': 'get_int32_value',
+    'uint32': 'get_uint32_value',
+    'uint16': 'get_uint16_value',
+    'int16': 'get_int16_value',
+    'uint64': 'get_uint64_value',
+    'int64': 'get_int64_value',
+    'uint8': 'get_uint8_value',
+    'int8': 'get_int8_value',
+    'bool': 'get_bool_value',
+    'float64': 'get_float64_value',
+    'float32': 'get_float32_value',
+    'string': 'get_string_value',
+    'float128': 'get_float128_value',
+    'char8': 'get_char8_value',
+    'byte': 'get_byte_value',
+    'wstring': 'get_wstring_value',
+    'enum': 'get_enum_value',
+}
+
+# 成员类型 -> VBSDynamicData 的赋值方法名
+SETTER_NAMES = {k: 'set' + v[3:] for k, v in GETTER_NAMES.items()}
+
+# 解码计划中的条目类型
+_BASIC, _STRUCT, _ARRAY, _SEQUENCE = range(4)
+
+
 class ReaderListener(vbs.VBS_DataReaderListener):
     def __init__(self, dyn_data, topic_name, topic_datatype, dds_xml_obj=None, is_struct=False):
         super().__init__()
@@ -28,6 +58,7 @@ class ReaderListener(vbs.VBS_DataReaderListener):
         # struct_info: parsed struct info in xml
         self.struct_info = self.dds_xml['types']['dataTypes'][topic_datatype]['members']
         self.message_info = {}
+        self.decode_plan = self.build_decode_plan()
 
     def on_subscription_matched(self, datareader, info):
         if 0 < info.current_count_change():
@@ -35,103 +66,102 @@ class ReaderListener(vbs.VBS_DataReaderListener):
         else:
             logger.info(f"Subscriber unmatched publisher: {self.topic_name}")
 
-    def get_message_value(self, inner_struct, message_type, message_id):
-        if message_type == 'int32':
-            message_value = inner_struct.get_int32_value(message_id)
-        elif message_type == 'uint32':
-            message_value = inner_struct.get_uint32_value(message_id)
-        elif message_type == 'uint16':
-            message_value = inner_struct.get_uint16_value(message_id)
-        elif message_type == 'int16':
-            message_value = inner_struct.get_int16_value(message_id)
-        elif message_type == 'uint64':
-            message_value = inner_struct.get_uint64_value(message_id)
-        elif message_type == 'int64':
-            message_value = inner_struct.get_int64_value(message_id)
-        elif message_type == 'uint8':
-            message_value = inner_struct.get_uint8_value(message_id)
-        elif message_type == 'int8':
-            message_value = inner_struct.get_int8_value(message_id)
-        elif message_type == 'bool':
-            message_value = inner_struct.get_bool_value(message_id)
-        elif message_type == 'float64':
-            message_value = inner_struct.get_float64_value(message_id)
-        elif message_type == 'float32':
-            message_value = inner_struct.get_float32_value(message_id)
-        elif message_type == 'string':
-            message_value = inner_struct.get_string_value(message_id)
-        elif message_type == 'float128':
-            message_value = inner_struct.get_float128_value(message_id)
-        elif message_type == 'char8':
-            message_value = inner_struct.get_char8_value(message_id)
-        elif message_type == 'byte':
-            message_value = inner_struct.get_byte_value(message_id)
-        elif message_type == 'wstring':
-            message_value = inner_struct.get_wstring_value(message_id)
-        elif message_type == 'enum':
-            message_value = inner_struct.get_enum_value(message_id)
-        return message_value
+    def _signal_variable(self, member_name, dupl_signal_names):
+        if member_name in dupl_signal_names:
+            return Variable(f'{self.topic_name}::{member_name}')
+        return Variable(member_name)
+
+    def build_decode_plan(self) -> list:
+        """
+        创建reader时把topic的成员信息一次性展开成解码计划，收到数据时不再遍历xml字典
+        嵌套结构体展开成内部成员列表，typedef数组预先确定长度和取值方法，信号对应的 Variable 提前获取
+        条目格式:
+            (_BASIC, 取值方法(已绑定dyn_data和member_id), Variable, 日志名称, 类型)
+            (_STRUCT, member_id, [(取值方法(methodcaller), Variable, 日志名称, 类型), ...])
+            (_ARRAY, member_id, 取值方法名, Variable, 日志名称, 类型, 数组长度)
+            (_SEQUENCE, member_id, 取值方法名, Variable, 日志名称, 类型, None)
+        """
+        data_types = self.dds_xml['types']['dataTypes']
+        typedefs = self.dds_xml['types']['typedefs']
+        dupl_signal_names = self.dds_xml_obj.dupl_signal_names  # frozenset
+        plan = []
+        for struct_datatype, info in self.struct_info.items():
+            struct_id = int(info['message_id'])
+            struct_type = info['message_type']
+            if struct_type != 'nonBasic':
+                getter_name = GETTER_NAMES.get(struct_type)
+                if getter_name is None:
+                    logger.warning(f'{self.topic_name} | {struct_datatype} 不支持的类型 {struct_type}')
+                    continue
+                getter = partial(getattr(self.dyn_data, getter_name), struct_id)
+                plan.append((_BASIC, getter, self._signal_variable(struct_datatype, dupl_signal_names), struct_datatype, None))
+            elif info['ref'] == 'struct':
+                members = []
+                for msg_name, msg_info in data_types[info['nonBasicTypeName']]['members'].items():
+                    message_type = msg_info['message_type']
+                    getter_name = GETTER_NAMES.get(message_type)
+                    if getter_name is None:
+                        logger.warning(f'{self.topic_name} | {struct_datatype}.{msg_name} 不支持的类型 {message_type}')
+                        continue
+                    combine_msg_name = f'{struct_datatype}.{msg_name}'
+                    members.append((
+                        methodcaller(getter_name, int(msg_info['message_id'])),
+                        self._signal_variable(combine_msg_name, dupl_signal_names),
+                        combine_msg_name,
+                        message_type
+                    ))
+                plan.append((_STRUCT, struct_id, members))
+            elif info['ref'] == 'typedef':
+                typedef_message_info = typedefs[info['nonBasicTypeName']]
+                if 'arrayDimensions' in typedef_message_info:
+                    kind, array_length = _ARRAY, int(typedef_message_info['arrayDimensions'])
+                elif 'sequenceMaxLength' in typedef_message_info:
+                    kind, array_length = _SEQUENCE, None  # 长度以实际收到的数据为准
+                else:
+                    continue
+                message_type = typedef_message_info['type']
+                getter_name = GETTER_NAMES.get(message_type)
+                if getter_name is None:
+                    logger.warning(f'{self.topic_name} | {struct_datatype} 不支持的类型 {message_type}')
+                    continue
+                variable = self._signal_variable(struct_datatype, dupl_signal_names)
+                plan.append((kind, struct_id, getter_name, variable, struct_datatype, message_type, array_length))
+        return plan
+
+    def _update(self, variable, message_value, msg_name, message_type=None):
+        if recorder.log_values:
+            if message_type is None:
+                hot_log.change(variable.name, variable.Value, message_value, '接收DDS消息',
+                               '接收DDS消息：{} | {} = {}', self.topic_name, msg_name, message_value)
+            else:
+                hot_log.change(variable.name, variable.Value, message_value, '接收DDS消息',
+                               '接收DDS消息：{} | {} = {} | {}', self.topic_name, msg_name, message_value, message_type)
+        variable.Value = message_value
+        recorder.record(variable.name, message_value)
 
     def on_data_available(self, reader):
         try:
             reader.take(self.dyn_data)
-            for struct_datatype in self.struct_info.keys():
-                struct_id = int(self.struct_info[struct_datatype]['message_id'])
-                struct_type = self.struct_info[struct_datatype]['message_type']
-
-                if struct_type == 'nonBasic':
-                    non_basic_type_name = self.struct_info[struct_datatype]['nonBasicTypeName']
-                    no_basic_type_ref = self.struct_info[struct_datatype]['ref']
-                    inner_struct = self.dyn_data.loan_value(struct_id)
-                    try:
-                        if no_basic_type_ref == 'struct':
-                            message_info = self.dds_xml['types']['dataTypes'][non_basic_type_name]['members']
-                            for msg_name in message_info.keys():
-                                message_id = int(message_info[msg_name]['message_id'])
-                                message_type = message_info[msg_name]['message_type']
-                                message_value = self.get_message_value(inner_struct, message_type, message_id)
-                                combine_msg_name = f'{struct_datatype}.{msg_name}'
-                                if combine_msg_name in self.dds_xml_obj.dupl_signal_names:
-                                    signal_name = f'{self.topic_name}::{combine_msg_name}'
-                                else:
-                                    signal_name = combine_msg_name
-                                if Variable(signal_name).Value != message_value:
-                                    logger.info(f'接收DDS消息：{self.topic_name} | {combine_msg_name} = {message_value} | {message_type}')
-                                Variable(signal_name).Value = message_value
-
-                        elif no_basic_type_ref == 'typedef':
-                            typedef_message_info = self.dds_xml['types']['typedefs'][non_basic_type_name]
-                            if any(key in typedef_message_info for key in ('arrayDimensions', 'sequenceMaxLength')):
-                                msg_array_value = []
-                                if 'arrayDimensions' in typedef_message_info:
-                                    array_length = int(typedef_message_info['arrayDimensions'])
-                                elif 'sequenceMaxLength' in typedef_message_info:
-                                    array_length = inner_struct.get_item_count()  # TODO 这一块可能有bug
-                                else:
-                                    continue
-                                message_type = typedef_message_info['type']
-                                for i in range(array_length):
-                                    message_value = self.get_message_value(inner_struct, message_type, i)
-                                    msg_array_value.append(message_value)
-                                if struct_datatype in self.dds_xml_obj.dupl_signal_names:
-                                    signal_name = f'{self.topic_name}::{struct_datatype}'
-                                else:
-                                    signal_name = struct_datatype
-                                if Variable(signal_name).Value != msg_array_value:
-                                    logger.info(f'接收DDS消息：{self.topic_name} | {struct_datatype} = {msg_array_value} | {message_type}')
-                                Variable(signal_name).Value = msg_array_value
-
-                    finally:
-                        self.dyn_data.return_loaned_value(inner_struct)
-                else:
-                    message_value = self.get_message_value(self.dyn_data, struct_type, struct_id)
-                    if struct_datatype in self.dds_xml_obj.dupl_signal_names:
-                        signal_name = f'{self.topic_name}::{struct_datatype}'
+            dyn_data = self.dyn_data
+            for entry in self.decode_plan:
+                kind = entry[0]
+                if kind == _BASIC:
+                    _, getter, variable, msg_name, message_type = entry
+                    self._update(variable, getter(), msg_name)
+                    continue
+                inner_struct = dyn_data.loan_value(entry[1])
+                try:
+                    if kind == _STRUCT:
+                        for getter, variable, msg_name, message_type in entry[2]:
+                            self._update(variable, getter(inner_struct), msg_name, message_type)
                     else:
-                        signal_name = struct_datatype
-                    if Variable(signal_name).Value != message_value:
-                        logger.info(f'接收DDS消息：{self.topic_name} | {struct_datatype} = {message_value}')
-                    Variable(signal_name).Value = message_value
+                        _, _, getter_name, variable, msg_name, message_type, array_length = entry
+                        if array_length is None:
+                            array_length = inner_struct.get_item_count()  # TODO 这一块可能有bug
+                        getter = getattr(inner_struct, getter_name)
+                        self._update(variable, [getter(i) for i in range(array_length)], msg_name, message_type)
+                finally:
+                    dyn_data.return_loaned_value(inner_struct)
 
         except:
             logger.error(traceback.format_exc())
@@ -157,10 +187,11 @@ class WriterListener(vbs.VBS_DataWriterListener):
             self._writer._cvDiscovery.release()
 
 
-class evbsReader(threading.Thread):
+class evbsReader:
+    """
+    topic的reader，数据由vbs回调 ReaderListener.on_data_available 推送，不需要自己的线程
+    """
     def __init__(self, proxy, participant, topic_name, topic_datatype, reader_profile, topic, dyn_data, dds_xml_obj):
-        super().__init__()
-        self._stop_event = threading.Event()
         self.proxy = proxy
         self.dyn_data = dyn_data
         # self.dyn_type = self.dyn_data.GetVBSType()
@@ -181,20 +212,14 @@ class evbsReader(threading.Thread):
                 self.proxy.DeleteDataReader_v2(self.participant, self.reader)
                 logger.info(f"release topic DataReader {self.topic_name}")
 
-    def stop(self):
-        self._stop_event.set()
 
-    def run(self):
-        self._stop_event.wait()  # 等待直到 _stop_event被设定
-        self.delete()
-
-
-class evbsWriter(threading.Thread):
+class evbsWriter:
+    """
+    topic的writer，由调用方线程直接发送，不需要自己的线程
+    """
     def __init__(self, proxy, participant, topic_name, topic_datatype, writer_profile, topic, dyn_data, dds_xml_obj):
-        super(evbsWriter, self).__init__()
         self._matched_reader = 0
         self._cvDiscovery = threading.Condition()
-        self._stop_event = threading.Event()
         self.proxy = proxy
         self.dyn_data = dyn_data
         # self.dyn_type = self.dyn_data.GetVBSType()
@@ -208,6 +233,8 @@ class evbsWriter(threading.Thread):
         self.writer_profile = writer_profile
         self.listener = WriterListener(self)
         self.writer = self.proxy.CreateDataWriterWithProfile_v2(self.participant, self.topic, self.writer_profile, self.listener)
+        self._write_lock = threading.Lock()  # 保护 dyn_data_obj，一个sample填充完整后再发送
+        self._write_plans = {}  # 信号名 -> 编译好的赋值函数
         logger.info(f"Create writer topic {self.topic_name}")
 
     def wait_discovery(self):
@@ -217,47 +244,34 @@ class evbsWriter(threading.Thread):
         self._cvDiscovery.release()
         logger.info("Writer discovery finished...")
 
-    def set_message_value(self, inner_struct, message_id, msg_value, message_type):
+    @staticmethod
+    def _setter(message_id, message_type):
+        """
+        生成单个成员的赋值函数 fn(data, value[, member_id])，整型成员先转换成int，不支持的类型不赋值
+        数组元素复用同一个赋值函数，下标通过 member_id 传入
+        """
+        setter_name = SETTER_NAMES.get(message_type)
+        if setter_name is None:
+            return lambda data, msg_value, member_id=message_id: None
         if 'int' in message_type:
-            msg_value = int(msg_value)
-        if message_type == 'int32':
-            inner_struct.set_int32_value(msg_value, message_id)
-        elif message_type == 'uint32':
-            inner_struct.set_uint32_value(msg_value, message_id)
-        elif message_type == 'uint16':
-            inner_struct.set_uint16_value(msg_value, message_id)
-        elif message_type == 'int16':
-            inner_struct.set_int16_value(msg_value, message_id)
-        elif message_type == 'uint64':
-            inner_struct.set_uint64_value(msg_value, message_id)
-        elif message_type == 'int64':
-            inner_struct.set_int64_value(msg_value, message_id)
-        elif message_type == 'uint8':
-            inner_struct.set_uint8_value(msg_value, message_id)
-        elif message_type == 'int8':
-            inner_struct.set_int8_value(msg_value, message_id)
-        elif message_type == 'bool':
-            inner_struct.set_bool_value(msg_value, message_id)
-        elif message_type == 'float64':
-            inner_struct.set_float64_value(msg_value, message_id)
-        elif message_type == 'float32':
-            inner_struct.set_float32_value(msg_value, message_id)
-        elif message_type == 'string':
-            inner_struct.set_string_value(msg_value, message_id)
-        elif message_type == 'float128':
-            inner_struct.set_float128_value(msg_value, message_id)
-        elif message_type == 'char8':
-            inner_struct.set_char8_value(msg_value, message_id)
-        elif message_type == 'byte':
-            inner_struct.set_byte_value(msg_value, message_id)
-        elif message_type == 'wstring':
-            inner_struct.set_wstring_value(msg_value, message_id)
-        elif message_type == 'enum':
-            inner_struct.set_enum_value(msg_value, message_id)
+            def set_int(data, msg_value, member_id=message_id):
+                getattr(data, setter_name)(int(msg_value), member_id)
+            return set_int
 
-    def set_value(self, msg_name, msg_value, member_type=None):
-        inner_msg_name = ''
+        def set_value(data, msg_value, member_id=message_id):
+            getattr(data, setter_name)(msg_value, member_id)
+        return set_value
+
+    def set_message_value(self, inner_struct, message_id, msg_value, message_type):
+        self._setter(message_id, message_type)(inner_struct, msg_value)
+
+    def compile_write_plan(self, msg_name):
+        """
+        把信号名编译成赋值函数 fn(value)，结果按信号名缓存
+        成员id、类型、嵌套结构体、typedef数组的长度限制都在这里一次性解析
+        """
         struct_info = self.dds_xml['types']['dataTypes'][self.topic_datatype]['members']
+        inner_msg_name = ''
         if '.' in msg_name:
             struct_name, inner_msg_name = msg_name.split('.')
         else:
@@ -265,57 +279,86 @@ class evbsWriter(threading.Thread):
 
         struct_id = int(struct_info[struct_name]['message_id'])
         struct_type = struct_info[struct_name]['message_type']
+        dyn_data_obj = self.dyn_data_obj
 
         if inner_msg_name:
             if struct_type == 'nonBasic' and struct_info[struct_name]['ref'] == 'struct':  # 结构体嵌套
-                inner_struct = self.dyn_data_obj.loan_value(struct_id)  # 指向新的struct内存地址
-                try:
-                    non_basic_type_name = struct_info[struct_name]['nonBasicTypeName']
-                    inner_struct_info = self.dds_xml['types']['dataTypes'][non_basic_type_name]['members']
-                    message_id = int(inner_struct_info[inner_msg_name]['message_id'])
-                    message_type = inner_struct_info[inner_msg_name]['message_type']
-                    self.set_message_value(inner_struct, message_id, msg_value, message_type)
-                finally:
-                    self.dyn_data_obj.return_loaned_value(inner_struct)
-            else:
-                logger.error(f'{self.topic_name} | {struct_name} not a valid Structure nesting format, please check.')
-
-        else:
-            if struct_type == 'nonBasic':  # typedef结构
                 non_basic_type_name = struct_info[struct_name]['nonBasicTypeName']
-                typedef_message_info = self.dds_xml['types']['typedefs'][non_basic_type_name]
-                if 'arrayDimensions' in typedef_message_info.keys():
-                    array_type = 'arrayDimensions'
-                    dimensions = int(typedef_message_info[array_type])
-                    if dimensions != len(msg_value):
-                        logger.error(f'{self.topic_name} | {struct_name} typedef arrayDimensions is {array_type}, but given {len(msg_value)}')
-                        return
-                elif 'sequenceMaxLength' in typedef_message_info.keys():
-                    array_type = 'sequenceMaxLength'
-                    seq_len = int(typedef_message_info[array_type])
-                    if len(msg_value) > seq_len:
-                        logger.error(f'{self.topic_name} | {struct_name} typedef sequenceMaxLength max {seq_len}, but given {len(msg_value)}')
-                        return
-                else:
-                    return
+                inner_struct_info = self.dds_xml['types']['dataTypes'][non_basic_type_name]['members']
+                message_type = inner_struct_info[inner_msg_name]['message_type']
+                setter = self._setter(int(inner_struct_info[inner_msg_name]['message_id']), message_type)
 
-                inner_struct = self.dyn_data_obj.loan_value(struct_id)  # 指向新的struct内存地址
-                try:
-                    message_type = typedef_message_info['type']
-                    for i in range(len(msg_value)):
-                        if array_type == 'sequenceMaxLength':
-                            inner_struct.insert_sequence_data(0)  # 申请 member_id内存空间 todo vbs底层有问题 等待释放
-                        self.set_message_value(inner_struct, i, msg_value[i], message_type)
-                finally:
-                    self.dyn_data_obj.return_loaned_value(inner_struct)
+                def set_struct_member(msg_value):
+                    inner_struct = dyn_data_obj.loan_value(struct_id)  # 指向新的struct内存地址
+                    try:
+                        setter(inner_struct, msg_value)
+                    finally:
+                        dyn_data_obj.return_loaned_value(inner_struct)
+                return set_struct_member
+
+            def invalid_nesting(msg_value):
+                logger.error(f'{self.topic_name} | {struct_name} not a valid Structure nesting format, please check.')
+            return invalid_nesting
+
+        if struct_type != 'nonBasic':  # 基础数据结构
+            setter = self._setter(struct_id, struct_type)
+            return lambda msg_value: setter(dyn_data_obj, msg_value)
+
+        # typedef结构
+        non_basic_type_name = struct_info[struct_name]['nonBasicTypeName']
+        typedef_message_info = self.dds_xml['types']['typedefs'][non_basic_type_name]
+        if 'arrayDimensions' in typedef_message_info:
+            dimensions = int(typedef_message_info['arrayDimensions'])
+            is_sequence = False
+        elif 'sequenceMaxLength' in typedef_message_info:
+            seq_len = int(typedef_message_info['sequenceMaxLength'])
+            is_sequence = True
+        else:
+            return lambda msg_value: None
+        message_type = typedef_message_info['type']
+        set_item = self._setter(0, message_type)
+
+        def set_array(msg_value):
+            if not is_sequence and dimensions != len(msg_value):
+                logger.error(f'{self.topic_name} | {struct_name} typedef arrayDimensions is {dimensions}, but given {len(msg_value)}')
+                return
+            if is_sequence and len(msg_value) > seq_len:
+                logger.error(f'{self.topic_name} | {struct_name} typedef sequenceMaxLength max {seq_len}, but given {len(msg_value)}')
+                return
+            inner_struct = dyn_data_obj.loan_value(struct_id)  # 指向新的struct内存地址
+            try:
+                for i, item in enumerate(msg_value):
+                    if is_sequence:
+                        inner_struct.insert_sequence_data(0)  # 申请 member_id内存空间 todo vbs底层有问题 等待释放
+                    set_item(inner_struct, item, i)
+            finally:
+                dyn_data_obj.return_loaned_value(inner_struct)
+        return set_array
+
+    def write_plan(self, msg_name):
+        plan = self._write_plans.get(msg_name)
+        if plan is None:
+            plan = self._write_plans[msg_name] = self.compile_write_plan(msg_name)
+        return plan
 
-            else:  # 基础数据结构
-                message_id = struct_id
-                message_type = struct_type
-                self.set_message_value(self.dyn_data_obj, message_id, msg_value, message_type)
+    def set_value(self, msg_name, msg_value, member_type=None):
+        with self._write_lock:
+            self.write_plan(msg_name)(msg_value)
+
+    def write_sample(self, values: dict, member_types=None):
+        """
+        一次加锁填充整个sample的多个成员并发送
+        :param values: {成员名: 值}
+        :param member_types: 与RtiDDSWriter保持一致的参数，vbs的成员类型已编译在赋值函数中，不需要
+        """
+        with self._write_lock:
+            for msg_name, msg_value in values.items():
+                self.write_plan(msg_name)(msg_value)
+            self.writer.write(self.dyn_data_obj)
 
     def write(self):
-        self.writer.write(self.dyn_data_obj)
+        with self._write_lock:
+            self.writer.write(self.dyn_data_obj)
 
     def delete(self):
         with _lock:
@@ -323,37 +366,6 @@ class evbsWriter(threading.Thread):
                 self.proxy.DeleteDataWriter_v2(self.participant, self.writer)
                 logger.info(f"release topic DataWriter: {self.topic_name}")
 
-    def stop(self):
-        self._stop_event.set()
-
-    def run(self):
-        self._stop_event.wait()  # 等待直到 _stop_event被设定
-        self.delete()
-
-
-class evbsWriterDoS(evbsWriter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args)
-        self.stop_event = threading.Event()
-        self.interval = kwargs.get('interval', 1)
-
-    def run(self):
-        signal_names = [i.split(':')[-1] for i in self.dds_xml_obj.topic2signal[self.topic_name.lstrip('Topic_')]]
-        while not self.stop_event.is_set():
-            for signal_name in signal_names:
-                signal_value = float(random.randint(0, 2**8-1))
-                try:
-                    self.set_value(signal_name, signal_value)
-                    self.write()
-                except Exception as e:
-                    print(e, f'{self.topic_name} | {signal_name} = {signal_value}')
-                else:
-                    print(f'pub msg: {self.topic_name} | {signal_name} = {signal_value}')
-            time.sleep(self.interval)
-
-    def stop(self):
-        self.stop_event.set()
-
 
 if __name__ == '__main__':
     from protocol.lidds.liddsxmlparser import Parser
@@ -389,7 +401,6 @@ if __name__ == '__main__':
         dyn_data,
         dds_xml_obj
     )
-    reader.start()
 
     # 发消息
     # writer = evbsWriter(
@@ -402,7 +413,6 @@ if __name__ == '__main__':
     #     dyn_data,
     #     dds_xml_obj
     # )
-    # writer.start()
 
     # writer.set_value('MSG_ActuBrkPdlPrsdSts',  1)  # Topic BrakeSystemStatus 不同topic同信号名
     # writer.set_value('m_MUploadCanDataHeader.Timestamp',  2)  # Topic MUploadCanDataRequest 测试结构体嵌套
@@ -414,11 +424,8 @@ if __name__ == '__main__':
     # time.sleep(2)
     # # proxy.DestroyDynamicData(dyn_data)
     #
-    # reader.stop()
-    # writer.stop()
-    #
-    # writer.join()
-    # reader.join()
+    # reader.delete()
+    # writer.delete()
     #
     # # 删topic前多等一会 等reader先删完
     # time.sleep(1)
@@ -3,19 +3,39 @@
 # @Time    : 2023/8/23 10:40
 # @Author  :Liu Xi
 
+import time
 import xml.etree.ElementTree as ET
 from runner.log import logger
+from runner.cache import FileCache
+from protocol.matrix import MatrixIndex
+
+# 解析结果按XML内容哈希缓存到磁盘，解析逻辑或下面的属性变化后需要升级version
+matrix_cache = FileCache('vbs_matrix', version=2)
+INDEX_ATTRS = ('dds_xml', 'matrix', 'struct_names', 'typedef_names', 'prefix')
 
 
 class Parser:
     def __init__(self, xml):
+        self.xml = xml
+        start = time.perf_counter()
+        index = matrix_cache.get(xml, self.build_index)
+        for name in INDEX_ATTRS:
+            setattr(self, name, index[name])
+        self.profiles = self.dds_xml['profiles']
+        self.types = self.dds_xml['types']
+        self.signal_map = self.matrix.signal_map
+        self.signal2type = self.matrix.signal2type
+        self.topic2signal = self.matrix.topic2signal
+        self.dupl_signal_names = self.matrix.dupl_signal_names
+        logger.info(f'load vbs matrix {xml}: {len(self.signal_map)} signals, {time.perf_counter() - start:.3f}s')
+
+    def build_index(self) -> dict:
+        """解析XML，返回需要缓存的索引"""
         self.dds_xml = {}
         self.types = {}
         self.profiles = {}
-        self.signal_map = {}
         self.signal2type = {}
-        self.topic2signal = {}
-        self.dupl_signal_names = []
+        self.matrix = MatrixIndex({}, {}, {}, ())
         self.dds_xml['profiles'] = self.profiles
         self.dds_xml['types'] = self.types
         self.profiles['topics'] = {}
@@ -23,8 +43,7 @@ class Parser:
         self.profiles['data_readers'] = {}
         self.types['dataTypes'] = {}
         self.types['typedefs'] = {}
-        self.xml = xml
-        self.tree = ET.parse(xml)
+        self.tree = ET.parse(self.xml)
         self.root = self.tree.getroot()
         self.struct_names = []
         self.typedef_names = []
@@ -60,6 +79,9 @@ class Parser:
             self.parse_signal2topic()
         except BaseException:
             pass
+        index = {name: getattr(self, name) for name in INDEX_ATTRS}
+        del self.tree, self.root  # 不保留整棵xml树
+        return index
 
     def get_topic_profile_name(self, topic_name):
         return self.profiles['topics'][topic_name]['topic_profile_name']
@@ -94,6 +116,7 @@ class Parser:
             name = struct.get('name')
             if name:
                 self.struct_names.append(name)
+        struct_names, typedef_names = set(self.struct_names), set(self.typedef_names)
         for struct in self.root.iter(f'{self.prefix}struct'):
             try:
                 struct_name = struct.get('name')
@@ -116,9 +139,9 @@ class Parser:
                     if 'nonBasicTypeName' in member.keys():
                         non_basic_type_name = member.get('nonBasicTypeName')
                         self.types['dataTypes'][struct_name]['members'][message_name]['nonBasicTypeName'] = non_basic_type_name
-                        if non_basic_type_name in self.struct_names:
+                        if non_basic_type_name in struct_names:
                             self.types['dataTypes'][struct_name]['members'][message_name]['ref'] = 'struct'
-                        elif non_basic_type_name in self.typedef_names:
+                        elif non_basic_type_name in typedef_names:
                             self.types['dataTypes'][struct_name]['members'][message_name]['ref'] = 'typedef'
                 if topic_name in self.profiles['topics']:
                     if self.profiles['topics'][topic_name]['topic_dataType'] is None:
@@ -230,6 +253,7 @@ class Parser:
         nonBasic 结构体嵌套类型的信号，信号名格式为 message_name.noBasicMemberName
         """
         data_types = self.types['dataTypes']  # struct
+        topic_members = []  # (topic名, 成员名)
         for key, val in data_types.items():
             topic_name = val['topic_name']
             try:
@@ -251,29 +275,13 @@ class Parser:
                         else:
                             signal_name_list.append(signal_name)
 
-                    for signal_name_ in signal_name_list:
-                        if signal_name_ in self.signal_map:  # 信号名相同 topic不同的情况下拼接
-                            if signal_name_ not in self.dupl_signal_names:
-                                self.dupl_signal_names.append(signal_name_)
-                            diff_topic_name = self.signal_map[signal_name_]
-                            self.signal_map.pop(signal_name_, None)
-                            diff_signal_name = f'{diff_topic_name}::{signal_name_}'
-                            self.signal_map[diff_signal_name] = diff_topic_name
-                            self.signal_map[f'{topic_name}::{signal_name_}'] = topic_name
-                        elif signal_name_ in self.dupl_signal_names:
-                            self.signal_map[f'{topic_name}::{signal_name_}'] = topic_name
-                        else:
-                            self.signal_map[signal_name_] = topic_name
+                    topic_members.extend((topic_name, i) for i in signal_name_list)
             except Exception as e:
                 logger.error(f'signal2topic fail: {e}, topic_name: {topic_name}')
+        # 不同topic同一信号名时用 topicName::signalName 标识
+        self.matrix = MatrixIndex.build(topic_members, self.signal2type)
 
-        for k, v in self.signal_map.items():
-            if v not in self.topic2signal:
-                self.topic2signal[v] = [k]
-            else:
-                self.topic2signal[v].append(k)
-
-        print_s = '\n'.join(self.dupl_signal_names)
+        print_s = '\n'.join(sorted(self.matrix.dupl_signal_names))
         logger.info(f'Duplicate signal names:\n{print_s}')
 
 
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 18:20
+# @File    : matrix.py
+
+"""
+DDS矩阵信号索引，vbs(Parser)和rti(ParseXML)两种矩阵解析后都生成同一个 MatrixIndex，由reader/writer共享
+不同topic中出现同名成员时，信号名用 topicName::signalName 标识
+索引分两遍生成: 第一遍统计成员名出现的topic数，第二遍直接按统计结果输出信号名，不再边遍历边修改 signal_map
+"""
+
+from types import MappingProxyType
+
+
+class MatrixIndex:
+    """
+    不可变的信号索引
+        signal_map: {信号名: topic名}
+        signal2type: {成员名: 成员类型}
+        topic2signal: {topic名: (信号名, ...)}
+        dupl_signal_names: 多个topic中都出现的成员名
+    """
+    __slots__ = ('signal_map', 'signal2type', 'topic2signal', 'dupl_signal_names')
+
+    def __init__(self, signal_map, signal2type, topic2signal, dupl_signal_names):
+        object.__setattr__(self, 'signal_map', MappingProxyType(dict(signal_map)))
+        object.__setattr__(self, 'signal2type', MappingProxyType(dict(signal2type)))
+        object.__setattr__(self, 'topic2signal', MappingProxyType({k: tuple(v) for k, v in topic2signal.items()}))
+        object.__setattr__(self, 'dupl_signal_names', frozenset(dupl_signal_names))
+
+    def __setattr__(self, key, value):
+        raise AttributeError('MatrixIndex is immutable')
+
+    def __reduce__(self):
+        # MappingProxyType不能pickle，按普通dict保存，加载时重新包装
+        return MatrixIndex, (dict(self.signal_map), dict(self.signal2type), dict(self.topic2signal), self.dupl_signal_names)
+
+    @classmethod
+    def build(cls, members, signal2type):
+        """
+        :param members: 按矩阵顺序排列的 (topic名, 成员名)，嵌套结构体成员名为 struct.member
+        :param signal2type: {成员名: 成员类型}
+        """
+        members = list(members)
+        topics_of = {}  # 成员名 -> 出现过的topic
+        for topic_name, member_name in members:
+            topics_of.setdefault(member_name, set()).add(topic_name)
+        dupl_signal_names = {name for name, topics in topics_of.items() if len(topics) > 1}
+
+        signal_map = {}
+        topic2signal = {}
+        for topic_name, member_name in members:
+            signal_name = f'{topic_name}::{member_name}' if member_name in dupl_signal_names else member_name
+            if signal_name in signal_map:  # 同一个topic中重复的成员只保留一个
+                continue
+            signal_map[signal_name] = topic_name
+            topic2signal.setdefault(topic_name, []).append(signal_name)
+        return cls(signal_map, signal2type, topic2signal, dupl_signal_names)
+
+    def signal_name(self, topic_name, member_name):
+        """topic成员对应的信号名(Variable名)"""
+        if member_name in self.dupl_signal_names:
+            return f'{topic_name}::{member_name}'
+        return member_name
+
+    @staticmethod
+    def member_name(signal_name):
+        """信号名对应的topic成员名，去掉 topicName:: 前缀"""
+        return signal_name.rpartition('::')[2]
+
+
+if __name__ == '__main__':
+    import pickle
+    index = MatrixIndex.build(
+        [('A', 'speed'), ('A', 'gear'), ('B', 'speed'), ('B', 'S.x'), ('C', 'speed')],
+        {'speed': 'float32', 'gear': 'uint8', 'S': 'nonBasic'}
+    )
+    print(dict(index.signal_map), dict(index.topic2signal), index.dupl_signal_names)
+    print(index.signal_name('B', 'speed'), index.member_name('B::speed'))
+    print(pickle.loads(pickle.dumps(index)).signal_map == index.signal_map)
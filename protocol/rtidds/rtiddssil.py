@@ -6,12 +6,12 @@
 import json
 import time
 import math
-import random
 import threading
 import traceback
 from protocol.rtidds import rticonnextdds_connector as rti
-from runner.log import logger
+from runner.log import logger, hot_log
 from runner.variable import Variable
+from runner.recorder import recorder
 from settings import env
 
 # rti.Connector.set_max_objects_per_thread(65536)
@@ -19,15 +19,96 @@ from settings import env
 _input_lock = threading.RLock()
 _output_lock = threading.Lock()
 
+def _string_value(value):
+    """与整条读取一致，字符串 'NaN' 转成 nan"""
+    return math.nan if value == 'NaN' else value
 
-class RtiDDSReader(threading.Thread):
-    def __init__(self, connector, topic_name, dupl_signal_names=None):
-        super().__init__()
+
+# 扁平topic按字段读取: 成员类型 -> (sample读取方法, 值转换)
+# get_number 返回double，整型转回int与 get_dictionary 保持一致；64位整型超过2^53会丢精度，不按字段读取
+FLAT_FIELD_READERS = {
+    **{t: ('get_number', int) for t in ('int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32', 'byte', 'octet')},
+    **{t: ('get_number', float) for t in ('float32', 'float64')},
+    'boolean': ('get_boolean', bool),
+    'string': ('get_string', _string_value),
+}
+
+
+class RtiDDSDispatcher(threading.Thread):
+    """
+    一个线程等待connector上所有input的数据(Connector.wait)，唤醒后由各topic的reader取数据并解码
+    代替每个topic一个阻塞在 datareader.wait() 上的线程，退出时只需要停止这一个线程
+    """
+    def __init__(self, connector, timeout=500):
+        super().__init__(name='RtiDDSDispatcher', daemon=True)
+        self.connector = connector
+        self.timeout = timeout  # ms，超时后检查退出标志，同时兜底轮询刚注册的reader
+        self._readers = ()  # 写时复制的元组，分发时无需加锁
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def add_reader(self, reader):
+        with self._lock:
+            self._readers = self._readers + (reader,)
+
+    @property
+    def readers(self):
+        return self._readers
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.connector.wait(self.timeout)  # 任意input收到数据即返回
+            except rti.TimeoutError:
+                pass
+            except:
+                logger.error(traceback.format_exc())
+                self._stop_event.wait(self.timeout / 1000)
+            for reader in self._readers:
+                reader.poll()
+        logger.info(f'rti dispatcher exit, readers: {len(self._readers)}')
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+
+class RtiDDSReader:
+    """
+    topic的reader，不再单独占用线程，由 RtiDDSDispatcher 唤醒后调用 poll 取数据
+    持 _input_lock 只做 take 和把sample拷贝成python值，解码、变化检测和信号赋值都在锁外完成
+    成员全是基础类型的topic按字段读取(get_number/get_string/get_boolean)，其余topic整条 get_dictionary
+    """
+    def __init__(self, connector, topic_name, dupl_signal_names=None, members=None):
+        """
+        :param members: 矩阵中topic的成员 {成员名: {'type': 类型, 'collection': 是否数组/序列}}，None时整条读取
+        """
         self.connector = connector
         self.topic_name = topic_name
-        self.duplicate_signal_names = dupl_signal_names if dupl_signal_names else []
+        self.duplicate_signal_names = frozenset(dupl_signal_names or ())
+        self.fields = self.flat_fields(members)
+        self._converters = {name: convert for name, _, convert in self.fields} if self.fields else None
         self.datareader = self.create_datareader()
-        self._is_running = threading.Event()
+        self._last_sample = {}  # 成员名 -> 上一个sample中的值，用于变化检测
+        self._variables = {}  # 成员名 -> Variable
+
+    @staticmethod
+    def flat_fields(members):
+        """
+        扁平topic的字段读取表 ((成员名, 读取方法名, 值转换), ...)，有嵌套、数组、64位整型等成员时返回None
+        """
+        if not members:
+            return None
+        fields = []
+        for name, member in members.items():
+            if member.get('collection'):
+                return None
+            field = FLAT_FIELD_READERS.get(member.get('type'))
+            if field is None:
+                return None
+            fields.append((name, *field))
+        return tuple(fields)
 
     def create_datareader(self):
         # /rt/fsd_hui/city_hu_traffic 特殊的topic名reader只取最后的
@@ -38,88 +119,81 @@ class RtiDDSReader(threading.Thread):
             except rti.Error:
                 raise Exception(f'Failed to create datareader: {topic_name}')
 
-    def is_log_message(self, key, last_value, value):
-        def is_nan(f):
-            return isinstance(f, float) and math.isnan(f)
-
-        # 规则 1: key里有'xcu_system_time_'就不打印
-        if 'xcu_system_time_' in key:
-            return False
+    def take_samples(self) -> list:
+        """
+        持锁取出并拷贝当前所有有效sample，take之后sample的本地内存在下一次take前有效，锁外不能再访问
+        :return: [((成员名, 值), ...), ...]
+        """
+        with _input_lock:
+            self.datareader.take()
+            samples = self.datareader.samples.valid_data_iter
+            if self.fields is None:
+                return [tuple(sample.get_dictionary().items()) for sample in samples]
+            fields = self.fields
+            return [tuple((name, getattr(sample, getter)(name)) for name, getter, _ in fields) for sample in samples]
 
-        # 规则 2: 两个值全为nan的时候不打印
-        if is_nan(last_value) and is_nan(value):
-            return False
+    def _variable(self, key):
+        variable = self._variables.get(key)
+        if variable is None:
+            # 不同topic同一信号名时进行处理
+            new_key = f'{self.topic_name}::{key}' if key in self.duplicate_signal_names else key
+            variable = self._variables[key] = Variable(new_key)
+        return variable
 
-        # 规则 3: 如果两个值都不为nan，且两个值不相等的时候，打印
-        if not is_nan(last_value) and not is_nan(value) and last_value != value:
-            return True
+    def decode(self, sample):
+        """在锁外把一个sample的成员值写入信号"""
+        converters = self._converters
+        last_sample = self._last_sample
+        for key, value in sample:
+            try:
+                if converters is None:
+                    if value == 'NaN':
+                        value = math.nan
+                elif value is not None:
+                    value = converters[key](value)
+                variable = self._variable(key)
+                last_value = last_sample.get(key, variable.Value)
 
-        # 如果以上情况都不满足，默认不打印
-        return False
+                # 特殊信号的值存到自定义信号中便于测试区分，内容不变时不再重复解析json
+                if key == 'msg_all_ecumode_feedback_' and value != last_value:  # 处理车辆模式信号
+                    ecu_mode_data = json.loads(value)
+                    Variable('msg_all_ecumode_feedback_ecumode_XCU').Value = ecu_mode_data[0]['Workmode']
+                    Variable('msg_all_ecumode_feedback_ecumode_HU').Value = ecu_mode_data[1]['Workmode']
+                    Variable('msg_all_ecumode_feedback_ecumode_FSD').Value = ecu_mode_data[2]['Workmode']
+                    Variable('msg_all_ecumode_feedback_ecumode_FBCM').Value = ecu_mode_data[3]['Workmode']
+                    Variable('msg_all_ecumode_feedback_ecumode_RBCM').Value = ecu_mode_data[4]['Workmode']
+                    if len(ecu_mode_data) == 6:
+                        Variable('msg_all_ecumode_feedback_ecumode_Sus').Value = ecu_mode_data[5]['Workmode']
 
-    def run(self):
-        while not self._is_running.is_set():
-            try:
-                self.datareader.wait()  # 阻塞等待数据接收进来
-                with _input_lock:
-                    self.datareader.take()
-                    # # if self.datareader.samples.length:
-                    for sample in self.datareader.samples.valid_data_iter:
-                        pass
-                        data = sample.get_dictionary()
-                        # print(data)
-                        # for key in data.keys():
-                        #     try:
-                        #         value = sample.get_string(key)
-                        #         if value == '"NaN"':
-                        #             value = math.nan
-                        #     except:
-                        #         value = sample.get_number(key)
-                        for key, value in data.items():
-                            try:
-                                if value == 'NaN':
-                                    value = math.nan
-
-                                # 特殊信号的值存到自定义信号中便于测试区分
-                                if key == 'msg_all_ecumode_feedback_':  # 处理车辆模式信号
-                                    ecu_mode_data = json.loads(value)
-                                    Variable('msg_all_ecumode_feedback_ecumode_XCU').Value = ecu_mode_data[0]['Workmode']
-                                    Variable('msg_all_ecumode_feedback_ecumode_HU').Value = ecu_mode_data[1]['Workmode']
-                                    Variable('msg_all_ecumode_feedback_ecumode_FSD').Value = ecu_mode_data[2]['Workmode']
-                                    Variable('msg_all_ecumode_feedback_ecumode_FBCM').Value = ecu_mode_data[3]['Workmode']
-                                    Variable('msg_all_ecumode_feedback_ecumode_RBCM').Value = ecu_mode_data[4]['Workmode']
-                                    if len(ecu_mode_data) == 6:
-                                        Variable('msg_all_ecumode_feedback_ecumode_Sus').Value = ecu_mode_data[5]['Workmode']
-
-                                # 不同topic同一信号名时进行处理
-                                if key in self.duplicate_signal_names:
-                                    new_key = f'{self.topic_name}::{key}'
-                                else:
-                                    new_key = key
-
-                                # 只打印变化的信号值
-                                last_value = Variable(new_key).Value
-                                if self.is_log_message(new_key, last_value, value):
-                                    logger.info(f'接收DDS消息：{self.topic_name} | {key} = {value}')
-                                Variable(new_key).Value = value
-                            except:
-                                logger.error(traceback.format_exc())
+                # 只打印变化的信号值，与该topic上一个sample比较
+                if recorder.log_values:
+                    hot_log.change(variable.name, last_value, value, '接收DDS消息', '接收DDS消息：{} | {} = {}', self.topic_name, key, value)
+                last_sample[key] = value
+                variable.Value = value
+                recorder.record(variable.name, value)
             except:
                 logger.error(traceback.format_exc())
-        logger.info(f'reader exit: {self.topic_name}')
 
-    def stop(self):
-        self._is_running.set()
+    def poll(self):
+        """取出当前所有sample并更新信号，没有数据时 take 返回空"""
+        try:
+            samples = self.take_samples()
+        except:
+            logger.error(traceback.format_exc())
+            return
+        for sample in samples:
+            self.decode(sample)
 
 
-class RtiDDSWriter(threading.Thread):
+class RtiDDSWriter:
+    """
+    topic的writer，由调用方线程直接发送，不需要自己的线程
+    """
     def __init__(self, connector, topic_name):
-        super().__init__()
         # 最好每一个线程一个独立的connector dos测试发现所有线程共用connector会有资源抢占导致崩溃的问题
         self.connector = connector
         self.topic_name = topic_name
         self.datawriter = self.create_datawriter()
-        self._is_running = threading.Event()
 
     def create_datawriter(self):
         # /rt/fsd_hui/city_hu_traffic 特殊的topic名reader只取最后的
@@ -134,81 +208,66 @@ class RtiDDSWriter(threading.Thread):
             except rti.Error:
                 raise Exception(f'Failed to create datawriter: {self.topic_name}')
 
+    def _set_value(self, signal_name, signal_value, member_type=None):
+        """不加锁的赋值，调用方持有 _output_lock"""
+        try:
+            if member_type == 'string':
+                if not isinstance(signal_value, str):
+                    signal_value = json.dumps(signal_value, ensure_ascii=False)
+                self.datawriter.instance.set_string(signal_name, signal_value)
+            elif member_type == 'boolean':
+                self.datawriter.instance.set_boolean(signal_name, signal_value)
+            elif member_type == 'nonBasic':
+                self.datawriter.instance.set_dictionary(signal_value)
+            else:
+                self.datawriter.instance.set_number(signal_name, signal_value)
+
+            # if isinstance(signal_value, str):
+            #     self.datawriter.instance.set_string(signal_name, signal_value)
+            # elif isinstance(signal_value, dict):
+            #     print(signal_value)
+            #     self.datawriter.instance.set_dictionary(signal_value)
+            # else:
+            #     self.datawriter.instance.set_number(signal_name, signal_value)
+            # wait是保证有接收端接收再往下走,不wait就直接发出去就不管了
+            # self.datawriter.wait()
+        except Exception as e:
+            logger.error(e)
+
     def set_value(self, signal_name, signal_value, member_type=None):
         with _output_lock:
-            try:
-                if member_type == 'string':
-                    if not isinstance(signal_value, str):
-                        signal_value = json.dumps(signal_value, ensure_ascii=False)
-                    self.datawriter.instance.set_string(signal_name, signal_value)
-                elif member_type == 'boolean':
-                    self.datawriter.instance.set_boolean(signal_name, signal_value)
-                elif member_type == 'nonBasic':
-                    self.datawriter.instance.set_dictionary(signal_value)
-                else:
-                    self.datawriter.instance.set_number(signal_name, signal_value)
-
-                # if isinstance(signal_value, str):
-                #     self.datawriter.instance.set_string(signal_name, signal_value)
-                # elif isinstance(signal_value, dict):
-                #     print(signal_value)
-                #     self.datawriter.instance.set_dictionary(signal_value)
-                # else:
-                #     self.datawriter.instance.set_number(signal_name, signal_value)
-                # wait是保证有接收端接收再往下走,不wait就直接发出去就不管了
-                # self.datawriter.wait()
-            except Exception as e:
-                logger.error(e)
+            self._set_value(signal_name, signal_value, member_type)
+
+    def write_sample(self, values: dict, member_types=None):
+        """
+        一次加锁填充整个sample的多个成员并发送，避免多线程发送同一个topic时把别人赋值一半的sample发出去
+        :param values: {成员名: 值}
+        :param member_types: {成员名: 成员类型}
+        """
+        member_types = member_types or {}
+        with _output_lock:
+            for signal_name, signal_value in values.items():
+                self._set_value(signal_name, signal_value, member_types.get(signal_name))
+            self.datawriter.write()
 
     def write(self):
         self.datawriter.write()
 
-    def stop(self):
-        self._is_running.set()
-
-    def run(self):
-        self._is_running.wait()
-        logger.info(f'writer exit: {self.topic_name}')
-
-
-class RtiDDSWriterDoS(RtiDDSWriter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args)
-        self.stop_event = threading.Event()
-        self.dds_xml_obj = kwargs.get('dds_xml_obj')
-        self.interval = kwargs.get('interval', 1)
-
-    def run(self):
-        signal_names = [i.split(':')[-1] for i in self.dds_xml_obj.topic2signal[self.topic_name]]
-        while not self.stop_event.is_set():
-            for signal_name in signal_names:
-                signal_value = float(random.randint(0, 2 ** 8 - 1))
-                signal_type = self.dds_xml_obj.signal2type.get(signal_name)
-                try:
-                    self.set_value(signal_name, signal_value, member_type=signal_type)
-                    self.write()
-                except Exception as e:
-                    print(e, f'{self.topic_name} | {signal_name} = {signal_value} | {signal_type}')
-                else:
-                    print(f'pub msg: {self.topic_name} | {signal_name} = {signal_value} | {signal_type}')
-            time.sleep(self.interval)
-
-    def stop(self):
-        self.stop_event.set()
-
 
 if __name__ == '__main__':
     pass
     filepath = r"D:\likun3\Downloads\rti_simulator_configs_new_新版.xml"
     # sub_connector = rti.Connector(config_name="SoaParticipantLibrary::SoaSubParticipant", url=filepath)
+    # dispatcher = RtiDDSDispatcher(sub_connector)
+    # dispatcher.start()
     # dr = RtiDDSReader(sub_connector, topic_name='DDSMapEvent')
-    # dr.start()
+    # dispatcher.add_reader(dr)
     # dr = RtiDDSReader(sub_connector, topic_name='RESSTempData32960')
-    # dr.start()
+    # dispatcher.add_reader(dr)
     # dr = RtiDDSReader(sub_connector, topic_name='DDSRouteLinkInfo')
-    # dr.start()
+    # dispatcher.add_reader(dr)
     # dr = RtiDDSReader(sub_connector, topic_name='ChargingControl')
-    # dr.start()
+    # dispatcher.add_reader(dr)
     #
     # time.sleep(5)
     # pub_connector = rti.Connector(config_name="SoaParticipantLibrary::SoaPubParticipant", url=filepath)
@@ -3,41 +3,76 @@
 # @Time    : 2024/4/26 14:23
 # @File    : rtiddsxmlparser.py
 
+import time
 import xml.etree.ElementTree as ET
 from runner.variable import Variable
 from runner.log import logger
+from runner.cache import FileCache
+from protocol.matrix import MatrixIndex
+
+# 解析结果按XML内容哈希缓存到磁盘，解析逻辑或下面的属性变化后需要升级version
+matrix_cache = FileCache('rti_matrix', version=3)
+INDEX_ATTRS = ('matrix', 'topic_ref', 'reader_topic_names', 'writer_topic_names')
 
 
 class ParseXML:
     def __init__(self, xml_filepath):
         self.xml_filepath = xml_filepath
+        start = time.perf_counter()
+        index = matrix_cache.get(self.xml_filepath, self.build_index)
+        for name in INDEX_ATTRS:
+            setattr(self, name, index[name])
+        self.signal_map = self.matrix.signal_map  # signal: topic
+        self.signal2type = self.matrix.signal2type  # signal: type
+        self.topic2signal = self.matrix.topic2signal  # topic: (signal, )
+        self.dupl_signal_names = self.matrix.dupl_signal_names
+        logger.info(f'load rti matrix {xml_filepath}: {len(self.signal_map)} signals, {time.perf_counter() - start:.3f}s')
+
+    def build_index(self) -> dict:
+        """解析XML，返回需要缓存的索引"""
         self.tree = ET.parse(self.xml_filepath)
         self.root = self.tree.getroot()
-        self.signal_map = {}  # signal: topic
         self.signal2type = {}  # signal: type
-        self.topic2signal = {}  # topic: [signal, ]
         self.topic_ref = {}
-        self.dupl_signal_names = []
+        self.struct_index = self.build_struct_index()
         self.signal2topic()
         # self.parse_topic()
+        self.reader_topic_names = self.parse_topic_names('data_reader')
+        self.writer_topic_names = self.parse_topic_names('data_writer')
+        index = {name: getattr(self, name) for name in INDEX_ATTRS}
+        del self.tree, self.root, self.struct_index  # 不保留整棵xml树
+        return index
+
+    def build_struct_index(self) -> dict:
+        """
+        遍历一次types节点，建立 module::...::struct 路径到struct节点的索引
+        """
+        index = {}
+
+        def walk(element, path):
+            for child in element:
+                name = child.get('name')
+                if child.tag == 'module':
+                    walk(child, f'{path}{name}::')
+                elif child.tag == 'struct':
+                    index.setdefault(f'{path}{name}', child)
+
+        for types in self.root.iter('types'):
+            walk(types, '')
+        return index
 
     def find_struct_by_path(self, path):
         """
         根据types节点下的数据结构表达式，如 soa_messages::msg::dds_::INS_ 找到struct
         """
-        module_names, struct_name = path.split("::")[:-1], path.split("::")[-1]
-        xpath_expr = "."
-        for name in module_names:
-            xpath_expr += f"/module[@name='{name}']"
-        matching_modules = self.root.find('types').findall(xpath_expr)
-        # 在每个匹配的module中查找struct
-        for module_element in matching_modules:
-            struct_element = module_element.find(f"./struct[@name='{struct_name}']")
-            if struct_element is not None:
-                return struct_element
-        return None
+        return self.struct_index.get(path)
+
+    def parse_topic_names(self, tag):
+        """data_reader/data_writer 引用的topic名，去掉 Topic_ 前缀并排序"""
+        return sorted(i.get('topic_ref', '').replace('Topic_', '') for i in self.root.iter(tag))
 
     def signal2topic(self):
+        members = []  # (topic名, 成员名)
         for topic in self.root.findall('.//topic'):
             topic_name = topic.get('name').replace('Topic_', '')
             type_ref = topic.get('register_type_ref')
@@ -47,27 +82,17 @@ class ParseXML:
                 signal_name = member.get('name')
                 _id = member.get('id')
                 _type = member.get('type')
-                self.topic_ref[topic_name]['members'][signal_name] = {'id': _id, 'type': _type}
+                self.topic_ref[topic_name]['members'][signal_name] = {
+                    'id': _id,
+                    'type': _type,
+                    'collection': bool(member.get('arrayDimensions') or member.get('sequenceMaxLength')),  # 数组/序列成员
+                }
                 self.signal2type[signal_name] = _type
-                if signal_name in self.signal_map:  # 信号名相同 topic不同的情况下拼接
-                    if signal_name not in self.dupl_signal_names:
-                        self.dupl_signal_names.append(signal_name)
-                    diff_topic_name = self.signal_map[signal_name]
-                    self.signal_map.pop(signal_name, None)
-                    diff_signal_name = f'{diff_topic_name}::{signal_name}'
-                    self.signal_map[diff_signal_name] = diff_topic_name
-                    self.signal_map[f'{topic_name}::{signal_name}'] = topic_name
-                elif signal_name in self.dupl_signal_names:
-                    self.signal_map[f'{topic_name}::{signal_name}'] = topic_name
-                else:
-                    self.signal_map[signal_name] = topic_name
-        for k, v in self.signal_map.items():
-            if v not in self.topic2signal:
-                self.topic2signal[v] = [k]
-            else:
-                self.topic2signal[v].append(k)
+                members.append((topic_name, signal_name))
+        # 不同topic同一信号名时用 topicName::signalName 标识
+        self.matrix = MatrixIndex.build(members, self.signal2type)
 
-        print_s = '\n'.join(self.dupl_signal_names)
+        print_s = '\n'.join(sorted(self.matrix.dupl_signal_names))
         logger.info(f'Duplicate signal names:\n{print_s}')
 
 
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 11:05
+# @File    : cache.py
+
+"""
+本地磁盘缓存
+以源文件的内容哈希为键保存解析结果(pickle)，源文件的 mtime/size 没变化时连哈希都不用重新计算
+缓存目录: data/cache/<namespace>/
+"""
+
+import os
+import pickle
+import hashlib
+import threading
+from runner.log import logger
+from settings import work_dir
+
+cache_dir = os.path.join(work_dir, 'data', 'cache')
+_lock = threading.Lock()
+
+
+def file_digest(filepath, chunk_size=1024 * 1024):
+    """计算文件内容的sha1"""
+    sha1 = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class FileCache:
+    """
+    按源文件缓存解析结果
+    Args:
+        namespace: 缓存子目录名，不同类型的数据分开存放
+        version: 数据结构版本号，解析逻辑或数据结构变化后需要升级，旧缓存自动失效
+    """
+    def __init__(self, namespace, version=1):
+        self.namespace = namespace
+        self.version = version
+        self.directory = os.path.join(cache_dir, namespace)
+        self.index_path = os.path.join(self.directory, 'index.pkl')
+        self._index = None
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, 'rb') as f:
+                    self._index = pickle.load(f)
+            except Exception:
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self._index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.index_path)
+
+    def digest(self, filepath):
+        """
+        源文件的内容哈希，mtime和size均未变化时直接使用索引中记录的哈希
+        """
+        stat = os.stat(filepath)
+        abs_path = os.path.normcase(os.path.abspath(filepath))
+        with _lock:
+            entry = self._load_index().get(abs_path)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        digest = file_digest(filepath)
+        with _lock:
+            self._load_index()[abs_path] = (stat.st_mtime_ns, stat.st_size, digest)
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._save_index()
+            except Exception as e:
+                logger.warning(f'缓存索引保存失败: {e}')
+        return digest
+
+    def _data_path(self, digest):
+        return os.path.join(self.directory, f'{digest}_v{self.version}.pkl')
+
+    def load(self, digest):
+        """读取缓存，不存在或损坏时返回None"""
+        data_path = self._data_path(digest)
+        if not os.path.exists(data_path):
+            return None
+        try:
+            with open(data_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f'缓存读取失败 {data_path}: {e}')
+            return None
+
+    def save(self, digest, data):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            data_path = self._data_path(digest)
+            tmp_path = f'{data_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, data_path)
+        except Exception as e:
+            logger.warning(f'缓存保存失败: {e}')
+
+    def get(self, filepath, builder):
+        """
+        获取源文件的解析结果，没有缓存或缓存失效时调用 builder() 生成并保存
+        """
+        try:
+            digest = self.digest(filepath)
+        except Exception as e:
+            logger.warning(f'缓存不可用 {filepath}: {e}')
+            return builder()
+        data = self.load(digest)
+        if data is None:
+            data = builder()
+            self.save(digest, data)
+        return data
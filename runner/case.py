@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 11:20
+# @File    : case.py
+
+"""
+用例数据类型与解析(编译)
+excel用例在这里一次性编译成执行计划: 动作行在解析阶段就完成拆分、去空格、信号名提取和信号值转换，
+CaseTester 执行时直接使用编译好的 ActionItem；解析结果按文件哈希缓存到磁盘，用例未修改时不再打开excel
+"""
+
+import os
+import re
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+from datetime import datetime
+from json.decoder import JSONDecodeError
+from typing import List
+from openpyxl import load_workbook
+from runner.log import logger
+from runner.variable import Variable
+from runner.cache import FileCache
+from runner.condition import find_signal_names
+
+NON_DDS_PREFIX = (
+    'SIL_',  'Sw_HandWakeup', 'sql3_', 'A2M_', 'M2A_', 'vss',
+    'ssh_', 'http', 'bsp_', 'eid_fid_', 'db_', 'doip_', 'var_',
+    'cal_', 'cyc_',
+)  # 非dds消息格式
+
+_TEMPLATE_PATTERN = re.compile(r'\{\{\s*([\w]+)\s*\}\}')  # 精准匹配变量名（字母/数字/下划线）
+
+# 执行计划结构变化后需要升级版本号，旧的磁盘缓存自动失效
+PLAN_VERSION = 3
+plan_cache = FileCache('plan', version=PLAN_VERSION)
+
+
+def convert_signal_value(value):
+    """
+    数据类型转换, 这里二进制字符串、十六进制字符串、整型、浮点型，均转为浮点型； 其余支持json类型反序列化成字符串、字典、列表
+    :param value:
+    :return:
+    """
+
+    def replacer(match):
+        var_name = match.group(1)
+        return str(Variable.get_vars().get(var_name, f'{{{{{var_name}}}}}'))  # 变量不存在时保留原标记
+
+    if value.startswith("0b") or value.startswith("0B"):
+        try:
+            return float(int(value[2:], 2))
+        except ValueError:
+            logger.error('转换二进制失败')
+    elif value.startswith("0x") or value.startswith("0X"):
+        try:
+            return float(int(value[2:], 16))
+        except ValueError:
+            logger.error('转换十六进制失败')
+    elif bool(_TEMPLATE_PATTERN.search(str(value))):  # 含{{}}结构
+        try:
+            return _TEMPLATE_PATTERN.sub(replacer, str(value))
+        except:
+            logger.error(f'解析变量值异常: {value}')
+    else:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return json.loads(value.replace('\n', ''))
+            except JSONDecodeError:
+                return value
+
+
+class ActionItem:
+    """
+    编译后的单条动作: 信号名=信号值
+    kind:
+        dds   DDS信号，同一步骤内的多条DDS信号聚合发送
+        vms   SIL_VMS_ 车模式仿真信号
+        tcp   M2A_/A2A_ TCP信号，同一步骤内的多条TCP信号打包成一次发送
+        other 其他非dds信号，逐条发送
+    """
+    __slots__ = ('signal_name', 'value_text', 'kind', 'has_value', 'is_template', 'topic_name', '_value', '_variable')
+
+    def __init__(self, signal_name, value_text, has_value=True):
+        self.signal_name = signal_name
+        self.value_text = value_text
+        self.has_value = has_value
+        if signal_name.startswith(('M2A_', 'A2A_')):  # A2A_ 不在 NON_DDS_PREFIX 中，需要先判断
+            self.kind = 'tcp'
+        elif not signal_name.startswith(NON_DDS_PREFIX):
+            self.kind = 'dds'
+        elif signal_name.startswith('SIL_VMS_'):
+            self.kind = 'vms'
+        else:
+            self.kind = 'other'
+        # 含{{变量}}的值依赖运行时变量，只能在执行时转换
+        self.is_template = bool(_TEMPLATE_PATTERN.search(value_text))
+        self._value = None if self.is_template else convert_signal_value(value_text)
+        self.topic_name = None  # dds信号所在的topic，加载矩阵后由 bind_topics 填充
+        self._variable = None
+
+    def __getstate__(self):
+        # Variable是进程内单例，topic依赖当前矩阵，都不写入缓存
+        return {k: getattr(self, k) for k in self.__slots__ if k not in ('_variable', 'topic_name')}
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+        self.topic_name = None
+        self._variable = None
+
+    @property
+    def variable(self) -> Variable:
+        if self._variable is None:
+            self._variable = Variable(self.signal_name)
+        return self._variable
+
+    def resolve_value(self):
+        """
+        获取信号值，None表示转换失败
+        """
+        if self.is_template:
+            return convert_signal_value(self.value_text)
+        if isinstance(self._value, (list, dict)):
+            return deepcopy(self._value)  # 防止发送后被修改影响下一次执行
+        return self._value
+
+
+def compile_action(action):
+    """
+    把一条动作字符串编译成 ActionItem，空动作返回None
+    """
+    action = str(action).lstrip()
+    if not action.startswith(('ssh_', 'db_')):  # ssh命令可能会有空格或其他符号
+        action = action.replace(' ', '').replace('==', '=')
+    action = action.rstrip(';')
+    if not action:  # 有可能是空字符串
+        return None
+    parts = action.strip().split('=')
+    return ActionItem(
+        signal_name=parts[0].strip(),
+        value_text='='.join(parts[1:]).strip(),  # 复杂的值中可能有 "="
+        has_value=len(parts) > 1
+    )
+
+
+class TestStep:
+    """
+    单条(one row)测试步骤的数据类型
+    """
+    def __init__(
+        self,
+        pre_condition: str,
+        actions: list,
+        wait_condition: str,
+        pass_condition: list,
+        hold_condition: str,
+        row_number: int,
+        heading: str
+    ):
+        self.pre_condition = pre_condition
+        self.actions = actions
+        self.heading = heading
+        self.wait_condition = wait_condition
+        self.pass_condition = pass_condition
+        self.hold_condition = hold_condition
+        self.row_number = row_number
+        self.heading = heading
+        self.evaluation_condition = []  # 实际运行的结果
+        self.time_time = ''
+        self.step_ret = True
+        # actions如果是多个，默认为一组dds信号/一组车模式仿真信号/TCP信号
+        self.multi_action = len(actions) > 1
+        if len(actions) == 1 and (not actions[0] or str(actions[0]) == 'None'):
+            self.action_items = []
+        else:
+            self.action_items = [item for item in map(compile_action, actions) if item is not None]
+
+
+class TestInfo:
+    """
+    一条测试用例的数据类型
+    """
+    def __init__(
+        self,
+        tc_name: str,
+        tc_steps: 'List[TestStep]',
+        tc_ret: bool,
+        tc_title=''
+    ):
+        self.tc_name = tc_name
+        self.tc_title = tc_title
+        self.tc_steps = tc_steps
+        self.tc_ret = tc_ret
+        self.test_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class CaseParser:
+    """
+    解析一个excel(一个模块)下的所有用例
+    """
+    def __init__(self, tc_filepath):
+        self.tc_filepath = tc_filepath
+        self._wb = None
+
+    @property
+    def wb(self):
+        # 有缓存时不需要打开excel; 只读模式按行流式读取，比完整加载快很多且内存占用小
+        if self._wb is None:
+            self._wb = load_workbook(filename=self.tc_filepath, read_only=True)
+        return self._wb
+
+    def close(self):
+        if self._wb is not None:
+            self._wb.close()  # 只读模式会一直占用文件句柄，需要主动关闭
+            self._wb = None
+
+    def parse_run_sheet(self, tc_sheet_name) -> list:
+        """
+        解析要执行的sheet
+        :param tc_sheet_name:
+        :return:
+        """
+        tc_sheet_name = str(tc_sheet_name).replace(' ', '').strip()
+        sheet_numbers = []
+        sheet_ranges = tc_sheet_name.split(";")
+
+        for sheet_range in sheet_ranges:
+            # 如果range中包含"-"符号，则解析出开始和结束的数字
+            if "-" in sheet_range:
+                start, end = map(int, sheet_range.split("-"))
+                # 将开始和结束的数字之间的所有数字加入sheet_numbers
+                for num in range(start, end + 1):
+                    sheet_numbers.append(num)
+            # 如果range为空，则跳过
+            elif sheet_range == "":
+                continue
+            else:
+                sheet_numbers.append(int(sheet_range))
+        # 将数字转换为sheet名称，例如"3"转换为"Sheet3"
+        sheet_names = ["TC" + str(num) for num in sheet_numbers]
+        return sheet_names
+
+    def get_all_testcase(self) -> dict:
+        """
+        获取所有测试用例的数据，以字典形式返回，用例文件未修改时直接读取磁盘缓存。
+        返回结构示例如下：
+            {
+                <tc_sheet_name>: {
+                    "case_name": str,             # 用例名称
+                    "test_steps": List[TestStep]  # 测试步骤对象构成的列表
+                },
+                ...
+            }
+        """
+        return plan_cache.get(self.tc_filepath, self.parse_all_testcase)
+
+    def parse_all_testcase(self) -> dict:
+        """
+        打开excel解析所有测试用例
+        """
+        try:
+            return self._parse_all_testcase()
+        finally:
+            self.close()
+
+    def _parse_all_testcase(self) -> dict:
+        if 'Options' not in self.wb.sheetnames:
+            logger.error('not found Options sheet')
+            return {}
+        option_sheet = self.wb['Options']
+        tc_case = option_sheet['D9'].value
+        if tc_case is None or tc_case == '':
+            logger.error('not found testcase tc')
+
+        all_tc = {}
+        tc_case_sheets = self.parse_run_sheet(tc_case)
+        for tc_name in tc_case_sheets:
+            tc_info = {
+                'case_name': '',
+                'test_steps': []
+            }
+            try:
+                sheet = self.wb[tc_name]
+            except Exception as e:
+                logger.error(f'{e} {self.tc_filepath}: {tc_name} sheet not exists')
+                continue
+            test_steps = []
+            for row_number, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+                if len(row) < 8:
+                    row = tuple(row) + (None,) * (8 - len(row))  # 只读模式下行尾的空单元格可能不返回
+                if row[1] == 'Test case' and not tc_info['case_name']:
+                    tc_info['case_name'] = str(row[2]).strip()
+                if row[1] == 'Test step':
+                    actions = str(row[4]).split('\n')
+                    pass_condition = str(row[6]).split('\n')
+                    test_step = TestStep(
+                        pre_condition=row[3],
+                        actions=actions,
+                        hold_condition=row[7],
+                        wait_condition=row[5],
+                        pass_condition=pass_condition,
+                        row_number=row_number,
+                        heading=row[2]
+                    )
+                    test_steps.append(test_step)
+            tc_info['test_steps'] = test_steps
+            all_tc[tc_name] = tc_info
+        return all_tc
+
+
+def parse_case_file(tc_filepath) -> dict:
+    """
+    进程池工作函数: 解析单个用例文件，不读写缓存(缓存统一由主进程处理)
+    """
+    return CaseParser(tc_filepath).parse_all_testcase()
+
+
+def load_testcases(tc_filepaths, callback=None, max_workers=None) -> list:
+    """
+    批量加载用例文件
+    有磁盘缓存的文件直接读取，其余文件放到进程池中并行解析，结果按传入的文件顺序返回
+    Args:
+        tc_filepaths: 用例文件路径列表
+        callback: pyqt progress信号，用于显示加载进度
+        max_workers: 进程数，默认为cpu核数
+    Returns:
+        [(tc_filepath, all_testcase), ...]
+    """
+    total = len(tc_filepaths)
+    results = [None] * total
+    digests = [None] * total
+    pending = []
+    done = 0
+
+    def report(tc_filepath):
+        if callback:
+            callback.emit(f'加载用例 {done}/{total}: {os.path.basename(tc_filepath)}')
+
+    for i, tc_filepath in enumerate(tc_filepaths):
+        try:
+            digests[i] = plan_cache.digest(tc_filepath)
+            results[i] = plan_cache.load(digests[i])
+        except Exception as e:
+            logger.warning(f'缓存不可用 {tc_filepath}: {e}')
+        if results[i] is None:
+            pending.append(i)
+        else:
+            done += 1
+            report(tc_filepath)
+
+    if len(pending) == 1 or max_workers == 1:
+        for i in pending:
+            results[i] = parse_case_file(tc_filepaths[i])
+            done += 1
+            report(tc_filepaths[i])
+    elif pending:
+        max_workers = min(max_workers or os.cpu_count() or 1, len(pending))
+        logger.info(f'并行解析用例文件 {len(pending)} 个, 进程数 {max_workers}')
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(parse_case_file, tc_filepaths[i]): i for i in pending}
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done += 1
+                report(tc_filepaths[i])
+
+    for i in pending:
+        if digests[i]:
+            plan_cache.save(digests[i], results[i])
+    return list(zip(tc_filepaths, results))
+
+
+def bind_topics(test_steps, signal_map):
+    """
+    按矩阵的 信号名 -> topic名 映射给dds动作填充topic，执行时按topic分组不再逐条查表
+    执行计划按excel哈希缓存，与矩阵无关，因此topic在加载用例时绑定而不是写入缓存
+    """
+    for step in test_steps:
+        for item in step.action_items:
+            if item.kind == 'dds':
+                item.topic_name = signal_map.get(item.signal_name)
+
+
+def collect_signal_names(test_steps):
+    """
+    汇总执行计划中引用的信号，用于在执行前按需创建topic
+    Args:
+        test_steps: TestStep 迭代器
+    Returns:
+        (动作中发送的dds信号名集合, 条件中读取的信号名集合)
+    """
+    action_names = set()
+    read_names = set()
+    for step in test_steps:
+        for item in step.action_items:
+            if item.kind == 'dds':
+                action_names.add(item.signal_name)
+        for condition in (step.wait_condition, step.hold_condition, *(step.pass_condition or ())):
+            if condition and str(condition) != 'None':
+                read_names.update(find_signal_names(condition))
+    return action_names, read_names
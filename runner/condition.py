@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 10:12
+# @File    : condition.py
+
+"""
+PassCondition 编译器
+用例中的每一条通过条件只在第一次执行时解析一次：提取信号名、把表达式转成 AST 并编译成闭包，
+之后每次校验只读取 Variable.Value 并调用闭包，不再做正则匹配、exec 和 eval。
+编译结果按条件原文缓存，压测(press_times)和大批量用例中相同的条件共用同一个对象。
+"""
+
+import re
+import ast
+import json
+import math
+import builtins
+import operator
+import threading
+import time
+from runner.log import logger
+from runner.variable import Variable
+
+_SIGNAL_NAME_PATTERN = re.compile(r'\b[a-zA-Z_][\w\.:]*\b')
+# 时序条件: <表达式> within|during <数字>[ms|s]
+_TEMPORAL_PATTERN = re.compile(r'^(?P<expr>.*\S)\s+(?P<op>within|during)\s+(?P<num>\d+(?:\.\d+)?)\s*(?P<unit>ms|s)?$', re.I)
+_STAYS_PATTERN = re.compile(r'^(\S+)\s+stays\s+(.+)$', re.I)  # X stays 0 -> X==0
+_COUNT_CHANGES_PATTERN = re.compile(r'count\(\s*([^\s()]+)\s+changes\s*\)', re.I)  # count(X changes) -> changes(X)
+
+TRACE_FUNCTIONS = ('rose', 'fell', 'changes')
+_MISSING = object()
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+}
+
+_UNARY_OPS = {
+    ast.Not: operator.not_,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Invert: operator.invert,
+}
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+class _Unsupported(Exception):
+    """表达式中含有闭包编译器不支持的语法，退回到预编译的code对象求值"""
+
+
+def find_signal_names(expression) -> list:
+    """
+    表达式中所有可能是信号名的标识符(包括::和.的变量名)，不检查是否存在
+    """
+    return _SIGNAL_NAME_PATTERN.findall(str(expression))
+
+
+def resolve_signal_name(expression):
+    """
+    提取表达式中第一个已存在的全局信号名(包括::和.的变量名)
+    """
+    matches = _SIGNAL_NAME_PATTERN.findall(expression)
+    if not matches:
+        raise Exception("未找到任何合法变量名")
+    for name in matches:
+        if Variable.check_existence(name):
+            return name
+    raise Exception(f'未找到有效的信号名')
+
+
+def normalize_value(real_value, has_nan=False):
+    """
+    实际值预处理，与原先 eval 方式保持一致
+    1. 条件中有 nan 时，实际值 nan 转成字符串 'nan' 比较（任何值与 NaN 相比都会返回False，包括 NaN == NaN）
+    2. EEA2.0 rti中接收的数值可能是字符串 需要转成float类型或json进行比较
+    3. 列表中的 nan 元素转成字符串 'nan'
+    """
+    if has_nan and isinstance(real_value, float) and math.isnan(real_value):
+        real_value = 'nan'
+    if isinstance(real_value, str) and real_value != 'nan':
+        try:
+            real_value = float(real_value)
+        except ValueError:
+            try:
+                real_value = json.loads(real_value)
+            except ValueError:
+                pass
+    if isinstance(real_value, list):
+        real_value = ['nan' if isinstance(i, float) and math.isnan(i) else i for i in real_value]
+    return real_value
+
+
+class _ClosureCompiler:
+    """
+    把 AST 节点编译成 fn(value, trace) 形式的闭包，value 为当前信号的实际值，
+    trace 为时序条件的统计状态(_Trace)，普通条件为None
+    """
+    def __init__(self, safe_name):
+        self.safe_name = safe_name
+        self.has_nan = False
+        self.uses_trace = False
+
+    def compile(self, node):
+        method = getattr(self, f'visit_{type(node).__name__}', None)
+        if method is None:
+            raise _Unsupported(type(node).__name__)
+        return method(node)
+
+    def visit_Expression(self, node):
+        return self.compile(node.body)
+
+    def visit_Constant(self, node):
+        const = node.value
+        return lambda v, t: const
+
+    def visit_Name(self, node):
+        if node.id == self.safe_name:
+            return lambda v, t: v
+        if node.id == 'nan':
+            # 条件中的 nan 统一按字符串比较
+            self.has_nan = True
+            return lambda v, t: 'nan'
+        if hasattr(builtins, node.id):
+            obj = getattr(builtins, node.id)
+            return lambda v, t: obj
+        raise NameError(f"name '{node.id}' is not defined")
+
+    def visit_Compare(self, node):
+        left = self.compile(node.left)
+        pairs = [(_COMPARE_OPS[type(op)], self.compile(comp)) for op, comp in zip(node.ops, node.comparators)]
+        if len(pairs) == 1:
+            op, right = pairs[0]
+            return lambda v, t: op(left(v, t), right(v, t))
+
+        def compare_chain(v, t):
+            a = left(v, t)
+            for _op, _right in pairs:
+                b = _right(v, t)
+                if not _op(a, b):
+                    return False
+                a = b
+            return True
+        return compare_chain
+
+    def visit_BoolOp(self, node):
+        values = [self.compile(i) for i in node.values]
+        if isinstance(node.op, ast.And):
+            def bool_and(v, t):
+                result = True
+                for fn in values:
+                    result = fn(v, t)
+                    if not result:
+                        return result
+                return result
+            return bool_and
+
+        def bool_or(v, t):
+            result = False
+            for fn in values:
+                result = fn(v, t)
+                if result:
+                    return result
+            return result
+        return bool_or
+
+    def visit_UnaryOp(self, node):
+        op = _UNARY_OPS.get(type(node.op))
+        if op is None:
+            raise _Unsupported(type(node.op).__name__)
+        operand = self.compile(node.operand)
+        return lambda v, t: op(operand(v, t))
+
+    def visit_BinOp(self, node):
+        op = _BIN_OPS.get(type(node.op))
+        if op is None:
+            raise _Unsupported(type(node.op).__name__)
+        left, right = self.compile(node.left), self.compile(node.right)
+        return lambda v, t: op(left(v, t), right(v, t))
+
+    def visit_Subscript(self, node):
+        value, index = self.compile(node.value), self.compile(node.slice)
+        return lambda v, t: value(v, t)[index(v, t)]
+
+    def visit_Slice(self, node):
+        lower = self.compile(node.lower) if node.lower else (lambda v, t: None)
+        upper = self.compile(node.upper) if node.upper else (lambda v, t: None)
+        step = self.compile(node.step) if node.step else (lambda v, t: None)
+        return lambda v, t: slice(lower(v, t), upper(v, t), step(v, t))
+
+    def visit_Attribute(self, node):
+        value, attr = self.compile(node.value), node.attr
+        return lambda v, t: getattr(value(v, t), attr)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id in TRACE_FUNCTIONS:
+            # rose(X) / fell(X) / changes(X) 取的是信号在时间窗口内的统计值，而不是当前值
+            if len(node.args) != 1 or not isinstance(node.args[0], ast.Name) or node.args[0].id != self.safe_name:
+                raise ValueError(f'{node.func.id}() 的参数只能是条件中的信号名')
+            self.uses_trace = True
+            attr = node.func.id
+            return lambda v, t: getattr(t, attr)
+        if node.keywords or any(isinstance(i, ast.Starred) for i in node.args):
+            raise _Unsupported('Call')
+        func = self.compile(node.func)
+        args = [self.compile(i) for i in node.args]
+        return lambda v, t: func(v, t)(*[a(v, t) for a in args])
+
+    def visit_List(self, node):
+        elts = [self.compile(i) for i in node.elts]
+        return lambda v, t: [e(v, t) for e in elts]
+
+    def visit_Tuple(self, node):
+        elts = [self.compile(i) for i in node.elts]
+        return lambda v, t: tuple(e(v, t) for e in elts)
+
+    def visit_Set(self, node):
+        elts = [self.compile(i) for i in node.elts]
+        return lambda v, t: {e(v, t) for e in elts}
+
+    def visit_Dict(self, node):
+        if any(k is None for k in node.keys):
+            raise _Unsupported('Dict')
+        items = [(self.compile(k), self.compile(val)) for k, val in zip(node.keys, node.values)]
+        return lambda v, t: {k(v, t): val(v, t) for k, val in items}
+
+
+class PassCondition:
+    """
+    编译后的单条通过条件
+    除普通比较外支持时序条件，时间窗口从步骤开始(发送Actions之前)计算:
+        X==1 within 500ms       窗口内任意时刻满足即通过
+        X==0 during 2s          窗口内始终满足才通过，X stays 0 during 2s 为同义写法
+        rose(X) / fell(X)       窗口内信号值出现过上升/下降
+        changes(X) >= 3         窗口内信号值变化次数，count(X changes) 为同义写法
+    rose/fell/changes 不带 within/during 时窗口截止到校验时刻
+    """
+    def __init__(self, text):
+        self.text = text
+        expression, self.temporal, self.window_ns = parse_temporal(text)
+        self.signal_name = resolve_signal_name(expression)
+        self.variable = Variable(self.signal_name)
+        # 通过替换无效字符创建一个有效的Python变量名
+        self.safe_name = self.signal_name.replace('::', '__').replace('.', '_')
+        expression = expression.replace(self.signal_name, self.safe_name).strip()
+        tree = ast.parse(expression, mode='eval')
+        compiler = _ClosureCompiler(self.safe_name)
+        try:
+            self._fn = compiler.compile(tree)
+            self.has_nan = compiler.has_nan
+            self.uses_trace = compiler.uses_trace
+        except _Unsupported:
+            # 少见语法(如推导式、lambda)只在这里编译一次，校验时直接执行code对象
+            code = compile(tree, '<PassCondition>', 'eval')
+            safe_name = self.safe_name
+            names = {i.id for i in ast.walk(tree) if isinstance(i, ast.Name)}
+
+            def fallback(v, t):
+                local_vars = {safe_name: v, 'nan': 'nan'}
+                if t is not None:
+                    local_vars.update({name: (lambda _, _name=name: getattr(t, _name)) for name in TRACE_FUNCTIONS})
+                return eval(code, {}, local_vars)
+            self._fn = fallback
+            self.has_nan = 'nan' in names
+            self.uses_trace = bool(names & set(TRACE_FUNCTIONS))
+
+    @property
+    def is_stateful(self):
+        """是否需要按时间窗口统计信号历史，需要通过 monitor() 校验"""
+        return self.temporal is not None or self.uses_trace
+
+    def evaluate(self, real_value, trace=None):
+        """
+        用给定的实际值计算条件结果
+        """
+        return self._fn(normalize_value(real_value, self.has_nan), trace)
+
+    def check(self):
+        """
+        读取信号当前值并计算条件结果
+        Returns:
+            (结果, 实际值)
+        """
+        if self.is_stateful:
+            raise Exception(f'时序条件需要指定时间窗口起点: {self.text}')
+        real_value = self.variable.Value
+        return self.evaluate(real_value), real_value
+
+    def monitor(self, anchor_ns) -> 'ConditionMonitor':
+        """
+        创建从 anchor_ns(time.perf_counter_ns()) 开始的时序校验器，应在窗口起点(步骤开始时)创建，用完后 close()
+        """
+        return ConditionMonitor(self, anchor_ns)
+
+
+def parse_temporal(text):
+    """
+    拆分条件中的时序部分
+    Returns:
+        (比较表达式, 'within'/'during'/None, 窗口长度ns)
+    """
+    text = str(text).strip()
+    temporal, window_ns = None, None
+    match = _TEMPORAL_PATTERN.match(text)
+    if match:
+        text, temporal = match.group('expr'), match.group('op').lower()
+        unit = (match.group('unit') or 's').lower()
+        window_ns = int(float(match.group('num')) * (1e6 if unit == 'ms' else 1e9))
+    text = _STAYS_PATTERN.sub(r'\1==\2', text)
+    text = _COUNT_CHANGES_PATTERN.sub(r'changes(\1)', text)
+    return text, temporal, window_ns
+
+
+class _Trace:
+    """
+    时间窗口内信号值的增量统计，每个采样只处理一次
+    """
+    __slots__ = ('last', 'samples', 'changes', 'rose', 'fell')
+
+    def __init__(self):
+        self.last = _MISSING
+        self.samples = 0
+        self.changes = 0
+        self.rose = False
+        self.fell = False
+
+    def feed(self, value):
+        last, self.last = self.last, value
+        self.samples += 1
+        if last is _MISSING or value == last:
+            return
+        self.changes += 1
+        try:
+            if value > last:
+                self.rose = True
+            elif value < last:
+                self.fell = True
+        except TypeError:  # 不可比较大小的值(如字符串和数字)只统计变化次数
+            pass
+
+
+class ConditionMonitor:
+    """
+    一条 PassCondition 在一次步骤执行中的增量校验器
+    在步骤开始(发送Actions之前)创建并订阅信号，每次赋值时在赋值线程中从信号历史环形缓冲区取出新采样，
+    逐个喂给 _Trace 并计算条件；within 窗口内满足一次即通过，during 窗口内不满足一次即失败，结论确定后不再计算
+    每次赋值后立即读取，历史缓冲区只需要容纳两次读取之间的赋值；仍有采样被覆盖时结论不可信，判为失败并标记 inconclusive
+    用完后需要 close() 取消订阅
+    """
+    def __init__(self, condition: PassCondition, anchor_ns):
+        self.condition = condition
+        self.variable = condition.variable
+        self.anchor_ns = anchor_ns
+        self.deadline_ns = None if condition.window_ns is None else anchor_ns + condition.window_ns
+        self.trace = _Trace()
+        self.verdict = None  # None: 还不能确定
+        self.inconclusive = False  # 窗口内有采样丢失，verdict 为 False
+        self.real_value = None
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        with self._lock:
+            self.variable.subscribe(self._on_change)
+            # 窗口起点时的信号值也算作一个采样
+            start = self.variable.value_at(anchor_ns)
+            if start is None:
+                # 起点之前没有记录: 信号在起点之后才创建(按需创建的dds信号、动作中新建的var_信号)，
+                # 从创建时的初始值开始处理；若之后的记录已被覆盖，_pull 会判为结果不确定
+                self._seq = 0
+            else:
+                self.feed(anchor_ns, start)
+                self._seq = self.variable.history_seq(anchor_ns + 1)  # 下一个要处理的历史记录序号
+            self._pull()
+
+    def _on_change(self, variable, new_value):
+        self.update()
+        self._changed.set()
+
+    def close(self):
+        self.variable.unsubscribe(self._on_change)
+        self._changed.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _set_inconclusive(self):
+        if self.verdict is None:
+            self.verdict = False
+            self.inconclusive = True
+            logger.error(f'{self.condition.text}: 信号赋值过于频繁，窗口内部分历史值已被覆盖，结果不确定，请增大 history_depth')
+
+    def _pull(self):
+        """取出上次处理之后的新采样(只复制新增部分)并处理，调用方持有 self._lock"""
+        if self.verdict is not None:
+            return
+        records, self._seq, lost = self.variable.history_after(self._seq)
+        if lost:
+            self._set_inconclusive()
+            return
+        for t, value in records:
+            if self.feed(t, value) is not None:
+                return
+
+    def feed(self, timestamp, value):
+        """
+        处理一个采样，窗口结束之后的采样不处理；比较时抛出异常(如信号值还未到达时取下标)按不满足处理
+        Returns:
+            True/False 已确定的结论，None 表示需要继续等待
+        """
+        if self.verdict is not None or (self.deadline_ns is not None and timestamp > self.deadline_ns):
+            return self.verdict
+        condition = self.condition
+        self.real_value = value
+        self.trace.feed(normalize_value(value, condition.has_nan))
+        try:
+            result = condition.evaluate(value, self.trace)
+        except Exception:
+            result = False
+        if condition.temporal == 'within' and result:
+            self.verdict = True
+        elif condition.temporal == 'during' and not result:
+            self.verdict = False
+        return self.verdict
+
+    def update(self, now_ns=None):
+        """
+        处理新的采样，并判断窗口是否已结束
+        Returns:
+            True/False 已确定的结论，None 表示需要继续等待
+        """
+        with self._lock:
+            self._pull()
+            if self.verdict is None and self.deadline_ns is not None:
+                now_ns = time.perf_counter_ns() if now_ns is None else now_ns
+                if now_ns >= self.deadline_ns:
+                    # 窗口结束: within 一直未满足则失败，during 一直满足则通过
+                    self.verdict = self.condition.temporal == 'during'
+            return self.verdict
+
+    def current(self):
+        """
+        不带时间窗口的 rose/fell/changes 条件，以当前统计值计算结果，采样丢失时为False
+        """
+        self.update()
+        if self.inconclusive:
+            return False
+        return bool(self.condition.evaluate(self.variable.Value, self.trace))
+
+    def remaining(self, now_ns=None):
+        """距离窗口结束的秒数，没有窗口时返回None"""
+        if self.deadline_ns is None:
+            return None
+        now_ns = time.perf_counter_ns() if now_ns is None else now_ns
+        return max(self.deadline_ns - now_ns, 0) / 1e9
+
+    def result(self):
+        """
+        阻塞直到得出结论，信号赋值时由订阅回调处理新采样并唤醒，最长等待到窗口结束
+        Returns:
+            (结果, 最后处理的信号值)
+        """
+        if self.deadline_ns is None:
+            return self.current(), self.variable.Value
+        while True:
+            self._changed.clear()
+            if self.update() is not None:
+                return self.verdict, self.real_value
+            self._changed.wait(self.remaining())
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def compile_condition(text) -> PassCondition:
+    """
+    按条件原文获取编译后的 PassCondition，解析失败时抛出异常且不缓存
+    """
+    condition = _cache.get(text)
+    if condition is None:
+        condition = PassCondition(text)
+        with _cache_lock:
+            condition = _cache.setdefault(text, condition)
+    return condition
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+if __name__ == '__main__':
+    Variable('MSG_Test::a.b', 1.0)
+    Variable('MSG_Arr', [1, 2, float('nan')])
+    Variable('MSG_Nan', float('nan'))
+    for expr in ['MSG_Test::a.b==1', 'MSG_Arr[0:2]==[1,2]', 'MSG_Arr[2]==nan', 'MSG_Nan==nan',
+                 'len(MSG_Arr)==3', '0<MSG_Test::a.b<=1', 'MSG_Test::a.b in (1, 2) and not MSG_Test::a.b == 2']:
+        print(expr, compile_condition(expr).check())
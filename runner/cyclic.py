@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 21:10
+# @File    : cyclic.py
+
+"""
+周期发送调度器，模拟ECU的周期报文(10/20/100ms)
+- 一个调度线程按下次发送时间维护最小堆，到点后直接在调度线程中发送，所有周期任务共用这一个线程
+- 发送时间按 注册时间 + n * 周期 计算(漂移补偿)，单次发送耗时不会累积到后面的周期
+- 落后超过一个周期时跳过过期的周期并计入skipped，不会补发
+- 每个任务的统计(实际频率、失败次数、抖动)沿用 loadgen.TopicLoad
+用例中通过 cyc_ 信号控制:
+    cyc_信号名=100     以100ms周期发送信号当前值，发送期间用例修改信号值后下一个周期生效
+    cyc_topic名=20     以20ms周期发送整个topic
+    cyc_信号名=0       停止发送
+    cyc_all=0          停止所有周期发送
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from runner.log import logger
+from runner.loadgen import TopicLoad, SPIN_NS
+
+
+class CyclicScheduler:
+    """
+    用法:
+        scheduler = CyclicScheduler()
+        scheduler.add('MSG_XXX', 100, lambda: dds_connector.dds_multi_send(topic, {'MSG_XXX': 1}, log=False))
+        scheduler.remove('MSG_XXX')  # 停止并打印抖动统计
+        scheduler.stop()
+    """
+
+    def __init__(self):
+        self.tasks = {}  # 任务名 -> TopicLoad
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()  # 任务变化或退出时唤醒调度线程
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add(self, name, period_ms, send):
+        """
+        注册周期任务，同名任务已存在时替换(按新的周期重新计时)
+        :param name: 任务名，信号名或topic名
+        :param period_ms: 发送周期(ms)
+        :param send: 发送函数，无参数，异常计入发送失败
+        """
+        if period_ms <= 0:
+            raise ValueError(f'{name} 发送周期必须大于0: {period_ms}')
+        load = TopicLoad(name, 1000 / period_ms, send)
+        load.start_ns = time.perf_counter_ns()
+        with self._lock:
+            old = self.tasks.get(name)
+            self.tasks[name] = load
+            heapq.heappush(self._heap, (load.next_fire_ns(), next(self._seq), load))
+        if old is not None:
+            self.log_task(old)
+        logger.info(f'周期发送开始: {name}, 周期 {period_ms}ms')
+        self._start()
+        self._wakeup.set()
+        return load
+
+    def remove(self, name):
+        """停止一个周期任务并打印统计，任务不存在时返回None"""
+        with self._lock:
+            load = self.tasks.pop(name, None)
+        if load is not None:
+            logger.info(f'周期发送停止: {name}')
+            self.log_task(load)
+        return load
+
+    def remove_all(self):
+        with self._lock:
+            loads = list(self.tasks.values())
+            self.tasks.clear()
+            self._heap.clear()
+        for load in loads:
+            logger.info(f'周期发送停止: {load.name}')
+            self.log_task(load)
+        return loads
+
+    def _start(self):
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._schedule, name='cyclic-scheduler', daemon=True)
+        self._thread.start()
+
+    def _next_due(self):
+        """堆顶的有效任务，已移除或被替换的任务直接丢弃"""
+        heap = self._heap
+        while heap and self.tasks.get(heap[0][2].name) is not heap[0][2]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _schedule(self):
+        while not self._stop_event.is_set():
+            self._wakeup.clear()
+            with self._lock:
+                due = self._next_due()
+            if due is None:
+                self._wakeup.wait()
+                continue
+            fire_ns, _, load = due
+            delta = fire_ns - time.perf_counter_ns()
+            if delta > SPIN_NS:
+                self._wakeup.wait((delta - SPIN_NS) / 1e9)
+                continue
+            if delta > 0:
+                time.sleep(0)
+                continue
+            with self._lock:
+                if self._next_due() is not due:  # 等待期间任务有变化
+                    continue
+                heapq.heappop(self._heap)
+            load.run(fire_ns)
+            load.fires += 1
+            # 落后超过一个周期时直接跳到下一个未过期的发送时间
+            behind = (time.perf_counter_ns() - load.next_fire_ns()) // load.period_ns
+            if behind > 0:
+                load.fires += behind
+                load.skipped += behind
+            with self._lock:
+                if self.tasks.get(load.name) is load:
+                    heapq.heappush(self._heap, (load.next_fire_ns(), next(self._seq), load))
+
+    def stop(self):
+        """停止所有任务并退出调度线程"""
+        self.remove_all()
+        self._stop_event.set()
+        self._wakeup.set()
+        if self.is_running:
+            self._thread.join()
+        self._thread = None
+
+    @staticmethod
+    def task_report(load) -> dict:
+        elapsed_s = (time.perf_counter_ns() - load.start_ns) / 1e9
+        row = load.report(elapsed_s)
+        row['period_ms'] = round(load.period_ns / 1e6, 3)
+        return row
+
+    def report(self) -> list:
+        with self._lock:
+            loads = list(self.tasks.values())
+        return [self.task_report(load) for load in loads]
+
+    def log_task(self, load):
+        row = self.task_report(load)
+        logger.info(
+            f"周期发送统计 {row['topic']} | period {row['period_ms']} ms | target {row['target_hz']} Hz | "
+            f"achieved {row['achieved_hz']} Hz | sent {row['sent']} | errors {row['errors']} | skipped {row['skipped']} | "
+            f"jitter mean {row['jitter_mean_ms']} ms p99 {row['jitter_p99_ms']} ms max {row['jitter_max_ms']} ms"
+            + (f" | {row['last_error']}" if row['last_error'] else '')
+        )
+        return row
+
+
+if __name__ == '__main__':
+    counter = {'fast': 0, 'slow': 0}
+    scheduler = CyclicScheduler()
+    scheduler.add('fast', 10, lambda: counter.__setitem__('fast', counter['fast'] + 1))
+    scheduler.add('slow', 100, lambda: counter.__setitem__('slow', counter['slow'] + 1))
+    time.sleep(1)
+    scheduler.remove('slow')
+    time.sleep(0.5)
+    print(counter)
+    scheduler.stop()
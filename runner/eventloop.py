@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 16:10
+# @File    : eventloop.py
+
+"""
+全局共享的asyncio事件循环
+事件循环运行在一个后台守护线程中，各个asyncio实现的connector都注册到这一个循环上，不再每个connector单独开线程轮询
+同步代码(CaseTester、pyqt线程)通过 run_coroutine / call_soon 线程安全地提交任务
+"""
+
+import asyncio
+import threading
+from runner.log import logger
+
+_loop = None
+_thread = None
+_lock = threading.Lock()
+
+
+def _run(loop, started):
+    asyncio.set_event_loop(loop)
+    started.set()
+    try:
+        loop.run_forever()
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+            logger.info('asyncio事件循环线程退出')
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """获取共享事件循环，第一次调用时启动事件循环线程"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            started = threading.Event()
+            _thread = threading.Thread(target=_run, args=(_loop, started), name='asyncio-loop', daemon=True)
+            _thread.start()
+            started.wait()
+        return _loop
+
+
+def in_loop_thread() -> bool:
+    """当前是否在事件循环线程中，事件循环线程中不能阻塞等待自己的任务"""
+    return _thread is not None and threading.current_thread() is _thread
+
+
+def run_coroutine(coro, timeout=None):
+    """
+    在共享事件循环中执行协程并阻塞等待结果，协程中的异常会在调用线程中抛出
+    :param timeout: 超时时间(秒)，超时抛出 TimeoutError 并取消协程
+    """
+    if in_loop_thread():
+        raise RuntimeError('不能在事件循环线程中同步等待协程')
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+def submit(coro):
+    """在共享事件循环中执行协程，不等待，返回 concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def call_soon(callback, *args):
+    """在事件循环线程中执行普通函数"""
+    get_event_loop().call_soon_threadsafe(callback, *args)
+
+
+def stop_event_loop():
+    global _loop
+    with _lock:
+        if _loop is not None and not _loop.is_closed():
+            _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None
+
+
+if __name__ == '__main__':
+    async def demo(x):
+        await asyncio.sleep(0.1)
+        return x * 2
+    print(run_coroutine(demo(21)))
+    print(submit(demo(1)).result())
+    stop_event_loop()
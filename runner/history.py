@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 14:40
+# @File    : history.py
+
+"""
+信号历史环形缓冲区
+每个信号按 (time.perf_counter_ns(), value) 记录最近 depth 次赋值，缓冲区在创建时一次性分配，写满后覆盖最旧的记录
+时间戳用 perf_counter_ns 而不是 monotonic_ns，windows下 monotonic 的精度只有15ms左右
+第一个值是float时存放在 array('d') 中，是int64范围内的int(不含bool)时存放在 array('q') 中，其余存放在list中
+之后出现数组不能原样表示的值(如 'd' 中的int/bool、'q' 中的float或超出int64的int)时整体转成list，读出的值与赋值时类型一致
+按时间范围查询时用二分查找定位起止位置，只复制命中的区间
+"""
+
+from array import array
+from settings import env
+
+DEFAULT_HISTORY_DEPTH = 32
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def history_depth(name) -> int:
+    """
+    按信号名前缀获取历史深度，配置示例(settings.yaml):
+        history_depth:
+          default: 32
+          A2M_: 256
+          vss: 16
+    多个前缀匹配时取最长的前缀，dds信号没有固定前缀，使用 default
+    """
+    configs = env.history_depth
+    if isinstance(configs, int):
+        return max(configs, 1)
+    if not isinstance(configs, dict):
+        return DEFAULT_HISTORY_DEPTH
+    depth = configs.get('default', DEFAULT_HISTORY_DEPTH)
+    matched = ''
+    for prefix, value in configs.items():
+        if prefix != 'default' and name.startswith(prefix) and len(prefix) > len(matched):
+            matched, depth = prefix, value
+    return max(int(depth), 1)
+
+
+class SignalHistory:
+    """
+    定长环形缓冲区，本身不加锁，由 Variable 在自己的锁内读写
+    时间戳按写入顺序单调不减，因此可以二分查找
+    """
+    __slots__ = ('depth', 'count', '_times', '_values')
+
+    def __init__(self, depth, timestamp, value):
+        self.depth = depth
+        self.count = 0  # 累计写入次数
+        self._times = array('q', bytes(8 * depth))
+        typecode = self._typecode(value)
+        if typecode is None:
+            self._values = [None] * depth
+        else:
+            self._values = array(typecode, bytes(8 * depth))
+        self.append(timestamp, value)
+
+    @staticmethod
+    def _typecode(value):
+        """能原样存入数组的值对应的数组类型，不能时返回None"""
+        if isinstance(value, float):
+            return 'd'
+        if isinstance(value, int) and not isinstance(value, bool) and INT64_MIN <= value <= INT64_MAX:
+            return 'q'
+        return None
+
+    def __len__(self):
+        return min(self.count, self.depth)
+
+    def append(self, timestamp, value):
+        values = self._values
+        if type(values) is array and self._typecode(value) != values.typecode:
+            self._values = values.tolist()  # 数组不能原样表示时转成list，之前的记录类型不变
+        i = self.count % self.depth
+        self._times[i] = timestamp
+        self._values[i] = value
+        self.count += 1
+
+    def _slot(self, n):
+        """逻辑序号(0为保留的最旧记录)转换成缓冲区下标"""
+        return (self.count - len(self) + n) % self.depth
+
+    def _bisect(self, timestamp, right=False):
+        """
+        返回第一个时间戳 >= timestamp (right=True 时为 > timestamp) 的逻辑序号
+        """
+        lo, hi = 0, len(self)
+        times = self._times
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = times[self._slot(mid)]
+            if t < timestamp or (right and t == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def range(self, since=None, until=None) -> list:
+        """
+        获取时间范围 [since, until] 内的记录，按时间先后排列
+        :return: [(perf_counter_ns, value), ...]
+        """
+        start = 0 if since is None else self._bisect(since)
+        end = len(self) if until is None else self._bisect(until, right=True)
+        times, values = self._times, self._values
+        result = []
+        for n in range(start, end):
+            i = self._slot(n)
+            result.append((times[i], values[i]))
+        return result
+
+    def value_at(self, timestamp):
+        """
+        获取 timestamp 时刻的信号值，即该时刻之前最后一次赋值
+        :return: (perf_counter_ns, value)，早于保留的最旧记录时返回None
+        """
+        n = self._bisect(timestamp, right=True)
+        if n == 0:
+            return None
+        i = self._slot(n - 1)
+        return self._times[i], self._values[i]
+
+    def first_seq(self):
+        """保留的最旧记录的序号，序号为该记录是第几次写入(从0开始)"""
+        return self.count - len(self)
+
+    def seq_of(self, timestamp):
+        """第一条时间戳 >= timestamp 的记录的序号，没有时为下一次写入的序号"""
+        return self.first_seq() + self._bisect(timestamp)
+
+    def after(self, seq):
+        """
+        获取序号 >= seq 的记录，用于增量读取(时间戳可能相同，按序号读取不会漏掉记录)
+        :return: (记录列表, 下一次读取的序号, 是否有记录已被覆盖)
+        """
+        first = self.first_seq()
+        lost = seq < first
+        times, values = self._times, self._values
+        result = []
+        for n in range(max(seq, first), self.count):
+            i = n % self.depth
+            result.append((times[i], values[i]))
+        return result, self.count, lost
+
+    def oldest(self):
+        """保留的最旧记录的时间戳"""
+        return self._times[self._slot(0)]
+
+
+if __name__ == '__main__':
+    h = SignalHistory(4, 0, 0)
+    for t in range(1, 7):
+        h.append(t * 10, t)
+    print(len(h), h.range(), h.range(since=35), h.range(since=30, until=50))
+    print(h.value_at(45), h.value_at(5))
+    h.append(70, 'on')
+    print(h.range(since=60))
+    print(h.seq_of(50), h.after(h.seq_of(50)), h.after(0))
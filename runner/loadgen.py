@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 16:50
+# @File    : loadgen.py
+
+"""
+按频率控制的负载发生器，用于DDS DoS/长稳压力测试
+- 一个调度线程维护按下次触发时间排序的最小堆，到点的任务交给固定大小的工作线程池执行，不再每个topic一个线程
+- 触发时间按 起始时间 + n * 周期 计算，不受单次发送耗时影响，不会累积漂移
+- 上一次发送还没执行完时本次触发记为跳过(skipped)，同一个writer不会并发发送
+- 统计每个topic的实际发送频率、发送失败次数、跳过次数以及触发抖动(实际开始发送时间 - 计划触发时间)
+"""
+
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import deque
+from runner.log import logger
+
+SPIN_NS = 2_000_000  # 距离触发时间小于2ms时不再sleep，避免sleep精度不足导致的抖动
+JITTER_WINDOW = 4096  # 计算抖动分位数时保留的最近样本数
+
+
+class TopicLoad:
+    """
+    单个topic的发送任务及统计
+    """
+
+    def __init__(self, name, rate, publish):
+        """
+        :param name: topic名
+        :param rate: 目标发送频率(Hz)
+        :param publish: 发送函数，无参数，异常计入发送失败
+        """
+        if rate <= 0:
+            raise ValueError(f'{name} 发送频率必须大于0: {rate}')
+        self.name = name
+        self.rate = rate
+        self.period_ns = int(1e9 / rate)
+        self.publish = publish
+        self.busy = False  # 调度线程置True，工作线程执行完置False
+        self.fires = 0  # 已调度的触发次数，下一次触发时间 = start_ns + fires * period_ns
+        self.start_ns = 0
+        self.sent = 0
+        self.errors = 0
+        self.skipped = 0
+        self.last_error = None
+        self.jitter_sum = 0
+        self.jitter_max = 0
+        self.jitters = deque(maxlen=JITTER_WINDOW)
+
+    def next_fire_ns(self):
+        return self.start_ns + self.fires * self.period_ns
+
+    def run(self, scheduled_ns):
+        jitter = time.perf_counter_ns() - scheduled_ns
+        try:
+            self.publish()
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+        else:
+            self.sent += 1
+        finally:
+            self.jitter_sum += jitter
+            if jitter > self.jitter_max:
+                self.jitter_max = jitter
+            self.jitters.append(jitter)
+            self.busy = False
+
+    def report(self, elapsed_s) -> dict:
+        runs = self.sent + self.errors
+        jitters = sorted(self.jitters)
+        p99 = jitters[min(len(jitters) - 1, math.ceil(len(jitters) * 0.99) - 1)] if jitters else 0
+        return {
+            'topic': self.name,
+            'target_hz': self.rate,
+            'achieved_hz': round(self.sent / elapsed_s, 2) if elapsed_s else 0,
+            'sent': self.sent,
+            'errors': self.errors,
+            'skipped': self.skipped,
+            'jitter_mean_ms': round(self.jitter_sum / runs / 1e6, 3) if runs else 0,
+            'jitter_p99_ms': round(p99 / 1e6, 3),
+            'jitter_max_ms': round(self.jitter_max / 1e6, 3),
+            'last_error': repr(self.last_error) if self.last_error else '',
+        }
+
+
+class LoadGenerator:
+    """
+    用法:
+        gen = LoadGenerator(workers=4)
+        gen.add_topic('TopicA', 100, lambda: writer.write_sample(values))
+        report = gen.run(duration=60)  # 阻塞运行60秒并返回统计
+    也可以 gen.start() 后在其他地方 gen.stop()
+    """
+
+    def __init__(self, workers=4):
+        self.workers = max(int(workers), 1)
+        self.loads = {}
+        self._heap = []
+        self._seq = itertools.count()  # 触发时间相同时按加入顺序执行
+        self._jobs = queue.SimpleQueue()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self.start_ns = 0
+        self.stop_ns = 0
+
+    def add_topic(self, name, rate, publish):
+        if self._threads:
+            raise RuntimeError('LoadGenerator已启动，不能再添加topic')
+        self.loads[name] = TopicLoad(name, rate, publish)
+        return self.loads[name]
+
+    @property
+    def is_running(self):
+        return bool(self._threads) and not self._stop_event.is_set()
+
+    def start(self):
+        if self._threads:
+            raise RuntimeError('LoadGenerator不能重复启动')
+        if not self.loads:
+            raise ValueError('没有需要发送的topic')
+        self.start_ns = time.perf_counter_ns()
+        for load in self.loads.values():
+            load.start_ns = self.start_ns
+            heapq.heappush(self._heap, (load.next_fire_ns(), next(self._seq), load))
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f'loadgen-worker-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._schedule, name='loadgen-scheduler', daemon=True)
+        t.start()
+        self._threads.append(t)
+        logger.info(f'LoadGenerator start: {len(self.loads)} topics, {self.workers} workers, '
+                    f'total {sum(i.rate for i in self.loads.values()):.1f} Hz')
+
+    def _schedule(self):
+        heap = self._heap
+        while not self._stop_event.is_set():
+            fire_ns, _, load = heap[0]
+            delta = fire_ns - time.perf_counter_ns()
+            if delta > SPIN_NS:
+                self._stop_event.wait((delta - SPIN_NS) / 1e9)
+                continue
+            if delta > 0:
+                time.sleep(0)
+                continue
+            if load.busy:
+                load.skipped += 1
+            else:
+                load.busy = True
+                self._jobs.put((load, fire_ns))
+            # 落后超过一个周期时直接跳到下一个未过期的触发点，过期的触发都记为跳过
+            load.fires += 1
+            behind = (time.perf_counter_ns() - load.next_fire_ns()) // load.period_ns
+            if behind > 0:
+                load.fires += behind
+                load.skipped += behind
+            heapq.heapreplace(heap, (load.next_fire_ns(), next(self._seq), load))
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            load, fire_ns = job
+            load.run(fire_ns)
+
+    def stop(self):
+        if not self._threads or self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self.stop_ns = time.perf_counter_ns()
+        for _ in range(self.workers):
+            self._jobs.put(None)
+        for t in self._threads:
+            t.join()
+        logger.info('LoadGenerator stop')
+
+    def wait(self, timeout=None):
+        """阻塞直到被stop或超时"""
+        return self._stop_event.wait(timeout)
+
+    def run(self, duration) -> list:
+        """
+        运行 duration 秒后停止并返回统计
+        """
+        self.start()
+        try:
+            self.wait(duration)
+        finally:
+            self.stop()
+        return self.report()
+
+    def report(self) -> list:
+        end_ns = self.stop_ns or time.perf_counter_ns()
+        elapsed_s = (end_ns - self.start_ns) / 1e9 if self.start_ns else 0
+        return [load.report(elapsed_s) for load in self.loads.values()]
+
+    def log_report(self):
+        rows = self.report()
+        for row in rows:
+            logger.info(
+                f"{row['topic']} | target {row['target_hz']} Hz | achieved {row['achieved_hz']} Hz | "
+                f"sent {row['sent']} | errors {row['errors']} | skipped {row['skipped']} | "
+                f"jitter mean {row['jitter_mean_ms']} ms p99 {row['jitter_p99_ms']} ms max {row['jitter_max_ms']} ms"
+                + (f" | {row['last_error']}" if row['last_error'] else '')
+            )
+        target = sum(i['target_hz'] for i in rows)
+        achieved = sum(i['achieved_hz'] for i in rows)
+        logger.info(f'LoadGenerator total: target {target:.1f} Hz, achieved {achieved:.1f} Hz')
+        return rows
+
+
+if __name__ == '__main__':
+    gen = LoadGenerator(workers=2)
+    gen.add_topic('fast', 500, lambda: None)
+    gen.add_topic('slow', 10, lambda: time.sleep(0.2))  # 发送耗时超过周期，触发会被跳过
+    gen.run(2)
+    gen.log_report()
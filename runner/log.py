@@ -4,23 +4,198 @@
 # @Time    : 2024/3/29 13:36
 # @File    : log.py
 
+"""
+loguru日志配置，以及热路径日志(hot_log)
+DDS/TCP/DoIP 收发这类高频日志不直接调用 logger.info:
+- 调用方只传前缀、格式串和参数，格式化推迟到真正输出时，被采样/限流丢弃的日志不做任何格式化
+- 按前缀配置采样(每N条输出1条)和限速(每秒最多N条)，被丢弃的条数定期汇总输出一次
+- 异步模式下日志以元组放入 deque(append/popleft 在GIL下是原子的，不加锁)，由后台线程统一格式化输出，
+  接收线程不再阻塞在文件和UI的sink上；同步模式(默认)在调用线程中直接输出
+- 只打印变化值的规则(change)统一在这里判断，接收端不再各自实现
+配置 settings.yaml:
+    hot_log:
+      async: false
+      flush_interval: 0.05
+      max_queue: 100000
+      ignore_changes: [xcu_system_time_]
+      rules:
+        接收DDS消息: {sample: 1, rate: 200}
+"""
+
 from loguru import logger
 import os
+import math
+import time
+import threading
+import multiprocessing
+from collections import deque
 from datetime import datetime
-from settings import work_dir
+from settings import env, work_dir
 
 # 日志文件保存路径
 log_directory = os.path.join(work_dir, 'data', 'log')
 if not os.path.exists(log_directory):
     os.makedirs(log_directory)
 
-# 配置日志
-logger.add(
-    os.path.join(log_directory, 'log_{time}.log'),  # 动态命名日志文件
-    rotation='10 MB',  # 当文件大小达到10M时轮换
-    compression='zip',  # 压缩为zip格式
-    retention='7 days',  # 保存最近7天的日志
-    level='INFO'  # 记录INFO级别以上的日志
-)
+# 配置日志，进程池的子进程(如并行解析用例)不单独生成日志文件
+if multiprocessing.parent_process() is None:
+    logger.add(
+        os.path.join(log_directory, 'log_{time}.log'),  # 动态命名日志文件
+        rotation='10 MB',  # 当文件大小达到10M时轮换
+        compression='zip',  # 压缩为zip格式
+        retention='7 days',  # 保存最近7天的日志
+        level='INFO'  # 记录INFO级别以上的日志
+    )
 
 logger = logger
+
+
+def _is_nan(value):
+    return isinstance(value, float) and math.isnan(value)
+
+
+class _PrefixRule:
+    """一个前缀的采样和限速，计数不加锁，多线程下允许少量误差"""
+    __slots__ = ('sample', 'rate', 'count', 'window', 'window_count', 'dropped')
+
+    def __init__(self, sample=1, rate=0):
+        self.sample = max(int(sample or 1), 1)
+        self.rate = rate or 0  # 每秒最多输出的条数，0不限速
+        self.count = 0
+        self.window = 0
+        self.window_count = 0
+        self.dropped = 0
+
+    def allow(self):
+        self.count += 1
+        if self.sample > 1 and self.count % self.sample:
+            self.dropped += 1
+            return False
+        if self.rate:
+            window = int(time.monotonic())
+            if window != self.window:
+                self.window, self.window_count = window, 0
+            if self.window_count >= self.rate:
+                self.dropped += 1
+                return False
+            self.window_count += 1
+        return True
+
+
+class HotLog:
+    """
+    用法:
+        hot_log.event('发送DDS消息', '发送DDS消息：{} | {} = {}', topic_name, signal_name, value)
+        hot_log.change(signal_name, last_value, value, '接收DDS消息', '接收DDS消息：{} | {} = {}', topic_name, key, value)
+    fmt 也可以是函数，输出时调用 fmt(*args) 得到日志内容
+    """
+    DROP_REPORT_INTERVAL = 10  # s
+
+    def __init__(self):
+        self.async_mode = False
+        self.flush_interval = 0.05
+        self.ignore_changes = ('xcu_system_time_',)
+        self.rules = {}
+        self.queue_dropped = 0
+        self._queue = deque()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_drop_report = time.monotonic()
+
+    def configure(self, config=None):
+        """按配置重新设置，异步模式下启动后台输出线程"""
+        config = config or {}
+        self.stop()
+        self.flush_interval = config.get('flush_interval') or 0.05
+        self.ignore_changes = tuple(config.get('ignore_changes') or ('xcu_system_time_',))
+        self.rules = {prefix: _PrefixRule(**(rule or {})) for prefix, rule in (config.get('rules') or {}).items()}
+        self._queue = deque(maxlen=config.get('max_queue') or 100000)
+        self.async_mode = bool(config.get('async'))
+        if self.async_mode:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='hot-log', daemon=True)
+            self._thread.start()
+
+    def is_changed(self, key, last_value, value):
+        """
+        是否需要打印信号变化
+        1. key中含有 ignore_changes 中的字符串不打印
+        2. 两个值都是nan不打印
+        3. 两个值都不是nan且不相等时打印，其余情况不打印
+        """
+        for pattern in self.ignore_changes:
+            if pattern in key:
+                return False
+        if _is_nan(last_value) or _is_nan(value):
+            return False
+        return last_value != value
+
+    def event(self, prefix, fmt, *args):
+        self._event(prefix, fmt, args, 3)
+
+    def change(self, key, last_value, value, prefix, fmt, *args):
+        if self.is_changed(key, last_value, value):
+            self._event(prefix, fmt, args, 3)
+
+    def _event(self, prefix, fmt, args, depth):
+        rule = self.rules.get(prefix)
+        if rule is not None and not rule.allow():
+            if not self.async_mode:  # 异步模式由后台线程汇总
+                self.report_dropped_periodically()
+            return
+        if self.async_mode:
+            queue = self._queue
+            if len(queue) == queue.maxlen:  # 满了以后最旧的一条会被挤掉
+                self.queue_dropped += 1
+            queue.append((fmt, args))
+        else:
+            self._emit(fmt, args, depth)  # 同步输出时日志的位置显示为调用方
+
+    @staticmethod
+    def _emit(fmt, args, depth=1):
+        try:
+            logger.opt(depth=depth).info(fmt(*args) if callable(fmt) else fmt.format(*args))
+        except Exception as e:
+            logger.error(f'hot_log 格式化失败 {fmt}: {e}')
+
+    def flush(self):
+        queue = self._queue
+        popleft = queue.popleft
+        for _ in range(len(queue)):
+            self._emit(*popleft())
+        self.report_dropped_periodically()
+
+    def report_dropped_periodically(self):
+        now = time.monotonic()
+        if now - self._last_drop_report >= self.DROP_REPORT_INTERVAL:
+            self._last_drop_report = now
+            self.report_dropped()
+
+    def report_dropped(self):
+        for prefix, rule in self.rules.items():
+            if rule.dropped:
+                logger.info(f'日志采样/限流: {prefix} 丢弃 {rule.dropped} 条')
+                rule.dropped = 0
+        if self.queue_dropped:
+            logger.warning(f'日志队列已满: 丢弃 {self.queue_dropped} 条')
+            self.queue_dropped = 0
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def stop(self):
+        """停止后台线程并输出队列中剩余的日志"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.async_mode = False
+        self.flush()
+        self.report_dropped()
+
+
+hot_log = HotLog()
+if multiprocessing.parent_process() is None:
+    hot_log.configure(env.hot_log)
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 21:50
+# @File    : recorder.py
+
+"""
+接收信号记录器
+DDS/TCP接收线程解码后调用 recorder.record(信号名, 值)，只追加到内存队列；后台线程定时把队列写成列式的数据块
+记录目录: data/record/<运行名>/
+    signals.json          信号id -> 信号名 (列表下标即id)
+    chunk_000001.npz      一个数据块，列: ts(int64 纳秒时间戳) sid(uint32) kind(uint8) num(float64) text/text_offsets
+值的存储: 数值(整型不超过2^53)和布尔存在 num 列，kind 区分原来的类型，其余(字符串、列表、字典)序列化成json存在 text 列
+离线查询用 RecordReader，按信号名、时间范围过滤都是numpy向量运算
+"""
+
+import os
+import json
+import glob
+import time
+import threading
+from collections import deque
+from datetime import datetime
+import numpy as np
+from runner.log import logger
+from settings import work_dir
+
+record_dir = os.path.join(work_dir, 'data', 'record')
+
+KIND_FLOAT = 0
+KIND_BOOL = 1
+KIND_JSON = 2
+KIND_INT = 3
+
+
+class Recorder:
+    """
+    用法:
+        recorder.start()                      # 开始一次记录
+        recorder.record('MSG_XXX', 1.0)        # 接收线程中调用，未启动时直接返回
+        recorder.stop()                       # 写完剩余数据
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.log_values = True  # 记录期间是否仍然逐条打印接收日志
+        self.run_dir = None
+        self.flush_interval = 1.0
+        self.rows = 0
+        self.chunks = 0
+        self._queue = deque()  # (ts, 信号名, 值)，append/popleft 线程安全
+        self._ids = {}  # 信号名 -> id，只在后台线程中修改
+        self._names = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, run_name=None, flush_interval=1.0, log_values=True):
+        """
+        开始记录，同一时间只有一个记录
+        :param run_name: 记录目录名，默认为当前时间
+        :param flush_interval: 后台写入间隔(s)
+        :param log_values: False时接收线程不再逐条打印接收日志，只写入记录
+        """
+        if self.enabled:
+            self.stop()
+        run_name = run_name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.run_dir = os.path.join(record_dir, run_name)
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.log_values = log_values
+        self.rows = 0
+        self.chunks = 0
+        self._queue.clear()
+        self._ids = {}
+        self._names = []
+        self._stop_event.clear()
+        self.enabled = True
+        self._thread = threading.Thread(target=self._flush_loop, name='recorder-flusher', daemon=True)
+        self._thread.start()
+        logger.info(f'开始记录接收信号: {self.run_dir}')
+
+    def record(self, name, value):
+        """接收线程的热路径，只追加到队列"""
+        if self.enabled:
+            self._queue.append((time.time_ns(), name, value))
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """把队列中的数据写成一个数据块，只在后台线程(或停止后)调用"""
+        n = len(self._queue)
+        if not n:
+            return
+        popleft = self._queue.popleft
+        rows = [popleft() for _ in range(n)]
+        try:
+            self._write_chunk(rows)
+        except Exception as e:
+            logger.error(f'写入信号记录失败: {e}')
+
+    def _signal_id(self, name):
+        sid = self._ids.get(name)
+        if sid is None:
+            sid = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return sid
+
+    def _write_chunk(self, rows):
+        n = len(rows)
+        names_count = len(self._names)
+        ts = np.empty(n, dtype=np.int64)
+        sid = np.empty(n, dtype=np.uint32)
+        kind = np.zeros(n, dtype=np.uint8)
+        num = np.full(n, np.nan, dtype=np.float64)
+        texts = []
+        for i, (t, name, value) in enumerate(rows):
+            ts[i] = t
+            sid[i] = self._signal_id(name)
+            if isinstance(value, bool):
+                kind[i] = KIND_BOOL
+                num[i] = value
+            elif isinstance(value, float):
+                num[i] = value
+            elif isinstance(value, int) and abs(value) <= 2 ** 53:  # 超过float64精度的整型按json保存
+                kind[i] = KIND_INT
+                num[i] = value
+            else:
+                kind[i] = KIND_JSON
+                texts.append(json.dumps(value, ensure_ascii=False, default=str))
+        encoded = [i.encode('utf-8') for i in texts]
+        text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(i) for i in encoded], out=text_offsets[1:])
+        text = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+        self.chunks += 1
+        path = os.path.join(self.run_dir, f'chunk_{self.chunks:06d}.npz')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, ts=ts, sid=sid, kind=kind, num=num, text=text, text_offsets=text_offsets)
+        os.replace(tmp_path, path)
+        if len(self._names) != names_count:
+            self._save_names()
+        self.rows += n
+
+    def _save_names(self):
+        path = os.path.join(self.run_dir, 'signals.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self._names, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.log_values = True
+        logger.info(f'信号记录结束: {self.run_dir}, {self.rows} 条, {len(self._names)} 个信号, {self.chunks} 个数据块')
+
+
+recorder = Recorder()
+
+
+def load_names(run_dir) -> list:
+    """记录中的信号名，列表下标即信号id"""
+    with open(os.path.join(run_dir, 'signals.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def chunk_paths(run_dir) -> list:
+    """按写入顺序排列的数据块"""
+    return sorted(glob.glob(os.path.join(run_dir, 'chunk_*.npz')))
+
+
+def decode_value(kind, num, text=None):
+    """
+    按 kind 还原一个值
+    :param text: KIND_JSON 时的json字节串
+    """
+    if kind == KIND_FLOAT:
+        return num.item()
+    if kind == KIND_INT:
+        return int(num)
+    if kind == KIND_BOOL:
+        return bool(num)
+    return json.loads(text)
+
+
+def iter_records(run_dir, names=None, start_ns=None, end_ns=None):
+    """
+    流式读取记录，同一时间只加载一个数据块，GB级的记录也不会全部读进内存
+    数据块按写入顺序读取，块内按时间排序
+    :param names: 只读取这些信号，None为全部
+    :return: 迭代 (ts, 信号名, 值)
+    """
+    signal_names = load_names(run_dir)
+    wanted = None
+    if names is not None:
+        ids = {name: i for i, name in enumerate(signal_names)}
+        wanted = np.array([ids[i] for i in names if i in ids], dtype=np.uint32)
+    for path in chunk_paths(run_dir):
+        with np.load(path) as chunk:
+            ts, sid, kind, num = chunk['ts'], chunk['sid'], chunk['kind'], chunk['num']
+            blob, offsets = chunk['text'].tobytes(), chunk['text_offsets']
+        mask = np.ones(len(ts), dtype=bool)
+        if wanted is not None:
+            mask &= np.isin(sid, wanted)
+        if start_ns is not None:
+            mask &= ts >= start_ns
+        if end_ns is not None:
+            mask &= ts <= end_ns
+        rows = np.flatnonzero(mask)
+        rows = rows[np.argsort(ts[rows], kind='stable')]
+        json_rank = np.cumsum(kind == KIND_JSON) - 1  # 每行在本块text列中的序号
+        for i in rows:
+            text = None
+            if kind[i] == KIND_JSON:
+                j = json_rank[i]
+                text = blob[offsets[j]:offsets[j + 1]]
+            yield int(ts[i]), signal_names[sid[i]], decode_value(kind[i], num[i], text)
+
+
+class RecordReader:
+    """
+    离线读取一次记录，整个记录加载到内存，很大的记录用 iter_records 流式读取
+    用法:
+        reader = RecordReader(r'data/record/20261018_120000')
+        ts, values = reader.series('MSG_XXX')
+        for ts, name, value in reader.query(['MSG_XXX', 'MSG_YYY'], start_ns=..., end_ns=...):
+            ...
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.names = load_names(run_dir)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        ts, sid, kind, num, text_index, texts = [], [], [], [], [], []
+        for path in chunk_paths(run_dir):
+            with np.load(path) as chunk:
+                chunk_kind = chunk['kind']
+                ts.append(chunk['ts'])
+                sid.append(chunk['sid'])
+                kind.append(chunk_kind)
+                num.append(chunk['num'])
+                # json值在整个记录中的下标，其余行为-1
+                index = np.full(len(chunk_kind), -1, dtype=np.int64)
+                is_json = chunk_kind == KIND_JSON
+                index[is_json] = np.arange(is_json.sum()) + len(texts)
+                text_index.append(index)
+                blob = chunk['text'].tobytes()
+                offsets = chunk['text_offsets']
+                texts.extend(blob[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1))
+        concat = (lambda arrays, dtype: np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype))
+        self.ts = concat(ts, np.int64)
+        self.sid = concat(sid, np.uint32)
+        self.kind = concat(kind, np.uint8)
+        self.num = concat(num, np.float64)
+        self.text_index = concat(text_index, np.int64)
+        self._texts = texts  # 未解码的json，查询时才解码
+
+    def __len__(self):
+        return len(self.ts)
+
+    def _value(self, i):
+        kind = self.kind[i]
+        return decode_value(kind, self.num[i], self._texts[self.text_index[i]] if kind == KIND_JSON else None)
+
+    def mask(self, names=None, start_ns=None, end_ns=None):
+        mask = np.ones(len(self.ts), dtype=bool)
+        if names is not None:
+            mask &= np.isin(self.sid, [self.ids[i] for i in names if i in self.ids])
+        if start_ns is not None:
+            mask &= self.ts >= start_ns
+        if end_ns is not None:
+            mask &= self.ts <= end_ns
+        return mask
+
+    def query(self, names=None, start_ns=None, end_ns=None):
+        """按时间顺序返回 [(ts, 信号名, 值), ...]"""
+        rows = np.flatnonzero(self.mask(names, start_ns, end_ns))
+        rows = rows[np.argsort(self.ts[rows], kind='stable')]
+        return [(int(self.ts[i]), self.names[self.sid[i]], self._value(i)) for i in rows]
+
+    def series(self, name, start_ns=None, end_ns=None):
+        """
+        单个信号的时间序列，数值信号直接返回numpy数组
+        :return: (ts数组, 值数组或列表)
+        """
+        rows = np.flatnonzero(self.mask([name], start_ns, end_ns))
+        rows = rows[np.argsort(self.ts[rows], kind='stable')]
+        if np.isin(self.kind[rows], (KIND_FLOAT, KIND_INT)).all():
+            return self.ts[rows], self.num[rows]
+        return self.ts[rows], [self._value(i) for i in rows]
+
+    def summary(self) -> dict:
+        """{信号名: 记录条数}"""
+        counts = np.bincount(self.sid, minlength=len(self.names))
+        return {name: int(counts[i]) for i, name in enumerate(self.names) if counts[i]}
+
+
+if __name__ == '__main__':
+    recorder.start(run_name='demo', flush_interval=0.1)
+    start = time.perf_counter()
+    for k in range(200000):
+        recorder.record(f'MSG_{k % 100}', k * 0.5)
+    recorder.record('MSG_str', 'hello')
+    recorder.record('MSG_list', [1, 2, 3])
+    recorder.record('MSG_bool', True)
+    recorder.record('MSG_int', 2 ** 60)
+    logger.info(f'record 200k: {time.perf_counter() - start:.3f}s')
+    recorder.stop()
+    start = time.perf_counter()
+    reader = RecordReader(recorder.run_dir)
+    logger.info(f'load {len(reader)} rows: {time.perf_counter() - start:.3f}s')
+    print(reader.series('MSG_1')[1][:5], reader.query(['MSG_str', 'MSG_list', 'MSG_bool', 'MSG_int', 'MSG_2'])[-4:])
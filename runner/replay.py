@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/18 22:30
+# @File    : replay.py
+
+"""
+记录回放
+把 runner.recorder 录下的DDS/TCP信号按原始时间间隔重新发送给被测对象
+- 流式读取记录(iter_records)，一次只加载一个数据块
+- 连续的同一topic的信号合并成一个sample发送，遇到其他topic或同一信号再次出现时开始新的sample
+- 按 第一条记录的时间 + (记录时间 - 起始记录时间) / speed 计算发送时间，不累积漂移；speed=0 表示不等待，尽快发送
+- DDS信号通过 ConnectorPool 中的writer发送(dds_multi_send)，只回放有writer的topic(writer_topic_names)，
+  记录中大多是被测对象发布、只有reader的topic，这些信号计入skipped
+- TCP信号通过sdc连接发送: 记录中被测对象发出的 A2M_x 按同名的M2A信号 x 发送，A2A_/M2A_ 信号按原名发送，
+  直接按(信号名, 值)打包，不修改 Variable 中的当前值；整型值按double发送
+- 统计每次发送相对计划时间的延迟，以及请求的回放时长和实际用时
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from runner.log import logger
+from runner.loadgen import SPIN_NS, JITTER_WINDOW
+from runner.recorder import iter_records
+
+
+class ReplayEngine:
+    """
+    用法:
+        engine = ReplayEngine(r'data/record/20261018_120000', dds_connector=env.dds_connector, speed=10, topics=['TopicA'])
+        report = engine.run()  # 阻塞直到回放结束，也可以 start() 后在其他线程 stop()
+    """
+
+    def __init__(self, run_dir, dds_connector=None, sdc_connector=None, speed=1.0, topics=None, signals=None,
+                 start_ns=None, end_ns=None):
+        """
+        :param run_dir: 记录目录
+        :param speed: 回放倍速，2表示2倍速，0表示尽快发送
+        :param topics: 只回放这些topic的dds信号，None为全部
+        :param signals: 只回放这些信号，None为全部
+        :param start_ns/end_ns: 只回放这段时间内的记录(记录中的时间戳)
+        """
+        if speed < 0:
+            raise ValueError(f'回放倍速不能小于0: {speed}')
+        self.run_dir = run_dir
+        self.dds_connector = dds_connector
+        self.sdc_connector = sdc_connector
+        self.speed = speed
+        self.topics = set(topics) if topics else None
+        self.signals = list(signals) if signals else None
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._routes = {}  # 信号名 -> topic名 / 'tcp' / None(跳过)
+        self._writer_topics = frozenset(dds_connector.writer_topic_names) if dds_connector is not None else frozenset()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.rows = 0
+        self.sent = 0  # 发送次数(一个sample或一条tcp消息)
+        self.errors = 0
+        self.skipped = 0  # 不能回放或被过滤掉的信号条数
+        self.last_error = None
+        self.first_ts = None
+        self.last_ts = None
+        self.begin_ns = 0
+        self.end_ns_actual = 0
+        self.lateness_sum = 0
+        self.lateness_max = 0
+        self.latenesses = deque(maxlen=JITTER_WINDOW)
+
+    def route(self, name):
+        """信号的发送方式: topic名、'tcp'，不能回放时为None"""
+        if name in self._routes:
+            return self._routes[name]
+        target = None
+        if name.startswith(('M2A_', 'A2A_', 'A2M_')):
+            if self.sdc_connector is not None:
+                target = 'tcp'
+        elif self.dds_connector is not None:
+            topic_name = self.dds_connector.signal_map.get(name)
+            if topic_name in self._writer_topics and (self.topics is None or topic_name in self.topics):
+                target = topic_name
+        self._routes[name] = target
+        return target
+
+    def samples(self):
+        """
+        把流式读取的记录合并成要发送的sample
+        :return: 迭代 (记录时间, topic名或'tcp', {信号名: 值})
+        """
+        ts0, target, values = None, None, {}
+        for ts, name, value in iter_records(self.run_dir, names=self.signals, start_ns=self.start_ns, end_ns=self.end_ns):
+            self.rows += 1
+            route = self.route(name)
+            if route is None:
+                self.skipped += 1
+                continue
+            if values and (route != target or route == 'tcp' or name in values):
+                yield ts0, target, values
+                values = {}
+            if not values:
+                ts0, target = ts, route
+            values[name] = value
+        if values:
+            yield ts0, target, values
+
+    def send(self, target, values):
+        if target == 'tcp':
+            sdc_connector = self.sdc_connector
+            for name, value in values.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    value = float(value)  # M2A报文不支持整型，与用例中的数值一样按double发送
+                sdc_connector.sendall(sdc_connector.pack_value(name, value))
+        else:
+            self.dds_connector.dds_multi_send(target, values, log=False)
+
+    def _wait_until(self, deadline_ns):
+        while True:
+            delta = deadline_ns - time.perf_counter_ns()
+            if delta <= 0 or self._stop_event.is_set():
+                return
+            if delta > SPIN_NS:
+                self._stop_event.wait((delta - SPIN_NS) / 1e9)
+            else:
+                time.sleep(0)
+
+    def run(self) -> dict:
+        self.reset_stats()
+        self._stop_event.clear()
+        logger.info(f'开始回放: {self.run_dir}, 倍速 {self.speed or "尽快发送"}, '
+                    f'topic {sorted(self.topics) if self.topics else "全部"}')
+        self.begin_ns = time.perf_counter_ns()
+        for ts, target, values in self.samples():
+            if self._stop_event.is_set():
+                break
+            if self.first_ts is None:
+                self.first_ts = ts
+            self.last_ts = ts
+            scheduled_ns = self.begin_ns
+            if self.speed:
+                scheduled_ns += int((ts - self.first_ts) / self.speed)
+                self._wait_until(scheduled_ns)
+            lateness = time.perf_counter_ns() - scheduled_ns
+            try:
+                self.send(target, values)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+            else:
+                self.sent += 1
+            if self.speed:
+                self.lateness_sum += lateness
+                self.lateness_max = max(self.lateness_max, lateness)
+                self.latenesses.append(lateness)
+        self.end_ns_actual = time.perf_counter_ns()
+        return self.log_report()
+
+    def start(self):
+        """后台线程中回放"""
+        self._thread = threading.Thread(target=self.run, name='replay', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def report(self) -> dict:
+        recorded_s = (self.last_ts - self.first_ts) / 1e9 if self.first_ts is not None else 0
+        achieved_s = (self.end_ns_actual or time.perf_counter_ns()) - self.begin_ns
+        achieved_s = achieved_s / 1e9 if self.begin_ns else 0
+        latenesses = sorted(self.latenesses)
+        p99 = latenesses[min(len(latenesses) - 1, math.ceil(len(latenesses) * 0.99) - 1)] if latenesses else 0
+        return {
+            'rows': self.rows,
+            'sent': self.sent,
+            'errors': self.errors,
+            'skipped': self.skipped,
+            'speed': self.speed,
+            'recorded_s': round(recorded_s, 3),
+            'requested_s': round(recorded_s / self.speed, 3) if self.speed else 0,
+            'achieved_s': round(achieved_s, 3),
+            'achieved_speed': round(recorded_s / achieved_s, 2) if achieved_s else 0,
+            'lateness_mean_ms': round(self.lateness_sum / len(self.latenesses) / 1e6, 3) if self.latenesses else 0,
+            'lateness_p99_ms': round(p99 / 1e6, 3),
+            'lateness_max_ms': round(self.lateness_max / 1e6, 3),
+            'last_error': repr(self.last_error) if self.last_error else '',
+        }
+
+    def log_report(self) -> dict:
+        row = self.report()
+        logger.info(
+            f"回放结束 | rows {row['rows']} | sent {row['sent']} | errors {row['errors']} | skipped {row['skipped']} | "
+            f"recorded {row['recorded_s']}s | requested {row['requested_s']}s (x{row['speed']}) | "
+            f"achieved {row['achieved_s']}s (x{row['achieved_speed']}) | "
+            f"lateness mean {row['lateness_mean_ms']} ms p99 {row['lateness_p99_ms']} ms max {row['lateness_max_ms']} ms"
+            + (f" | {row['last_error']}" if row['last_error'] else '')
+        )
+        return row
+
+
+if __name__ == '__main__':
+    from runner.recorder import recorder
+
+    class PrintConnector:
+        signal_map = {'speed': 'VehicleSpeed', 'gear': 'VehicleSpeed', 'door': 'DoorStatus'}
+        writer_topic_names = ['VehicleSpeed', 'DoorStatus']
+
+        @staticmethod
+        def dds_multi_send(topic_name, signals, log=True):
+            pass
+
+    recorder.start(run_name='replay_demo', flush_interval=0.1)
+    for k in range(100):
+        recorder.record('speed', k * 1.5)
+        recorder.record('gear', k % 5)
+        if k % 10 == 0:
+            recorder.record('door', k // 10 % 2)
+        time.sleep(0.01)
+    recorder.stop()
+    ReplayEngine(recorder.run_dir, dds_connector=PrintConnector(), speed=1).run()
+    ReplayEngine(recorder.run_dir, dds_connector=PrintConnector(), speed=10, topics=['VehicleSpeed']).run()
+    ReplayEngine(recorder.run_dir, dds_connector=PrintConnector(), speed=0).run()
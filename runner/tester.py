@@ -9,66 +9,22 @@ import time
 import json
 import traceback
 import requests
-import math
 import threading
 import ast
 from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
-from json.decoder import JSONDecodeError
-from openpyxl import load_workbook
 from prettytable import PrettyTable
 from settings import env
 from connector import *
-from runner.log import logger
+from runner.log import logger, hot_log
 from runner.variable import Variable
+from runner.case import NON_DDS_PREFIX, TestStep, TestInfo, CaseParser, convert_signal_value
+from runner.condition import compile_condition, resolve_signal_name, find_signal_names
 from runner.simulator import VehicleModeDiagnostic, DoIPMonitorThread
 from runner.cloud import CloudConnector
-
-
-class TestStep:
-    """
-    单条(one row)测试步骤的数据类型
-    """
-    def __init__(
-        self,
-        pre_condition: str,
-        actions: list,
-        wait_condition: str,
-        pass_condition: list,
-        hold_condition: str,
-        row_number: int,
-        heading: str
-    ):
-        self.pre_condition = pre_condition
-        self.actions = actions
-        self.heading = heading
-        self.wait_condition = wait_condition
-        self.pass_condition = pass_condition
-        self.hold_condition = hold_condition
-        self.row_number = row_number
-        self.heading = heading
-        self.evaluation_condition = []  # 实际运行的结果
-        self.time_time = ''
-        self.step_ret = True
-
-
-class TestInfo:
-    """
-    一条测试用例的数据类型
-    """
-    def __init__(
-        self,
-        tc_name: str,
-        tc_steps: 'List[TestStep]',
-        tc_ret: bool,
-        tc_title=''
-    ):
-        self.tc_name = tc_name
-        self.tc_title = tc_title
-        self.tc_steps = tc_steps
-        self.tc_ret = tc_ret
-        self.test_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+from runner.cyclic import CyclicScheduler
+from runner.recorder import recorder
 
 
 class ThreadSafeProperty:
@@ -235,100 +191,8 @@ class TestHandle:
         logger.info(response.text)
 
 
-class CaseParser:
-    """
-    解析一个excel(一个模块)下的所有用例
-    """
-    def __init__(self, tc_filepath):
-        self.tc_filepath = tc_filepath
-        self.wb = load_workbook(filename=tc_filepath)
-
-    def parse_run_sheet(self, tc_sheet_name) -> list:
-        """
-        解析要执行的sheet
-        :param tc_sheet_name:
-        :return:
-        """
-        tc_sheet_name = str(tc_sheet_name).replace(' ', '').strip()
-        sheet_numbers = []
-        sheet_ranges = tc_sheet_name.split(";")
-
-        for sheet_range in sheet_ranges:
-            # 如果range中包含"-"符号，则解析出开始和结束的数字
-            if "-" in sheet_range:
-                start, end = map(int, sheet_range.split("-"))
-                # 将开始和结束的数字之间的所有数字加入sheet_numbers
-                for num in range(start, end + 1):
-                    sheet_numbers.append(num)
-            # 如果range为空，则跳过
-            elif sheet_range == "":
-                continue
-            else:
-                sheet_numbers.append(int(sheet_range))
-        # 将数字转换为sheet名称，例如"3"转换为"Sheet3"
-        sheet_names = ["TC" + str(num) for num in sheet_numbers]
-        return sheet_names
-
-    def get_all_testcase(self) -> dict:
-        """
-        获取所有测试用例的数据，以字典形式返回。
-        返回结构示例如下：
-            {
-                <tc_sheet_name>: {
-                    "case_name": str,             # 用例名称
-                    "test_steps": List[TestStep]  # 测试步骤对象构成的列表
-                },
-                ...
-            }
-        """
-        option_sheet = self.wb['Options']
-        if option_sheet is None:
-            logger.error('not found Options sheet')
-            return {}
-        tc_case = option_sheet['D9'].value
-        if tc_case is None or tc_case == '':
-            logger.error('not found testcase tc')
-
-        all_tc = {}
-        tc_case_sheets = self.parse_run_sheet(tc_case)
-        for tc_name in tc_case_sheets:
-            tc_info = {
-                'case_name': '',
-                'test_steps': []
-            }
-            try:
-                sheet = self.wb[tc_name]
-            except Exception as e:
-                logger.error(f'{e} {self.tc_filepath}: {tc_name} sheet not exists')
-                continue
-            test_steps = []
-            for row_number, row in enumerate(sheet.iter_rows(), start=1):
-                if row[1].value == 'Test case' and not tc_info['case_name']:
-                    tc_info['case_name'] = str(row[2].value).strip()
-                if row[1].value == 'Test step':
-                    actions = str(row[4].value).split('\n')
-                    pass_condition = str(row[6].value).split('\n')
-                    test_step = TestStep(
-                        pre_condition=row[3].value,
-                        actions=actions,
-                        hold_condition=row[7].value,
-                        wait_condition=row[5].value,
-                        pass_condition=pass_condition,
-                        row_number=row_number,
-                        heading=row[2].value
-                    )
-                    test_steps.append(test_step)
-            tc_info['test_steps'] = test_steps
-            all_tc[tc_name] = tc_info
-        return all_tc
-
-
 class CaseTester:
-    non_dds_prefix = (
-            'SIL_',  'Sw_HandWakeup', 'sql3_', 'A2M_', 'M2A_', 'vss',
-            'ssh_', 'http', 'bsp_', 'eid_fid_', 'db_', 'doip_', 'var_',
-            'cal_',
-        )  # 非dds消息格式
+    non_dds_prefix = NON_DDS_PREFIX  # 非dds消息格式
 
     def __init__(
             self,
@@ -355,6 +219,7 @@ class CaseTester:
         self.cloud_connector = cloud_connector
         self.doipclient = doipclient
         self.xcp_connector = xcp_connector
+        self.cyclic = CyclicScheduler()  # cyc_ 周期发送
         self.callback = None
 
     def set_callback(self, callback):
@@ -375,35 +240,7 @@ class CaseTester:
         :param value:
         :return:
         """
-
-        def replacer(match):
-            var_name = match.group(1)
-            return str(Variable.get_vars().get(var_name, f'{{{{{var_name}}}}}'))  # 变量不存在时保留原标记
-
-        if value.startswith("0b") or value.startswith("0B"):
-            try:
-                return float(int(value[2:], 2))
-            except ValueError:
-                logger.error('转换二进制失败')
-        elif value.startswith("0x") or value.startswith("0X"):
-            try:
-                return float(int(value[2:], 16))
-            except ValueError:
-                logger.error('转换十六进制失败')
-        elif bool(re.search(r'\{\{\s*[\w]+\s*\}\}', str(value))):  # 含{{}}结构
-            try:
-                pattern = re.compile(r'\{\{\s*([\w]+)\s*\}\}')  # 精准匹配变量名（字母/数字/下划线）
-                return pattern.sub(replacer, str(value))
-            except:
-                logger.error(f'解析变量值异常: {value}')
-        else:
-            try:
-                return float(value)
-            except ValueError:
-                try:
-                    return json.loads(value.replace('\n', ''))
-                except JSONDecodeError:
-                    return value
+        return convert_signal_value(value)
 
     def send_single_msg(self, signal: Variable, async_mode=True):
         """
@@ -495,6 +332,9 @@ class CaseTester:
         # 标定
         elif signal.name.startswith('cal_'):
             self.xcp_connector.send_msg(signal)
+        # 周期发送
+        elif signal.name.startswith('cyc_'):
+            self.cyclic_send(signal)
         # 临时变量存储
         elif signal.name.startswith('var_'):
             logger.info(f'变量赋值: {signal.name} = {signal.Value}')
@@ -505,21 +345,46 @@ class CaseTester:
             else:
                 self.dds_connector.dds_send(signal)
 
+    def cyclic_send(self, signal: Variable):
+        """
+        cyc_信号名/cyc_topic名 = 周期ms，0表示停止，cyc_all=0 停止全部
+        周期内发送的是信号的当前值，用例中修改信号值后下一个周期生效
+        """
+        target = signal.name[4:]
+        period_ms = float(signal.Value)
+        if period_ms <= 0:
+            if target == 'all':
+                self.cyclic.remove_all()
+            elif self.cyclic.remove(target) is None:
+                logger.warning(f'周期发送任务不存在: {target}')
+            return
+        self.cyclic.add(target, period_ms, self.cyclic_publisher(target))
+
+    def cyclic_publisher(self, target):
+        """
+        周期任务的发送函数，周期发送不逐条打印发送日志
+        """
+        # M2A/A2A TCP信号，连接断开时本周期发送失败(计入统计)，不在调度线程中重连，避免阻塞其他周期任务
+        if target.startswith(('M2A_', 'A2A_')):
+            variable = Variable(target)
+            sdc_connector = self.sdc_connector
+            return lambda: sdc_connector.sendall(sdc_connector.pack_signal(variable), block=False)
+        dds_connector = self.dds_connector
+        # 单个dds信号
+        if target in dds_connector.signal_map:
+            topic_name = dds_connector.signal_map[target]
+            variable = Variable(target)
+            return lambda: dds_connector.dds_multi_send(topic_name, {target: variable.Value}, log=False)
+        # 整个topic，只发送赋过值的成员，其余成员(包括数组、结构体)保持writer中上一次的sample
+        if target in dds_connector.writer_topic_names:
+            variables = [Variable(i) for i in dds_connector.xml_parser.topic2signal.get(target, ())]
+            return lambda: dds_connector.dds_multi_send(target, [i for i in variables if i.version], log=False)
+        raise Exception(f'SignalFormatError: cyc_{target}')
+
     @classmethod
     def resolve_existing_signal_name(cls, expression):
         # 使用正则表达式提取包括::和.的变量名
-        pattern = r'\b[a-zA-Z_][\w\.:]*\b'
-        matches = re.findall(pattern, expression)
-        logger.debug(matches)
-        if not matches:
-            raise Exception("未找到任何合法变量名")
-
-        for i in matches:
-            # 检查提取的变量名是否在全局变量列表中
-            if Variable.check_existence(i):
-                variable_name = i
-                return variable_name
-        raise Exception(f'未找到有效的信号名')
+        return resolve_signal_name(expression)
 
     @classmethod
     def check_signal_name(cls, signal_name_str):
@@ -541,6 +406,125 @@ class CaseTester:
         else:
             return True
 
+    @staticmethod
+    def get_pass_conditions(step) -> list:
+        """
+        获取步骤中有效的PassCondition条件语句
+        """
+        return [
+            str(pass_con).replace('&&', '') for pass_con in step.pass_condition
+            if pass_con is not None and pass_con != '' and pass_con != 'None'
+        ]
+
+    @staticmethod
+    def parse_wait_condition(wait):
+        """
+        解析WaitCondition
+            0.5         固定等待0.5秒后校验PassCondition；配置文件中 wait_until: true 时按 until 处理
+            until 5     事件驱动等待：所有PassCondition满足时立即结束等待，最长等待5秒
+        Returns:
+            (是否为until模式, 等待秒数)
+        """
+        wait = str(wait).replace(' ', '')
+        if wait.lower().startswith('until'):
+            return True, float(wait[5:].lstrip(':'))
+        return bool(env.wait_until), float(wait)
+
+    @staticmethod
+    def materialize_signals(pass_conditions):
+        """
+        创建条件中引用的已登记信号(矩阵中的dds信号只登记名字，第一次引用时才创建并按需订阅topic)
+        """
+        for pass_con in pass_conditions:
+            for name in find_signal_names(pass_con):
+                if Variable.check_existence(name):
+                    Variable(name)
+
+    @staticmethod
+    def start_monitors(pass_conditions, anchor_ns) -> dict:
+        """
+        在步骤开始(发送Actions之前)为时序条件(within/during/rose/fell/changes)创建校验器并订阅信号，
+        等待期间每次赋值都会被处理，不依赖信号历史深度；条件语句有误时跳过，错误在之后的校验中记录
+        Returns:
+            {PassCondition: ConditionMonitor}
+        """
+        monitors = {}
+        for pass_con in pass_conditions:
+            try:
+                condition = compile_condition(pass_con)
+                if condition.is_stateful and condition not in monitors:
+                    monitors[condition] = condition.monitor(anchor_ns)
+            except Exception:
+                pass
+        return monitors
+
+    @staticmethod
+    def close_monitors(monitors: dict):
+        for monitor in monitors.values():
+            monitor.close()
+
+    @staticmethod
+    def wait_until_pass(pass_conditions, timeout, monitors=None) -> bool:
+        """
+        等待所有PassCondition满足或超时，由条件中信号的赋值事件唤醒，不轮询
+        Args:
+            pass_conditions: 条件语句列表
+            timeout: 超时时间，单位秒
+            monitors: 步骤开始时由 start_monitors 创建的时序条件校验器，None时以当前时刻为窗口起点创建
+        Returns:
+            超时前条件是否全部满足
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            conditions = [compile_condition(pass_con) for pass_con in pass_conditions]
+        except Exception as e:
+            # 条件语句本身有问题，按固定时间等待，错误在之后的校验中记录
+            logger.error(f'Condition error: {e}')
+            time.sleep(timeout)
+            return False
+        own_monitors = monitors is None
+        if own_monitors:
+            monitors = CaseTester.start_monitors(pass_conditions, time.perf_counter_ns())
+
+        def all_passed():
+            for condition in conditions:
+                try:
+                    monitor = monitors.get(condition)
+                    if monitor is None:
+                        passed = condition.check()[0]
+                    elif monitor.deadline_ns is None:
+                        passed = monitor.current()
+                    else:
+                        passed = monitor.update()  # 窗口结束前 during 条件为None
+                    if not passed:
+                        return False
+                except Exception:  # 信号值还没到达时可能无法比较，例如空列表取下标
+                    return False
+            return True
+
+        def next_wakeup(remaining):
+            # during/within 窗口结束时没有信号赋值也需要醒来重新判断
+            for monitor in monitors.values():
+                if monitor.deadline_ns is not None and monitor.verdict is None:
+                    remaining = min(remaining, monitor.remaining())
+            return remaining
+
+        try:
+            with Variable.watch({c.variable for c in conditions}) as changed:
+                while True:
+                    changed.clear()  # 先清除再检查，检查期间到达的赋值不会丢失
+                    if all_passed():
+                        logger.info(f'等待条件满足, 用时 {timeout - (deadline - time.monotonic()):.3f}s')
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.info(f'等待条件超时 {timeout}s')
+                        return False
+                    changed.wait(next_wakeup(remaining))
+        finally:
+            if own_monitors:
+                CaseTester.close_monitors(monitors)
+
     def run_test_case(self, tc_name, test_steps, tc_title=''):
         tc_ret = True
         test_info = TestInfo(tc_name, test_steps, tc_ret, tc_title=tc_title)
@@ -550,201 +534,198 @@ class CaseTester:
                 logger.info(f'Precondition {step.pre_condition}')
             step_evaluation = []
             test_steps[_i].test_time = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+            pass_conditions = self.get_pass_conditions(step)
+            self.materialize_signals(pass_conditions)  # 先创建信号再取窗口起点，起点时刻的信号值才有记录
+            step_start_ns = time.perf_counter_ns()  # 时序条件的窗口起点
+            monitors = self.start_monitors(pass_conditions, step_start_ns)
 
             # action 输入
             action_pass = True
             # actions如果是多个，默认为一组dds信号/一组车模式仿真信号/TCP信号
-            if len(step.actions) > 1:
-                signals = []
-                topic_name = ''
-                for action in step.actions:
-                    action = action.lstrip()
-                    if not action.startswith(('ssh_', 'db_')):  # ssh命令可能会有空格或其他符号
-                        action = action.replace(' ', '').replace('==', '=')
-                    action = action.rstrip(';')
-                    if action:  # 有可能是空字符串
-                        _m = action.split('=')
-                        sigal_name_str = _m[0]
-                        # 根据信号名查找全局信号，判断是否存在
-                        has_such_signal = self.check_signal_name(sigal_name_str)
-                        if not has_such_signal:
-                            fail_reason = f'SignalNotFound: {sigal_name_str}'
-                            if fail_reason not in step_evaluation:
-                                step_evaluation.append(fail_reason)
-                            logger.error(f'Actions not found signal {sigal_name_str}')
-                            action_pass = False
-                            break
-
-                        else:
-                            try:
-                                signal = Variable(sigal_name_str)
-                                # 添加DDS信号组
-                                if not any(signal.name.startswith(prefix) for prefix in self.non_dds_prefix):
-                                    tpn = self.dds_connector.signal_map[signal.name]
-                                    if topic_name and topic_name != tpn:
-                                        raise Exception(f'SignalsTopicNotSame')
-                                    else:
-                                        topic_name = tpn
-                                    signal_value = CaseTester.convert_signal_value(_m[1])
-                                    if signal_value is None:
-                                        logger.error(f'Signal {signal.name} value {signal_value}convert error')
-                                        raise Exception(f'Signal {signal.name} value {signal_value}convert error')
-                                    signal.Value = signal_value
-                                    signals.append(signal)
-
-                                # 发送车模式仿真信号
-                                elif signal.name.startswith('SIL_VMS_'):
-                                    signal.Value = float(_m[1])  # 字符串类型转成整型
-                                    self.send_single_msg(signal, async_mode=False)
-
-                                # 发送M2A A2M、以及其他信号
-                                else:
-                                    try:
-                                        signal = Variable(sigal_name_str)
-                                        signal_value = CaseTester.convert_signal_value('='.join(_m[1:]).strip())  # 复杂的值中可能有 "="
-                                        if signal_value is None:
-                                            logger.error(f'{signal.name}={signal_value} value convert error')
-                                            raise Exception(f'{signal.name}={signal_value} value convert error')
-                                        signal.Value = signal_value
-                                        self.send_single_msg(signal, async_mode=False)
-                                    except Exception as e:
-                                        if str(e) not in step_evaluation:  # 防止原因重复
-                                            step_evaluation.append(str(e))
-                                        logger.error("Actions error: " + str(e))
-                                        action_pass = False
-
-                            except Exception as e:
-                                logger.error(traceback.format_exc())
-                                if str(e) not in step_evaluation:  # 防止原因重复
-                                    step_evaluation.append(str(e))
-                                logger.error("Actions error: " + str(e))
-                                action_pass = False
-                                break
-                # 发送一组dds消息
-                if topic_name and signals:
-                    self.dds_connector.dds_multi_send(
-                        topic_name=topic_name,
-                        signals=signals
-                    )
-
-            elif len(step.actions) == 1 and step.actions[0] and str(step.actions[0]) != 'None':
-                # 发送单信号
-                action = str(step.actions[0]).lstrip()
-                if not action.startswith(('ssh_', 'db_')):  # ssh命令可能会有空格或其他符号
-                    action = action.replace(' ', '').replace('==', '=')
-                action = action.rstrip(';')
-                if action:
-                    # 单条消息发送处理逻辑
-                    msg = action.strip().split('=')
-                    sigal_name_str = msg[0].strip()
+            # 动作在用例解析阶段已经编译成 ActionItem，这里不再拆分字符串和转换信号值
+            if step.multi_action:
+                dds_batch = {}  # topic名 -> Variable列表，不同topic的信号一起批量发送
+                tcp_signals = []
+                for item in step.action_items:
+                    sigal_name_str = item.signal_name
+                    # 根据信号名查找全局信号，判断是否存在
                     has_such_signal = self.check_signal_name(sigal_name_str)
                     if not has_such_signal:
                         fail_reason = f'SignalNotFound: {sigal_name_str}'
                         if fail_reason not in step_evaluation:
                             step_evaluation.append(fail_reason)
-                        logger.error(f'Actions SignalNotFound {sigal_name_str}')
+                        logger.error(f'Actions not found signal {sigal_name_str}')
                         action_pass = False
+                        break
 
                     else:
                         try:
-                            signal = Variable(sigal_name_str)
-                            signal_value = CaseTester.convert_signal_value('='.join(msg[1:]).strip())  # 复杂的值中可能有 "="
-                            if signal_value is None:
-                                logger.error(f'{signal.name}={signal_value} value convert error')
-                                raise Exception(f'{signal.name}={signal_value} value convert error')
-                            signal.Value = signal_value
-                            self.send_single_msg(signal, async_mode=False)
+                            signal = item.variable
+                            # 其他动作之前先发出已攒下的TCP信号，保持与用例中的先后顺序一致
+                            if tcp_signals and item.kind in ('vms', 'other'):
+                                self.sdc_connector.tcp_send_batch(tcp_signals)
+                                tcp_signals = []
+                            # 添加DDS信号组
+                            if item.kind == 'dds':
+                                # topic在加载用例时已绑定，未绑定(如直接调用run_test_case)时再查表
+                                topic_name = item.topic_name or self.dds_connector.signal_map[signal.name]
+                                if not item.has_value:
+                                    raise Exception(f'Signal {signal.name} value missing')
+                                signal_value = item.resolve_value()
+                                if signal_value is None:
+                                    logger.error(f'Signal {signal.name} value {signal_value}convert error')
+                                    raise Exception(f'Signal {signal.name} value {signal_value}convert error')
+                                signal.Value = signal_value
+                                dds_batch.setdefault(topic_name, []).append(signal)
+
+                            # 添加M2A/A2A TCP信号组
+                            elif item.kind == 'tcp':
+                                try:
+                                    signal_value = item.resolve_value()
+                                    if signal_value is None:
+                                        logger.error(f'{signal.name}={signal_value} value convert error')
+                                        raise Exception(f'{signal.name}={signal_value} value convert error')
+                                    signal.Value = signal_value
+                                    tcp_signals.append(signal)
+                                except Exception as e:
+                                    if str(e) not in step_evaluation:  # 防止原因重复
+                                        step_evaluation.append(str(e))
+                                    logger.error("Actions error: " + str(e))
+                                    action_pass = False
+
+                            # 发送车模式仿真信号
+                            elif item.kind == 'vms':
+                                signal.Value = float(item.value_text)  # 字符串类型转成整型
+                                self.send_single_msg(signal, async_mode=False)
+
+                            # 发送M2A A2M、以及其他信号
+                            else:
+                                try:
+                                    signal_value = item.resolve_value()
+                                    if signal_value is None:
+                                        logger.error(f'{signal.name}={signal_value} value convert error')
+                                        raise Exception(f'{signal.name}={signal_value} value convert error')
+                                    signal.Value = signal_value
+                                    self.send_single_msg(signal, async_mode=False)
+                                except Exception as e:
+                                    if str(e) not in step_evaluation:  # 防止原因重复
+                                        step_evaluation.append(str(e))
+                                    logger.error("Actions error: " + str(e))
+                                    action_pass = False
+
                         except Exception as e:
+                            logger.error(traceback.format_exc())
                             if str(e) not in step_evaluation:  # 防止原因重复
                                 step_evaluation.append(str(e))
                             logger.error("Actions error: " + str(e))
                             action_pass = False
+                            break
+                # 连续的一组TCP消息打包成一次发送，前面的动作失败时不再发送
+                if tcp_signals and action_pass:
+                    try:
+                        self.sdc_connector.tcp_send_batch(tcp_signals)
+                    except Exception as e:
+                        if str(e) not in step_evaluation:  # 防止原因重复
+                            step_evaluation.append(str(e))
+                        logger.error("Actions error: " + str(e))
+                        action_pass = False
+                # 发送一组dds消息，跨topic时各topic背靠背发送
+                if len(dds_batch) == 1:
+                    topic_name, signals = dds_batch.popitem()
+                    self.dds_connector.dds_multi_send(topic_name=topic_name, signals=signals)
+                elif dds_batch:
+                    self.dds_connector.publish_batch(dds_batch)
+
+            elif step.action_items:
+                # 发送单信号
+                item = step.action_items[0]
+                sigal_name_str = item.signal_name
+                has_such_signal = self.check_signal_name(sigal_name_str)
+                if not has_such_signal:
+                    fail_reason = f'SignalNotFound: {sigal_name_str}'
+                    if fail_reason not in step_evaluation:
+                        step_evaluation.append(fail_reason)
+                    logger.error(f'Actions SignalNotFound {sigal_name_str}')
+                    action_pass = False
+
+                else:
+                    try:
+                        signal = item.variable
+                        signal_value = item.resolve_value()
+                        if signal_value is None:
+                            logger.error(f'{signal.name}={signal_value} value convert error')
+                            raise Exception(f'{signal.name}={signal_value} value convert error')
+                        signal.Value = signal_value
+                        self.send_single_msg(signal, async_mode=False)
+                    except Exception as e:
+                        if str(e) not in step_evaluation:  # 防止原因重复
+                            step_evaluation.append(str(e))
+                        logger.error("Actions error: " + str(e))
+                        action_pass = False
 
             if not action_pass:
                 tc_ret = False
                 if step_evaluation:
                     test_steps[_i].evaluation_condition = step_evaluation
                 test_steps[_i].step_ret = False
+                self.close_monitors(monitors)
                 continue  # action异常直接进行下一个测试步骤
 
             # wait condition 等待
             wait = step.wait_condition
             if wait is not None and wait != '':
                 try:
-                    wait = str(wait).replace(' ', '')
-                    time.sleep(float(wait))
+                    wait_until, wait_seconds = self.parse_wait_condition(wait)
+                    if wait_until and pass_conditions:
+                        self.wait_until_pass(pass_conditions, wait_seconds, monitors=monitors)
+                    else:
+                        time.sleep(wait_seconds)
                 except Exception as e:
                     logger.error(f'{e}. Wait condition format error: {wait}')
 
             # pass condition 校验
             step_ret = None
-            for pass_con in step.pass_condition:
-                if pass_con is not None and pass_con != '' and pass_con != 'None':
-                    pass_con = str(pass_con).replace('&&', '')
-                    try:
-                        variable_name = self.resolve_existing_signal_name(pass_con)
-
-                        real_value = Variable(variable_name).Value
-                        step_evaluation.append(f'{variable_name}=={real_value}')
-
-                        # "MSG_BatACChrgEngy==nan" 这种eval会报错
-                        # 这里强调一下 任何值与 NaN相比都会返回False，包括 NaN == NaN
-                        # 判断类型是否为 nan，用 math.isnan()
-                        if 'nan' in pass_con:
-                            pass_con = pass_con.replace('nan', '"nan"')
-                            # NaN == NaN返回False 这里都转换为字符进行比较
-                            if not isinstance(real_value, str) and not isinstance(real_value, list) and math.isnan(real_value):
-                                real_value = str(real_value)
-                        # EEA2.0 rti中接收的数值可能是字符串 需要转成float类型进行比较
-                        if isinstance(real_value, str) and real_value != 'nan':
-                            try:
-                                real_value = float(real_value)
-                            except ValueError:
-                                try:
-                                    real_value = json.loads(real_value)
-                                except ValueError:
-                                    pass
-                            pass
-                        if isinstance(real_value, list):
-                            # 如果值是列表类型且元素里包括 nan 则需要转成字符串进行比较
-                            temp_value = []
-                            for i in real_value:
-                                if isinstance(i, float) and math.isnan(i):
-                                    temp_value.append('nan')
-                                else:
-                                    temp_value.append(i)
-                            real_value = temp_value
-                        # 通过替换无效字符创建一个有效的Python变量名
-                        safe_variable_name = variable_name.replace('::', '__').replace('.', '_')
-                        # 所有变量都在这个作用域里体现，无法在当前环境中找到，只能在该字典中找到
-                        local_namespace = {'nan': math.nan}
-                        exec(f"{safe_variable_name} = {repr(real_value)}", {}, local_namespace)
-                        # 现在可以安全地评估表达式了
-                        result = eval(pass_con.replace(variable_name, safe_variable_name), {}, local_namespace)
-                        logger.info(f'通过条件: {pass_con}, 实际值: {real_value}, 结果: {result}')
-                        # if array_index is None:
-                        #     logger.info(f'>>> {variable_name}: 实际值：{real_value}, 预期值：{pass_value}, 结果：{result}')
-                        # else:
-                        #     logger.info(f'>>> {variable_name}[{array_index}]: 实际值：{real_value[array_index]}, 预期值：{pass_value}, 结果：{result}')
-                        if step_ret is None:
-                            step_ret = result
-                        else:
-                            step_ret = result & step_ret
-                        test_steps[_i].step_ret = step_ret
+            for pass_con in pass_conditions:
+                try:
+                    condition = compile_condition(pass_con)
+                    if condition.is_stateful:
+                        # 时序条件: 步骤开始时创建的校验器已处理等待期间的每次赋值，窗口未结束时等到结论确定
+                        monitor = monitors.get(condition)
+                        if monitor is None:
+                            # 条件中的信号在动作中才创建(如var_)，步骤开始时无法编译，按步骤起点补建
+                            monitor = monitors[condition] = condition.monitor(step_start_ns)
+                        result, real_value = monitor.result()
+                        step_evaluation.append(f'{condition.signal_name}=={real_value}')
+                        if monitor.inconclusive:
+                            step_evaluation.append(f'{pass_con}: 窗口内部分采样已被覆盖，结果不确定')
+                    else:
+                        real_value = condition.variable.Value
+                        step_evaluation.append(f'{condition.signal_name}=={real_value}')
+                        result = condition.evaluate(real_value)
+                    logger.info(f'通过条件: {pass_con}, 实际值: {real_value}, 结果: {result}')
+                    if step_ret is None:
+                        step_ret = result
+                    else:
+                        step_ret = result & step_ret
+                    test_steps[_i].step_ret = step_ret
 
-                    except Exception as e:
-                        logger.error(traceback.format_exc())
-                        evaluation_condition = str(e)
-                        logger.error("Condition error: {}".format(evaluation_condition))
-                        if evaluation_condition not in step_evaluation:
-                            step_evaluation.append(evaluation_condition)
-                        step_ret = False
-                        test_steps[_i].step_ret = step_ret
-
-                    # 一条测试步骤不过则整个用例不过
-                    if not step_ret:
-                        tc_ret = False
+                except Exception as e:
+                    logger.error(traceback.format_exc())
+                    evaluation_condition = str(e)
+                    logger.error("Condition error: {}".format(evaluation_condition))
+                    if evaluation_condition not in step_evaluation:
+                        step_evaluation.append(evaluation_condition)
+                    step_ret = False
+                    test_steps[_i].step_ret = step_ret
+
+                # 一条测试步骤不过则整个用例不过
+                if not step_ret:
+                    tc_ret = False
+            self.close_monitors(monitors)
             test_steps[_i].evaluation_condition = step_evaluation
+        # 周期发送只在当前用例内有效
+        if self.cyclic.tasks:
+            self.cyclic.remove_all()
         test_info.tc_steps = test_steps
         test_info.tc_ret = tc_ret
         return test_info
@@ -794,28 +775,27 @@ class TestPrecondition:
     def start_dds_connector(self):
         """
         dds connector订阅与发布池启动
+        sub_all_topics/pub_all_topics 时不再一次性创建全部topic: 用例加载后按执行计划批量创建，
+        其余topic在信号第一次被引用时按需订阅
         Bug to fix: 先发布后启动，部分Topic如 ACSetStatus中的信号无法正常接受
         这一块以后再分析原因
         """
+        dds_connector = self.tester.dds_connector
         if self.callback:
             self.callback.emit('dds订阅器 启动订阅线程池 ...')
-        logger.info('>>> dds订阅器 启动订阅线程池 ...')
-        for sub_tp_name in self.tester.sub_topics:
-            if self.callback:
-                self.callback.emit(f'订阅topic: {sub_tp_name}')
-            self.tester.dds_connector.create_subscriber(sub_tp_name)
-            time.sleep(0.1)
-        time.sleep(1)
+        if env.sub_all_topics:
+            logger.info('>>> dds订阅器 按需订阅topic')
+        else:
+            logger.info('>>> dds订阅器 启动订阅线程池 ...')
+            dds_connector.create_subscribers(self.tester.sub_topics, callback=self.callback)
 
         if self.callback:
             self.callback.emit('dds发布器 启动发布线程池 ...')
-        logger.info('>>> dds发布器 启动发布线程池 ...')
-        for pub_tp_name in self.tester.pub_topics:
-            if self.callback:
-                self.callback.emit(f'创建publisher: {pub_tp_name}')
-            self.tester.dds_connector.create_publisher(pub_tp_name)
-            time.sleep(0.1)
-        time.sleep(1)
+        if env.pub_all_topics:
+            logger.info('>>> dds发布器 按需创建publisher')
+        else:
+            logger.info('>>> dds发布器 启动发布线程池 ...')
+            dds_connector.create_publishers(self.tester.pub_topics, callback=self.callback)
 
     def start_ssh_connector(self):
         if self.tester.ssh_connector:
@@ -849,8 +829,21 @@ class TestPrecondition:
             self.tester.xcp_connector.start()
             self.tester.xcp_connector.load_a2l()
 
+    def start_recorder(self):
+        config = env.recorder or {}
+        if config.get('enable'):
+            recorder.start(
+                flush_interval=config.get('flush_interval') or 1,
+                log_values=config.get('log_values', True)
+            )
+
+    def start_hot_log(self):
+        hot_log.configure(env.hot_log)
+
     def run(self):
         self.verify_topic_correctness()
+        self.start_hot_log()
+        self.start_recorder()
         self.start_ssh_connector()
         self.start_ssh_async_connector()
         self.start_sdc_connector()
@@ -868,6 +861,15 @@ class TestPostCondition:
         if self.tester.sdc_connector and hasattr(self.tester.sdc_connector, 'client_socket'):
             self.tester.sdc_connector.stop()
 
+    def cyclic_leave(self):
+        self.tester.cyclic.stop()
+
+    def recorder_leave(self):
+        recorder.stop()
+
+    def hot_log_leave(self):
+        hot_log.stop()
+
     def dds_connector_leave(self):
         self.tester.dds_connector.release_connector()
 
@@ -909,6 +911,9 @@ class TestPostCondition:
         self.db_connector_leave()
         self.sdc_connector_leave()
         self.xcp_connector_leave()
+        self.cyclic_leave()
         time.sleep(1)
         self.dds_connector_leave()
+        self.recorder_leave()
+        self.hot_log_leave()
 
@@ -5,55 +5,307 @@
 # @File    : variable.py
 
 
+import time
+import asyncio
 import threading
 from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from contextlib import contextmanager
+from runner.log import logger
+from runner.history import SignalHistory, history_depth
 
 
 class Variable:
+    """
+    全局信号存储
+    - _vars_mapping 只在新建信号时加锁写入，已存在信号的查找直接读字典(dict单次读写在GIL下是原子的)，不再经过全局锁
+    - 每个信号有自己的锁，只保护该信号的赋值和订阅列表，不同信号的读写互不阻塞
+    - 读值不加锁，当前值单独保存在 _value 属性中，属性的读写是原子操作；历史值(带时间戳)在信号锁内写入环形缓冲区
+    - 矩阵中的信号只登记名字(declare)，第一次被引用时才创建实例，创建后依次调用创建钩子(如按需订阅信号所在的topic)
+    """
     _vars_mapping = {}  # 这个变量不建议直接操作，全部通过类方法进行访问，否则线程不安全
-    _lock = threading.Lock()  # 锁 _vars_mapping
-    _lock_variable = threading.Lock()  # 锁 Variable
+    _lock = threading.Lock()  # 锁 _vars_mapping 的写入
+    _declared = set()  # 已登记但不一定已创建的信号名
+    _create_hooks = ()  # 新建信号后的回调 callback(name)，写时复制的元组
 
     def __new__(cls, name, value=0):
+        instance = cls._vars_mapping.get(name)
+        if instance is not None:
+            return instance
         with cls._lock:
-            if name in cls._vars_mapping:
+            if name in cls._vars_mapping:  # 双重检查，防止多个线程同时创建同名信号
                 return cls._vars_mapping[name]
             instance = super().__new__(cls)
             instance.name = name
-            instance.data_array = deque([value], maxlen=3)
+            instance._lock_value = threading.Lock()  # 锁当前信号
+            instance._value = value
+            instance._history = SignalHistory(history_depth(name), time.perf_counter_ns(), value)  # 带时间戳的历史值
             instance.index = 0
+            instance.version = 0  # 每次赋值加1，UI等轮询方可据此判断信号是否有更新
+            instance._subscribers = ()  # 订阅回调，写时复制的元组，分发时无需加锁
             cls._vars_mapping[name] = instance
-            return instance
+        # 钩子在锁外执行，钩子里可以创建其他信号
+        for hook in cls._create_hooks:
+            try:
+                hook(name)
+            except Exception as e:
+                logger.error(f'{name} 创建钩子异常: {e}')
+        return instance
+
+    @classmethod
+    def declare(cls, names):
+        """
+        登记信号名但不创建实例，check_existence/get_var_keys 可以查到，第一次 Variable(name) 时才创建
+        """
+        with cls._lock:
+            cls._declared.update(names)
+
+    @classmethod
+    def add_create_hook(cls, hook):
+        """注册新建信号后的回调 hook(name)，在创建信号的线程中执行"""
+        with cls._lock:
+            if hook not in cls._create_hooks:
+                cls._create_hooks = cls._create_hooks + (hook,)
+
+    @classmethod
+    def remove_create_hook(cls, hook):
+        with cls._lock:
+            cls._create_hooks = tuple(i for i in cls._create_hooks if i != hook)
 
     def _var(self, name):
-        with Variable._lock:
-            return Variable._vars_mapping.get(name)
+        return Variable._vars_mapping.get(name)
 
     @classmethod
     def check_existence(cls, name):
-        with cls._lock:
-            return name in cls._vars_mapping
+        return name in cls._vars_mapping or name in cls._declared
 
     @classmethod
     def get_var_keys(cls):
+        """已创建和已登记的全部信号名"""
         with cls._lock:
-            return cls._vars_mapping.keys()
+            return list(cls._vars_mapping.keys()) + [i for i in cls._declared if i not in cls._vars_mapping]
 
     @classmethod
     def get_all_signals(cls):
+        """
+        已创建的信号实例，不包括只登记(declare)还未创建的信号；需要完整的信号名列表时使用 get_var_keys
+        """
         with cls._lock:
             # 注意使用时最好用snapshot防止多线程在字典迭代过程中对字典修改 list(dict.values())
             return list(cls._vars_mapping.values())
 
+    @classmethod
+    def get_vars(cls, prefix='var_') -> dict:
+        """
+        获取指定前缀信号的当前值快照，默认为用例中的临时变量(var_)，用于 {{var_xxx}} 模板替换
+        """
+        return {var.name: var.Value for var in cls.get_all_signals() if var.name.startswith(prefix)}
+
     @property
     def Value(self):
-        with self._lock_variable:
-            return self.data_array[-1]
+        return self._value
 
     @Value.setter
     def Value(self, new_value):
-        with self._lock_variable:
-            self.data_array.append(new_value)
+        with self._lock_value:
+            self._history.append(time.perf_counter_ns(), new_value)
+            self._value = new_value
+            self.version += 1
+        # 回调在锁外执行，回调里可以读写任意信号
+        subscribers = self._subscribers
+        if subscribers:
+            self._notify(subscribers, new_value)
+
+    def history(self, since=None, until=None) -> list:
+        """
+        获取时间范围内的历史值，时间为 time.perf_counter_ns()
+        :return: [(perf_counter_ns, value), ...] 按时间先后排列，最多保留 history_depth 条
+        """
+        with self._lock_value:
+            return self._history.range(since, until)
+
+    def value_at(self, timestamp):
+        """
+        获取某一时刻(time.perf_counter_ns())的信号值，早于保留的最旧记录时返回None
+        """
+        with self._lock_value:
+            record = self._history.value_at(timestamp)
+        return None if record is None else record[1]
+
+    def history_seq(self, timestamp):
+        """
+        时刻 timestamp 之后第一次赋值的序号，与 history_after 配合增量读取历史值
+        """
+        with self._lock_value:
+            return self._history.seq_of(timestamp)
+
+    def history_after(self, seq):
+        """
+        获取序号 >= seq 的历史值
+        :return: (记录列表, 下一次读取的序号, 是否有记录已被覆盖)
+        """
+        with self._lock_value:
+            return self._history.after(seq)
+
+    def _notify(self, subscribers, new_value):
+        for callback in subscribers:
+            try:
+                callback(self, new_value)
+            except Exception as e:
+                logger.error(f'{self.name} 订阅回调异常: {e}')
+
+    def subscribe(self, callback):
+        """
+        订阅信号变化，每次赋值后在赋值线程中调用 callback(variable, new_value)
+        回调中不要做耗时操作，否则会阻塞数据接收线程
+        :return: callback，便于作为装饰器使用
+        """
+        with self._lock_value:
+            self._subscribers = self._subscribers + (callback,)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock_value:
+            subscribers = list(self._subscribers)
+            if callback in subscribers:
+                subscribers.remove(callback)
+                self._subscribers = tuple(subscribers)
+
+    def next_value(self) -> Future:
+        """
+        返回一个在下一次赋值时完成的 Future，结果为新的信号值
+        Future被取消时自动取消订阅
+        """
+        future = Future()
+
+        def on_change(var, new_value):
+            var.unsubscribe(on_change)
+            try:
+                future.set_result(new_value)
+            except InvalidStateError:  # 已取消或被并发的赋值抢先完成
+                pass
+
+        self.subscribe(on_change)
+        future.add_done_callback(lambda f: self.unsubscribe(on_change))
+        return future
+
+    async def changed(self):
+        """
+        asyncio 中等待下一次赋值
+        用法:
+            value = await Variable('MSG_XXX').changed()
+        """
+        return await asyncio.wrap_future(self.next_value())
+
+    def wait_for(self, predicate, timeout=None) -> bool:
+        """
+        阻塞等待信号值满足 predicate(value)，当前值已满足时立即返回
+        :return: 超时返回False
+        """
+        with self.watch([self]) as event:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                event.clear()
+                if predicate(self.Value):
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                event.wait(remaining)
+
+    @classmethod
+    @contextmanager
+    def watch(cls, variables):
+        """
+        监听一组信号，任意一个被赋值时set返回的事件
+        用法:
+            with Variable.watch([var1, var2]) as event:
+                event.wait(timeout)
+        """
+        event = threading.Event()
+        variables = list(variables)
+
+        def on_change(var, new_value):
+            event.set()
+
+        for var in variables:
+            var.subscribe(on_change)
+        try:
+            yield event
+        finally:
+            for var in variables:
+                var.unsubscribe(on_change)
+
+
+def benchmark(writers=8, readers=8, signals=64, seconds=2.0):
+    """
+    并发读写压测: writers 个线程循环给各自的信号赋值，readers 个线程循环按名字查找信号并读值，
+    与旧实现(全局 _lock + 全局 _lock_variable)对比每秒操作次数
+    """
+    class _GlobalLockVariable:
+        _vars_mapping = {}
+        _lock = threading.Lock()
+        _lock_variable = threading.Lock()
+
+        def __new__(cls, name, value=0):
+            with cls._lock:
+                if name in cls._vars_mapping:
+                    return cls._vars_mapping[name]
+                instance = super().__new__(cls)
+                instance.data_array = deque([value], maxlen=3)
+                cls._vars_mapping[name] = instance
+                return instance
+
+        @property
+        def Value(self):
+            with self._lock_variable:
+                return self.data_array[-1]
+
+        @Value.setter
+        def Value(self, new_value):
+            with self._lock_variable:
+                self.data_array.append(new_value)
+
+    def run(var_cls):
+        names = [f'BENCH_{var_cls.__name__}_{i}' for i in range(signals)]
+        for name in names:
+            var_cls(name)
+        stop = threading.Event()
+        counts = [0] * (writers + readers)
+
+        def write(n):
+            own = names[n::writers] or names
+            count = 0
+            while not stop.is_set():
+                for name in own:
+                    var_cls(name).Value = count
+                    count += 1
+            counts[n] = count
+
+        def read(n):
+            count = 0
+            while not stop.is_set():
+                for name in names:
+                    var_cls(name).Value
+                    count += 1
+            counts[writers + n] = count
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        return sum(counts[:writers]) / seconds, sum(counts[writers:]) / seconds
+
+    for var_cls in (_GlobalLockVariable, Variable):
+        set_rate, get_rate = run(var_cls)
+        print(f'{var_cls.__name__:<20} set: {set_rate:>12,.0f}/s  get: {get_rate:>12,.0f}/s')
+    with Variable._lock:
+        for name in [i for i in Variable._vars_mapping if i.startswith('BENCH_')]:
+            Variable._vars_mapping.pop(name)
 
 
 if __name__ == '__main__':
@@ -65,3 +317,9 @@ if __name__ == '__main__':
     print(Variable.check_existence('SOA'))
     print(Variable.check_existence('SOA2'))
     print(Variable.get_var_keys())
+    Variable('SOA').subscribe(lambda var, value: print(f'{var.name} -> {value}'))
+    future = Variable('SOA').next_value()
+    threading.Timer(0.1, lambda: setattr(Variable('SOA'), 'Value', 2)).start()
+    print(future.result(timeout=1))
+    print(Variable('SOA').wait_for(lambda v: v == 2, timeout=1))
+    benchmark()
@@ -19,6 +19,7 @@ import traceback
 import glob
 import yaml
 import subprocess
+import multiprocessing
 from threading import Thread
 from urllib.parse import unquote
 from runner.log import logger
@@ -37,14 +38,14 @@ from PyQt5.QtWidgets import (
 )
 from settings import env, work_dir
 from connector.dds import DDSConnector, DDSConnectorRti
-from connector.sdc import SDCConnector
+from connector.sdc import create_sdc_connector
 from connector.ssh import SSHConnector, SSHAsyncConnector
 from connector.database import DBConnector
 from connector.doipclient import DoIPClient
 from connector.xcp import XCPConnector
 from runner.cloud import CloudConnector
 from runner.variable import Variable
-from runner.tester import CaseTester, TestPrecondition, TestPostCondition, TestHandle, CaseParser
+from runner.tester import CaseTester, TestPrecondition, TestPostCondition, TestHandle
 from runner.remote import Run, CallBack
 from runner.simulator import DoIPMonitorThread, VehicleModeDiagnostic
 from ui.worker import (
@@ -56,6 +57,7 @@ from ui.widgets import (
     CustomSplashScreen, SilConnectionLabel, DDSFuzzDatePickerDialog, HTMLStatic
 )
 from ui.startup import PlatformConfigurationDialog
+from test_framework import build_ddt_testcase
 
 # 这一部分是为了解决pyxcp模块打包后日志的问题
 # 在程序入口处添加以下代码
@@ -158,6 +160,7 @@ class MainWindow(QMainWindow):
         self.tab_label_num = 1
         self.current_file_paths = {}
         self.current_right_table = None
+        self.right_value_versions = {}  # 输出表每行最近一次显示的 (信号名, 版本号)
         self.left_table_widget = None
         self.right_table_widget = None
         self.tabs.setTabBar(CustomTabBar())
@@ -220,6 +223,7 @@ class MainWindow(QMainWindow):
         self.auto_test_worker.started.connect(self.on_auto_test_start)
         self.auto_test_worker.finished.connect(self.on_auto_test_finish)
         self.auto_test_worker.suite_result_path.connect(self.display_result_html_path)
+        self.auto_test_worker.progress.connect(self.display_load_progress)
         # 加载配置线程
         self.reload_setting_worker = ReloadSettingWorker(self)
         self.reload_setting_worker.display_case_path_signal.connect(self.display_case_paths)
@@ -498,6 +502,7 @@ class MainWindow(QMainWindow):
     def switch_current_tab(self):
         # 当前标签页切换时调用的函数 tab全都关闭以后索引是0(home页)
         current_tab_index = self.tabs.currentIndex()
+        self.right_value_versions = {}
         if not self.tables or current_tab_index < 1 or current_tab_index >= self.tabs.count():
             self.current_right_table = None
             if self.timer_right_value.isActive():
@@ -781,9 +786,13 @@ class MainWindow(QMainWindow):
             for i in range(self.current_right_table.rowCount()):
                 signal_name = self.current_right_table.cellWidget(i, 0).text() if self.current_right_table.cellWidget(i, 0) else ""
                 if signal_name:
-                    signal_value = Variable(signal_name).Value
+                    signal = Variable(signal_name)
+                    # 只刷新有赋值的行, 信号没有更新时不重建单元格
+                    if self.right_value_versions.get(i) == (signal_name, signal.version) and self.current_right_table.item(i, 1):
+                        continue
+                    self.right_value_versions[i] = (signal_name, signal.version)
                     self.current_right_table.takeItem(i, 1)
-                    self.current_right_table.setItem(i, 1, QTableWidgetItem(str(signal_value)))
+                    self.current_right_table.setItem(i, 1, QTableWidgetItem(str(signal.Value)))
         except Exception as e:
             logger.error(e)
             self.switch_current_tab()
@@ -1064,6 +1073,10 @@ class MainWindow(QMainWindow):
         self.run_tool.setIcon(QIcon(f'ui/icons/Pause_black.svg'))
         self.run_tool.setToolTip('停止')
 
+    def display_load_progress(self, message):
+        """用例加载进度显示在测试状态中"""
+        TestHandle.run_state = message
+
     def handle_press_changed(self, text):
         try:
             if not text:
@@ -1108,7 +1121,7 @@ class MainWindow(QMainWindow):
         except:
             logger.error(traceback.format_exc())
 
-    def set_env_testcase(self):
+    def set_env_testcase(self, callback=None):
         try:
             # 远程执行触发参数
             if env.remote_event_data:
@@ -1124,26 +1137,7 @@ class MainWindow(QMainWindow):
                     self.case_filepaths = glob.glob(os.path.normpath(os.path.join(case_path.replace('"', ''), '*.xlsm')))
                 self.display_case_paths()  # 显示用例列表
                 # env.remote_callback = CallBack()
-            env.ddt_testcase = []
-            for tc_filepath in self.case_filepaths:
-                tc_filename = os.path.basename(tc_filepath)
-                parser = CaseParser(tc_filepath=tc_filepath)
-                all_testcase = parser.get_all_testcase()
-                # 当前用例总数
-                TestHandle.all_case_num += len(all_testcase)
-                testcases = [
-                    {
-                        'case_name': key,
-                        'case_info': val.get('test_steps'),
-                        'case_title': val.get('case_name')
-                    } for key, val in all_testcase.items()
-                ]
-                suite_info = {
-                    'tc_filepath': tc_filepath,
-                    'suite_name': os.path.splitext(tc_filename)[0],
-                    'testcases': testcases
-                }
-                env.ddt_testcase.append(suite_info)
+            env.ddt_testcase = build_ddt_testcase(self.case_filepaths, callback=callback)
             env.ddt_test_index = 0
         except:
             logger.error(traceback.format_exc())
@@ -1315,7 +1309,7 @@ class SetupWorker(QObject):
                 logger.error(traceback.format_exc())
                 env.ssh_async_connector = None
             self.progress.emit('Initialize SDCConnector...')
-            env.sdc_connector = SDCConnector(env.dbo_filepath, server_ip=env.sil_server_ip, server_port=env.sil_server_port)
+            env.sdc_connector = create_sdc_connector(env.dbo_filepath, server_ip=env.sil_server_ip, server_port=env.sil_server_port)
             self.progress.emit('Initialize DDSConnector...')
             # env.dds_connector = DDSConnectorRti(idl_filepath=env.idl_filepath)
             logger.info(env.idl_filepath)
@@ -1475,6 +1469,8 @@ def main2():
 
 
 if __name__ == "__main__":
+    # 打包后的exe中使用进程池(并行解析用例)需要
+    multiprocessing.freeze_support()
     try:
         main()
     except Exception as e:
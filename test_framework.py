@@ -10,12 +10,13 @@ import ddt
 import datetime
 import time
 from settings import env, work_dir
-from runner.tester import CaseTester, TestHandle, CaseParser, TestPrecondition, TestPostCondition
+from runner.tester import CaseTester, TestHandle, TestPrecondition, TestPostCondition
+from runner.case import load_testcases, collect_signal_names, bind_topics
 from runner.reporter import generate_test_result_html
 from runner.log import logger
 from runner import run_tests_output_html_report
 from connector.dds import DDSConnector, DDSConnectorRti
-from connector.sdc import SDCConnector
+from connector.sdc import create_sdc_connector
 from connector.ssh import SSHConnector, SSHAsyncConnector
 from connector.database import DBConnector
 from connector.doipclient import DoIPClient
@@ -24,12 +25,15 @@ from runner.simulator import DoIPMonitorThread
 from runner.cloud import CloudConnector
 
 
-def load_ddt_testcase(tc_filenames):
-    env.ddt_testcase = []
-    for tc_filename in tc_filenames:
-        tc_filepath = os.path.join(env.case_dir, tc_filename)
-        parser = CaseParser(tc_filepath=tc_filepath)
-        all_testcase = parser.get_all_testcase()
+def build_ddt_testcase(tc_filepaths, callback=None):
+    """
+    加载用例文件并生成 ddt 用例集数据，以excel表为单位，顺序与传入的文件顺序一致
+    Args:
+        tc_filepaths: 用例文件路径列表
+        callback: pyqt progress信号，用于显示加载进度
+    """
+    ddt_testcase = []
+    for tc_filepath, all_testcase in load_testcases(tc_filepaths, callback=callback):
         testcases = [
             {
                 'case_name': key,
@@ -40,10 +44,33 @@ def load_ddt_testcase(tc_filenames):
         TestHandle.all_case_num += len(all_testcase)
         suite_info = {
             'tc_filepath': tc_filepath,
-            'suite_name': os.path.splitext(tc_filename)[0],
+            'suite_name': os.path.splitext(os.path.basename(tc_filepath))[0],
             'testcases': testcases
         }
-        env.ddt_testcase.append(suite_info)
+        ddt_testcase.append(suite_info)
+    prepare_case_signals(ddt_testcase, callback=callback)
+    return ddt_testcase
+
+
+def prepare_case_signals(ddt_testcase, callback=None):
+    """
+    按用例引用的信号提前创建topic，只创建用到的reader/writer，其余topic在信号第一次被引用时再订阅
+    """
+    dds_connector = getattr(env.tester, 'dds_connector', None)
+    if not dds_connector:
+        return
+    test_steps = [step for suite in ddt_testcase for case in suite['testcases'] for step in case['case_info'] or ()]
+    bind_topics(test_steps, dds_connector.signal_map)
+    action_names, read_names = collect_signal_names(test_steps)
+    try:
+        dds_connector.prepare_signals(action_names, read_names, callback=callback)
+    except Exception as e:
+        logger.error(f'用例信号topic预创建失败: {e}')
+
+
+def load_ddt_testcase(tc_filenames, callback=None):
+    tc_filepaths = [os.path.join(env.case_dir, tc_filename) for tc_filename in tc_filenames]
+    env.ddt_testcase = build_ddt_testcase(tc_filepaths, callback=callback)
     env.ddt_test_index = 0
 
 
@@ -196,7 +223,7 @@ def set_env_tester():
     if not env.ssh_async_connector:
         env.ssh_async_connector = SSHAsyncConnector(hostname=env.ssh_hostname, username=env.ssh_username, password=env.ssh_password, port=env.ssh_port)
     if not env.sdc_connector:
-        env.sdc_connector = SDCConnector(env.dbo_filepath, server_ip=env.sil_server_ip, server_port=env.sil_server_port)
+        env.sdc_connector = create_sdc_connector(env.dbo_filepath, server_ip=env.sil_server_ip, server_port=env.sil_server_port)
     if not env.dds_connector:
         env.dds_connector = DDSConnectorRti(idl_filepath=env.idl_filepath) if 'rti_' in env.idl_filepath else DDSConnector(idl_filepath=env.idl_filepath)
     if not env.doip_simulator:
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/19 10:00
+# @File    : conftest.py
+
+import os
+import sys
+
+# 从任意目录运行 pytest 时都能导入 runner 等顶层包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/19 10:00
+# @File    : test_condition.py
+
+import itertools
+import time
+from runner.variable import Variable
+from runner.condition import compile_condition
+
+MS = 1_000_000
+_ids = itertools.count()
+
+
+def new_signal(value=0):
+    """每个用例使用新的信号，避免共用历史和条件缓存"""
+    name = f'TEST_COND_{next(_ids)}'
+    Variable(name, value)
+    return name
+
+
+def start(text):
+    condition = compile_condition(text)
+    return condition.monitor(time.perf_counter_ns())
+
+
+def test_within_passes_on_first_match():
+    name = new_signal()
+    with start(f'{name}==1 within 500ms') as monitor:
+        t0 = monitor.anchor_ns
+        assert monitor.feed(t0 + 100 * MS, 0) is None
+        assert monitor.feed(t0 + 200 * MS, 1) is True
+        assert monitor.update(t0 + 100 * MS) is True
+
+
+def test_declared_signal_monitor():
+    name = f'TEST_COND_LAZY_{next(_ids)}'
+    Variable.declare([name])  # 只登记，第一次引用时才创建
+    with start(f'{name}==1 within 200ms') as monitor:
+        Variable(name).Value = 1
+        assert monitor.result() == (True, 1)
+        assert not monitor.inconclusive
+
+
+def test_signal_created_after_anchor():
+    name = f'TEST_COND_LAZY_{next(_ids)}'
+    Variable.declare([name])
+    anchor_ns = time.perf_counter_ns()
+    Variable(name).Value = 1  # 步骤开始之后才创建并赋值，如动作中新建的 var_ 信号
+    with compile_condition(f'{name}==1 within 200ms').monitor(anchor_ns) as monitor:
+        assert monitor.result() == (True, 1)
+        assert not monitor.inconclusive
+
+
+def test_within_ignores_samples_after_window():
+    name = new_signal()
+    with start(f'{name}==1 within 500ms') as monitor:
+        t0 = monitor.anchor_ns
+        assert monitor.feed(t0 + 600 * MS, 1) is None
+        assert monitor.update(t0 + 600 * MS) is False
+
+
+def test_during_passes_when_window_ends():
+    name = new_signal()
+    with start(f'{name} stays 0 during 2s') as monitor:
+        t0 = monitor.anchor_ns
+        for i in range(1, 200):
+            monitor.feed(t0 + i * 10 * MS, 0)
+        assert monitor.update(t0 + 1999 * MS) is None
+        assert monitor.update(t0 + 2000 * MS) is True
+
+
+def test_during_catches_early_violation_beyond_history_depth():
+    name = new_signal()
+    with start(f'{name}==0 during 2s') as monitor:
+        variable = Variable(name)
+        variable.Value = 1  # 最早的一次违反，之后的赋值远超过历史深度
+        for _ in range(200):
+            variable.Value = 0
+        assert len(variable.history()) < 200
+        assert monitor.result() == (False, 1)
+        assert not monitor.inconclusive
+
+
+def test_lost_samples_are_inconclusive():
+    name = new_signal()
+    monitor = start(f'{name}==0 during 2s')
+    monitor.close()  # 取消订阅后赋值不再被及时处理
+    for _ in range(200):
+        Variable(name).Value = 0
+    assert monitor.update() is False
+    assert monitor.inconclusive
+
+
+def test_rose_and_fell():
+    name = new_signal()
+    with start(f'rose({name}) within 1s') as rose, start(f'fell({name}) within 1s') as fell:
+        t0 = rose.anchor_ns
+        for i, value in enumerate([0, 0, 3]):
+            rose.feed(t0 + i * MS, value)
+            fell.feed(t0 + i * MS, value)
+        assert rose.verdict is True
+        assert fell.update(fell.anchor_ns + 1000 * MS) is False
+
+
+def test_changes_counts_transitions():
+    name = new_signal()
+    with start(f'changes({name}) >= 3 within 1s') as monitor:
+        t0 = monitor.anchor_ns
+        for i, value in enumerate([0, 1, 1, 2, 2], start=1):  # 起点值0也是一个采样
+            assert monitor.feed(t0 + i * MS, value) is None
+        assert monitor.trace.changes == 2
+        assert monitor.feed(t0 + 10 * MS, 5) is True
+
+
+def test_changes_without_window_uses_current_count():
+    name = new_signal()
+    with start(f'count({name} changes) == 2') as monitor:
+        variable = Variable(name)
+        variable.Value = 1
+        assert not monitor.current()
+        variable.Value = 0
+        assert monitor.current()
+
+
+def test_value_types_reported_unchanged():
+    name = new_signal()
+    with start(f'{name}=={2 ** 60 + 1} within 1s') as monitor:
+        Variable(name).Value = 2 ** 60 + 1
+        assert monitor.result() == (True, 2 ** 60 + 1)
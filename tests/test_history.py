@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# @Author  : Li Kun
+# @Time    : 2026/10/19 10:00
+# @File    : test_history.py
+
+from runner.history import SignalHistory
+
+
+def make_history(depth, count):
+    """时间戳为 0, 10, 20 ...，值为 0, 1, 2 ..."""
+    h = SignalHistory(depth, 0, 0)
+    for i in range(1, count):
+        h.append(i * 10, i)
+    return h
+
+
+def test_range_and_value_at():
+    h = make_history(8, 5)
+    assert h.range() == [(0, 0), (10, 1), (20, 2), (30, 3), (40, 4)]
+    assert h.range(since=15, until=30) == [(20, 2), (30, 3)]
+    assert h.value_at(25) == (20, 2)
+    assert h.value_at(-1) is None
+
+
+def test_wrap_around_keeps_latest():
+    h = make_history(4, 6)
+    assert len(h) == 4
+    assert h.range() == [(20, 2), (30, 3), (40, 4), (50, 5)]
+    assert h.value_at(15) is None  # 早于保留的最旧记录
+    assert h.value_at(20) == (20, 2)
+
+
+def test_after_reports_lost_records():
+    h = make_history(4, 6)
+    records, next_seq, lost = h.after(0)
+    assert lost and next_seq == 6
+    assert records == [(20, 2), (30, 3), (40, 4), (50, 5)]
+    records, next_seq, lost = h.after(h.seq_of(45))
+    assert not lost and records == [(50, 5)]
+    assert h.after(next_seq) == ([], 6, False)
+
+
+def test_int_and_bool_types_preserved():
+    h = SignalHistory(4, 0, 0)
+    h.append(1, True)
+    h.append(2, 2 ** 60 + 1)
+    values = [v for _, v in h.range()]
+    assert values == [0, True, 2 ** 60 + 1]
+    assert [type(v) for v in values] == [int, bool, int]
+
+
+def test_int64_array_switches_on_float():
+    h = SignalHistory(4, 0, 5)
+    h.append(1, 2 ** 62)
+    h.append(2, 1.5)
+    values = [v for _, v in h.range()]
+    assert values == [5, 2 ** 62, 1.5]
+    assert [type(v) for v in values] == [int, int, float]
+
+
+def test_float_array_switches_on_int():
+    h = SignalHistory(4, 0, 0.5)
+    h.append(1, 1)
+    h.append(2, False)
+    assert [type(v) for _, v in h.range()] == [float, int, bool]
+
+
+def test_big_int_and_text_values():
+    h = SignalHistory(4, 0, 2 ** 70)
+    h.append(1, 'on')
+    h.append(2, [1, 2])
+    assert [v for _, v in h.range()] == [2 ** 70, 'on', [1, 2]]
@@ -7,7 +7,6 @@ import os
 import time
 import json
 import traceback
-import random
 from copy import deepcopy
 from runner.log import logger
 from PyQt5 import QtCore
@@ -15,13 +14,14 @@ from PyQt5.QtCore import pyqtSignal, QDateTime
 from PyQt5.Qt import QThread, QObject
 from settings import env, work_dir
 from runner.variable import Variable
-from connector.sdc import SDCConnector
+from connector.sdc import create_sdc_connector
 from connector.dds import DDSConnector, DDSConnectorRti
 from connector.ssh import SSHConnector, SSHAsyncConnector
 from connector.doipclient import DoIPClient
 from connector.xcp import XCPConnector
 from runner.simulator import DoIPMonitorThread
 from runner.tester import CaseTester, TestPrecondition, TestPostCondition, TestHandle
+from runner.fuzzer import FuzzEngine
 from runner.assistant import HandleTestCaseFile
 from test_framework import set_test_handle, qt_main
 from flask_app import app as local_flask_app
@@ -55,6 +55,7 @@ class FlaskThread(QThread):
 
 class AutoTestWorker(QThread):
     suite_result_path = pyqtSignal(list)
+    progress = pyqtSignal(str)
 
     """ 自动化测试线程"""
     def __init__(self, app):
@@ -66,7 +67,7 @@ class AutoTestWorker(QThread):
             # TestHandle变量重置
             set_test_handle()
             # 设置执行用例
-            self.app.set_env_testcase()
+            self.app.set_env_testcase(callback=self.progress)
             # 测试回调，用于完成后发送信号
             env.tester.set_callback(self)
             self.suite_result_path.emit(TestHandle.result_html_path)
@@ -120,7 +121,7 @@ class ReloadSettingWorker(QThread):
             # 重写初始化connector 更新各种信号矩阵
             env.ssh_connector = SSHConnector(hostname=env.ssh_hostname, username=env.ssh_username, password=env.ssh_password, port=env.ssh_port)
             env.ssh_async_connector = SSHAsyncConnector(hostname=env.ssh_hostname, username=env.ssh_username, password=env.ssh_password, port=env.ssh_port)
-            env.sdc_connector = SDCConnector(env.dbo_filepath, server_ip=env.sil_server_ip, server_port=env.sil_server_port)
+            env.sdc_connector = create_sdc_connector(env.dbo_filepath, server_ip=env.sil_server_ip, server_port=env.sil_server_port)
             if 'rti_' in env.idl_filepath.lower():
                 env.DDSConnectorClass = DDSConnectorRti
                 env.platform_version = 2.0
@@ -305,20 +306,19 @@ class DDSFuzzTest(QThread):
 
     def run(self):
         logger.info(f'DDS模糊测试开始, 预计结束时间: {self.end_time.toString("yyyy-MM-dd HH:mm:ss")}')
+        engine = None
         try:
-            signals = Variable.get_all_signals()
+            engine = FuzzEngine(env.tester.dds_connector)
+            engine.start()
             while self.running:
-                for signal_obj in signals:
-                    signal_obj.Value = float(random.randint(0, 2 ** 8 - 1))
-                    try:
-                        env.tester.dds_connector.dds_send(signal_obj)
-                    except:
-                        pass
-                time.sleep(1)
                 if self.end_time and QDateTime.currentDateTime() >= self.end_time:
                     break
+                self.msleep(200)
         except:
             logger.error(f'DDS模糊测试执行异常: {traceback.format_exc()}')
+        finally:
+            if engine is not None:
+                engine.stop()
         logger.info('DDS模糊测试结束')
 
     def stop(self):